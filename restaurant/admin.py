@@ -1,5 +1,23 @@
 from django.contrib import admin
-from .models import Category, MenuItem, About, Contact, Reservation, Order, OrderItem, Chef, Review
+from .exports import export_response
+from .models import Category, MenuItem, About, Contact, Reservation, Order, OrderItem, Chef, Review, OutboxEmail, Table
+from .pagination import EstimatedCountPaginator, KeysetChangeList
+
+class KeysetAdmin(admin.ModelAdmin):
+    # Newest first, paged by (created_at, id) cursors with an estimated count
+    ordering = ['-created_at', '-pk']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_changelist(self, request, **kwargs):
+        return KeysetChangeList
+
+def export_action(kind, fmt):
+    # Streams the selected rows (or all matching ones with "select all")
+    def export(modeladmin, request, queryset):
+        return export_response(kind, fmt, queryset)
+    export.__name__ = f'export_{fmt}'
+    return admin.action(description=f'Export selected {kind} as {fmt.upper()}')(export)
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
@@ -17,17 +35,18 @@ class AboutAdmin(admin.ModelAdmin):
     list_display = ['title']
 
 @admin.register(Contact)
-class ContactAdmin(admin.ModelAdmin):
+class ContactAdmin(KeysetAdmin):
     list_display = ['name', 'email', 'subject', 'created_at']
     list_filter = ['created_at']
     search_fields = ['name', 'email', 'subject']
 
 @admin.register(Reservation)
-class ReservationAdmin(admin.ModelAdmin):
+class ReservationAdmin(KeysetAdmin):
     list_display = ['name', 'email', 'phone', 'date', 'time', 'guests', 'table_number', 'status', 'created_at']
     list_filter = ['status', 'date']
     search_fields = ['name', 'email', 'phone']
     list_editable = ['status', 'table_number']
+    actions = [export_action('reservations', 'csv'), export_action('reservations', 'jsonl')]
 
 class OrderItemInline(admin.TabularInline):
     model = OrderItem
@@ -35,12 +54,13 @@ class OrderItemInline(admin.TabularInline):
     readonly_fields = ['menu_item', 'quantity', 'price']
 
 @admin.register(Order)
-class OrderAdmin(admin.ModelAdmin):
+class OrderAdmin(KeysetAdmin):
     list_display = ['order_id', 'customer_name', 'table_number', 'total_amount', 'payment_status', 'created_at']
     list_filter = ['payment_status', 'created_at']
     search_fields = ['order_id', 'customer_name', 'customer_email']
     readonly_fields = ['order_id', 'created_at']
     inlines = [OrderItemInline]
+    actions = [export_action('orders', 'csv'), export_action('orders', 'jsonl')]
 
 @admin.register(Chef)
 class ChefAdmin(admin.ModelAdmin):
@@ -50,9 +70,22 @@ class ChefAdmin(admin.ModelAdmin):
     list_editable = ['order', 'is_active']
 
 @admin.register(Review)
-class ReviewAdmin(admin.ModelAdmin):
+class ReviewAdmin(KeysetAdmin):
     list_display = ['customer_name', 'rating', 'is_featured', 'is_approved', 'created_at']
     list_filter = ['rating', 'is_featured', 'is_approved', 'created_at']
     search_fields = ['customer_name', 'comment']
     list_editable = ['is_featured', 'is_approved']
     readonly_fields = ['created_at']
+
+@admin.register(OutboxEmail)
+class OutboxEmailAdmin(admin.ModelAdmin):
+    list_display = ['subject', 'recipient', 'status', 'attempts', 'next_attempt_at', 'created_at', 'sent_at']
+    list_filter = ['status']
+    search_fields = ['recipient', 'subject']
+    readonly_fields = ['created_at', 'sent_at', 'claim_token', 'claimed_at', 'last_error']
+
+@admin.register(Table)
+class TableAdmin(admin.ModelAdmin):
+    list_display = ['number', 'capacity', 'is_active']
+    list_filter = ['is_active', 'capacity']
+    list_editable = ['capacity', 'is_active']
@@ -0,0 +1,226 @@
+import datetime
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from django.utils.dateparse import parse_time
+
+from .models import Reservation, SlotCapacity, Table, TableSlot
+
+
+class NoTableAvailable(Exception):
+    pass
+
+
+class OutsideSeatingHours(Exception):
+    pass
+
+
+def slot_minutes():
+    return getattr(settings, 'RESERVATION_SLOT_MINUTES', 30)
+
+
+def reservation_slots(start_time):
+    """
+    Slot indexes covered by a reservation starting at start_time.
+
+    Every booking lasts RESERVATION_DURATION_MINUTES, so two bookings overlap
+    exactly when they share a slot; the (date, slot) index on TableSlot is the
+    interval index used to find busy tables.
+    """
+    size = slot_minutes()
+    start = start_time.hour * 60 + start_time.minute
+    end = start + getattr(settings, 'RESERVATION_DURATION_MINUTES', 120)
+    return range(start // size, (end - 1) // size + 1)
+
+
+def first_seating():
+    return parse_time(getattr(settings, 'RESERVATION_FIRST_SEATING', '11:00'))
+
+
+def last_seating():
+    return parse_time(getattr(settings, 'RESERVATION_LAST_SEATING', '22:00'))
+
+
+def check_seating_time(start_time):
+    """
+    Reject a start outside the seating hours that slot_availability() offers,
+    or one whose slots would run past midnight: slots are counted within one
+    date, so they would otherwise land on the booking's own date instead of
+    the next one.
+    """
+    earliest, latest = first_seating(), last_seating()
+    if not earliest <= start_time <= latest or reservation_slots(start_time)[-1] >= 24 * 60 // slot_minutes():
+        raise OutsideSeatingHours(
+            f'Reservations must start between {earliest:%H:%M} and {latest:%H:%M} and end by midnight.'
+        )
+
+
+def find_free_tables(date, start_time, guests):
+    # Single query: tables big enough for the party that hold none of the slots,
+    # smallest (best fit) first
+    busy = TableSlot.objects.filter(date=date, slot__in=list(reservation_slots(start_time))).values('table_id')
+    return Table.objects.filter(is_active=True, capacity__gte=guests).exclude(id__in=busy).order_by('capacity', 'number')
+
+
+def book_table(date, time, guests, **fields):
+    """
+    Create a Reservation on the best-fitting free table.
+
+    If a concurrent booking claims the same table first, the unique slot
+    constraint rejects our insert and the next candidate is tried.
+    """
+    if guests < 1:
+        raise ValueError('A reservation needs at least one guest.')
+    check_seating_time(time)
+    slots = reservation_slots(time)
+    attempts = getattr(settings, 'RESERVATION_ALLOCATION_ATTEMPTS', 3)
+    for table in find_free_tables(date, time, guests)[:attempts]:
+        try:
+            with transaction.atomic():
+                reservation = Reservation.objects.create(
+                    date=date,
+                    time=time,
+                    guests=guests,
+                    table_number=table.number,
+                    **fields
+                )
+                TableSlot.objects.bulk_create([
+                    TableSlot(table=table, reservation=reservation, date=date, slot=slot) for slot in slots
+                ])
+                adjust_slot_capacity(date, table.capacity, slots, 1)
+            return reservation
+        except IntegrityError:
+            continue
+    raise NoTableAvailable(f'No table for {guests} guests is free at that time.')
+
+
+def sync_table_slots(reservation):
+    """
+    Bring a reservation's slots in line with its current table and status,
+    e.g. after staff cancel it or move it to another table in the admin.
+    """
+    with transaction.atomic():
+        release_table_slots(reservation)
+        if reservation.status == 'cancelled' or reservation.table_number is None:
+            return
+        table = Table.objects.filter(number=reservation.table_number).first()
+        if table is None:
+            return
+        # Staff overrides win: a manual move onto an occupied slot is not
+        # rejected, but only the slots actually taken are counted
+        TableSlot.objects.bulk_create([
+            TableSlot(table=table, reservation=reservation, date=reservation.date, slot=slot)
+            for slot in reservation_slots(reservation.time)
+        ], ignore_conflicts=True)
+        if table.is_active:
+            taken = TableSlot.objects.filter(reservation=reservation).values_list('slot', flat=True)
+            adjust_slot_capacity(reservation.date, table.capacity, list(taken), 1)
+
+
+def allocate_reservation(reservation_id):
+    """
+    Slots for a reservation created outside book_table() (the admin, a
+    fixture), which would otherwise leave its table free for others to book.
+    """
+    reservation = Reservation.objects.filter(pk=reservation_id).first()
+    if reservation and not TableSlot.objects.filter(reservation=reservation).exists():
+        sync_table_slots(reservation)
+
+
+def release_table_slots(reservation):
+    # Free a reservation's slots and take them off the capacity counts, which
+    # cover active tables only
+    held = TableSlot.objects.filter(reservation=reservation, table__is_active=True).values_list(
+        'date', 'table__capacity', 'slot'
+    )
+    by_table_size = {}
+    for date, capacity, slot in held:
+        by_table_size.setdefault((date, capacity), []).append(slot)
+    for (date, capacity), slots in by_table_size.items():
+        adjust_slot_capacity(date, capacity, slots, -1)
+    TableSlot.objects.filter(reservation=reservation).delete()
+
+
+def adjust_slot_capacity(date, table_capacity, slots, delta):
+    """
+    Add delta booked tables of size table_capacity to each of the slots on
+    date. The UPDATE ... SET booked_tables = booked_tables + delta is atomic,
+    so concurrent bookings never lose a count.
+    """
+    slots = list(slots)
+    if not slots:
+        return
+    if delta > 0:
+        SlotCapacity.objects.bulk_create([
+            SlotCapacity(date=date, slot=slot, table_capacity=table_capacity) for slot in slots
+        ], ignore_conflicts=True)
+    SlotCapacity.objects.filter(date=date, table_capacity=table_capacity, slot__in=slots).update(
+        booked_tables=F('booked_tables') + delta
+    )
+
+
+def rebuild_slot_capacity(since):
+    """
+    Recount SlotCapacity from TableSlot for every date from since on, e.g.
+    after a table is resized or retired. Only active tables are counted, as
+    slot_availability() compares the counts with the active tables.
+    """
+    with transaction.atomic():
+        SlotCapacity.objects.filter(date__gte=since).delete()
+        counts = (TableSlot.objects.filter(date__gte=since, table__is_active=True)
+                  .values('date', 'slot', 'table__capacity').annotate(booked=Count('id')).order_by())
+        SlotCapacity.objects.bulk_create([
+            SlotCapacity(date=row['date'], slot=row['slot'], table_capacity=row['table__capacity'], booked_tables=row['booked'])
+            for row in counts
+        ], batch_size=500)
+
+
+def seating_slots():
+    # Slots a reservation may start in, from the first to the last seating
+    size = slot_minutes()
+    first = first_seating()
+    last = last_seating()
+    return range((first.hour * 60 + first.minute) // size, (last.hour * 60 + last.minute) // size + 1)
+
+
+def slot_availability(start_date, end_date, guests):
+    """
+    Free tables and seats in every seating slot from start_date to end_date,
+    and whether a party of guests could start there.
+
+    Reads the active table counts and the SlotCapacity rows for the range,
+    never Reservation, so the cost grows with the number of slots only.
+    "available" means some table big enough is free in each slot the party
+    would hold; book_table() makes the final choice.
+    """
+    tables = dict(Table.objects.filter(is_active=True).values_list('capacity').annotate(count=Count('id')).order_by())
+    booked = {
+        (date, slot, capacity): count
+        for date, slot, capacity, count in SlotCapacity.objects.filter(
+            date__gte=start_date, date__lte=end_date, booked_tables__gt=0
+        ).values_list('date', 'slot', 'table_capacity', 'booked_tables')
+    }
+
+    size = slot_minutes()
+    starts = seating_slots()
+    held = len(reservation_slots(datetime.time(0, 0)))
+    days = []
+    date = start_date
+    while date <= end_date:
+        free = {
+            slot: {capacity: max(total - booked.get((date, slot, capacity), 0), 0) for capacity, total in tables.items()}
+            for slot in range(starts.start, starts.stop + held)
+        }
+        fits = {slot: any(count for capacity, count in free[slot].items() if capacity >= guests) for slot in free}
+        days.append({
+            'date': date.isoformat(),
+            'slots': [{
+                'time': f'{slot * size // 60:02d}:{slot * size % 60:02d}',
+                'free_tables': sum(free[slot].values()),
+                'free_seats': sum(capacity * count for capacity, count in free[slot].items()),
+                'available': all(fits[s] for s in range(slot, slot + held)),
+            } for slot in starts],
+        })
+        date += datetime.timedelta(days=1)
+    return days
@@ -0,0 +1,305 @@
+"""
+Benchmark of the ordering funnel: home -> menu -> order_food -> add_to_cart ->
+view_cart -> checkout -> payment -> receipt.
+
+The funnel is driven in-process through the Django test client, which also
+counts queries exactly, and over real HTTP by concurrent workers against a
+live server thread. Results are latency percentiles, throughput and query
+counts per step, which can be compared against a stored baseline.
+
+run_write_stress() pays for orders and books tables from many threads at
+once, to check that concurrent writes wait for SQLite's lock rather than fail.
+"""
+import datetime
+import http.client
+import math
+import random
+import re
+import threading
+import time
+from collections import Counter
+from urllib.parse import urlencode, urlsplit
+
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .menu_cache import get_menu_snapshot
+
+FUNNEL = ['home', 'menu', 'order_food', 'add_to_cart', 'view_cart', 'checkout', 'payment', 'receipt']
+CHECKOUT_FORM = {
+    'customer_name': 'Bench Guest',
+    'customer_email': 'bench@example.com',
+    'customer_phone': '7004125809',
+    'table_number': '7',
+    'payment_method': 'Card',
+}
+SERVER_TIMING_QUERIES = re.compile(r'"(\d+) queries"')
+# Keys of a results dict that hold per-step figures; 'meta' describes the run
+MODES = ('client', 'http')
+
+
+class Recorder:
+    """Latency, query count and error samples per funnel step, shared by worker threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latency_ms = {name: [] for name in FUNNEL}
+        self.queries = {name: [] for name in FUNNEL}
+        self.errors = {name: 0 for name in FUNNEL}
+
+    def record(self, name, ms, queries=None, ok=True):
+        with self._lock:
+            if not ok:
+                self.errors[name] += 1
+                return
+            self.latency_ms[name].append(ms)
+            if queries is not None:
+                self.queries[name].append(queries)
+
+
+def percentile(values, fraction):
+    # Nearest-rank percentile of an already sorted list
+    if not values:
+        return 0.0
+    rank = max(math.ceil(fraction * len(values)), 1)
+    return values[min(rank, len(values)) - 1]
+
+
+def summarize(recorder, elapsed):
+    results = {}
+    for name in FUNNEL:
+        latencies = sorted(recorder.latency_ms[name])
+        queries = recorder.queries[name]
+        results[name] = {
+            'count': len(latencies),
+            'errors': recorder.errors[name],
+            'p50_ms': round(percentile(latencies, 0.50), 2),
+            'p95_ms': round(percentile(latencies, 0.95), 2),
+            'p99_ms': round(percentile(latencies, 0.99), 2),
+            'throughput_rps': round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+            'mean_queries': round(sum(queries) / len(queries), 2) if queries else None,
+            'max_queries': max(queries) if queries else None,
+        }
+    return results
+
+
+def cart_items(count=3, rng=None):
+    # A few random dishes from the menu snapshot for each simulated guest
+    rng = rng or random
+    items = list(get_menu_snapshot().items)
+    return rng.sample(items, min(count, len(items)))
+
+
+def funnel_requests(item_ids):
+    """(step, method, path, data) for one guest; the receipt path comes from the payment redirect."""
+    steps = [
+        ('home', 'GET', reverse('home'), None),
+        ('menu', 'GET', reverse('menu'), None),
+        ('order_food', 'GET', reverse('order_food'), None),
+    ]
+    steps += [('add_to_cart', 'GET', reverse('add_to_cart', args=[item_id]), None) for item_id in item_ids]
+    steps += [
+        ('view_cart', 'GET', reverse('view_cart'), None),
+        ('checkout', 'GET', reverse('checkout'), None),
+        ('payment', 'POST', reverse('payment'), CHECKOUT_FORM),
+    ]
+    return steps
+
+
+def run_client_funnel(recorder, guests, rng=None):
+    """Walk `guests` visitors through the funnel with the test client, counting queries."""
+    rng = rng or random.Random(0)
+    for _ in range(guests):
+        client = Client()
+        receipt_url = None
+        for name, method, path, data in funnel_requests(cart_items(rng=rng)) + [('receipt', 'GET', None, None)]:
+            path = path or receipt_url
+            if path is None:
+                recorder.record(name, 0, ok=False)
+                continue
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                response = client.post(path, data) if method == 'POST' else client.get(path)
+                ms = (time.perf_counter() - start) * 1000
+            ok = response.status_code < 400
+            recorder.record(name, ms, len(queries.captured_queries), ok)
+            if name == 'payment':
+                receipt_url = response.get('Location') if response.status_code == 302 else None
+
+
+class HttpGuest:
+    """One visitor over a keep-alive connection, with its own cookies and CSRF token."""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.cookies = {}
+        self.conn = None
+
+    def request(self, method, path, data=None):
+        headers = {'Cookie': '; '.join(f'{k}={v}' for k, v in self.cookies.items())}
+        body = None
+        if data is not None:
+            body = urlencode(data)
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+            headers['X-CSRFToken'] = self.cookies.get('csrftoken', '')
+        for attempt in range(2):
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection(self.host, self.port, timeout=30)
+            try:
+                self.conn.request(method, path, body=body, headers=headers)
+                response = self.conn.getresponse()
+                response.read()
+                break
+            except (ConnectionError, http.client.HTTPException):
+                # The server closed an idle keep-alive connection; retry once
+                self.conn.close()
+                self.conn = None
+                if attempt:
+                    raise
+        for header in response.msg.get_all('Set-Cookie') or []:
+            name, _, value = header.split(';', 1)[0].partition('=')
+            self.cookies[name.strip()] = value.strip()
+        return response
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+
+
+def run_http_funnel(recorder, host, port, guests, rng):
+    guest = HttpGuest(host, port)
+    try:
+        for _ in range(guests):
+            guest.cookies.clear()
+            receipt_url = None
+            for name, method, path, data in funnel_requests(cart_items(rng=rng)) + [('receipt', 'GET', None, None)]:
+                path = path or receipt_url
+                if path is None:
+                    recorder.record(name, 0, ok=False)
+                    continue
+                start = time.perf_counter()
+                try:
+                    response = guest.request(method, path, data)
+                except OSError:
+                    recorder.record(name, 0, ok=False)
+                    continue
+                ms = (time.perf_counter() - start) * 1000
+                timing = SERVER_TIMING_QUERIES.search(response.getheader('Server-Timing', ''))
+                recorder.record(name, ms, int(timing.group(1)) if timing else None, response.status < 400)
+                if name == 'payment':
+                    location = response.getheader('Location') if response.status == 302 else None
+                    receipt_url = urlsplit(location).path if location else None
+    finally:
+        guest.close()
+
+
+def run_http_load(recorder, host, port, workers, guests_per_worker, seed=0):
+    """Run `workers` concurrent guests loops against a server; returns the wall time in seconds."""
+    threads = [
+        threading.Thread(target=run_http_funnel, args=(recorder, host, port, guests_per_worker, random.Random(seed + i)))
+        for i in range(workers)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start
+
+
+def pay_for_order(client, rng):
+    client.get(reverse('add_to_cart', args=cart_items(1, rng)))
+    response = client.post(reverse('payment'), CHECKOUT_FORM)
+    # A failed order is sent back to checkout
+    return response.status_code == 302 and '/receipt/' in response['Location'], response
+
+
+def book_a_table(client, rng):
+    # Both a booking and "no table free" redirect; only an error does not
+    date = timezone.localdate() + datetime.timedelta(days=rng.randint(1, 7))
+    response = client.post(reverse('reservations'), {
+        'name': 'Bench Guest', 'email': 'bench@example.com', 'phone': '7004125809',
+        'date': date.isoformat(), 'time': rng.choice(['18:00', '19:30', '21:00']), 'guests': '2',
+    })
+    return response.status_code == 302, response
+
+
+WRITE_STEPS = {'payment': pay_for_order, 'reservation': book_a_table}
+
+
+class WriteRecorder:
+    """Outcome counts per write step, shared by worker threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.outcomes = {name: Counter() for name in WRITE_STEPS}
+
+    def record(self, name, outcome):
+        with self._lock:
+            self.outcomes[name][outcome] += 1
+
+    def failures(self):
+        return sum(count for outcomes in self.outcomes.values() for outcome, count in outcomes.items() if outcome != 'ok')
+
+
+def write_stress_worker(recorder, rounds, rng):
+    # One guest per thread, each with its own database connection
+    client = Client()
+    try:
+        for _ in range(rounds):
+            for name, step in WRITE_STEPS.items():
+                try:
+                    ok, response = step(client, rng)
+                    recorder.record(name, 'ok' if ok else f'HTTP {response.status_code}')
+                except Exception as exc:
+                    recorder.record(name, f'{type(exc).__name__}: {exc}')
+    finally:
+        connection.close()
+
+
+def run_write_stress(recorder, workers, rounds, seed=0):
+    """Run `workers` concurrent payment + reservation loops; returns the wall time in seconds."""
+    threads = [
+        threading.Thread(target=write_stress_worker, args=(recorder, rounds, random.Random(seed + i)))
+        for i in range(workers)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start
+
+
+def compare(results, baseline, tolerance):
+    """
+    Regressions of results against baseline: a p95 more than `tolerance`
+    (a fraction) slower, any growth in the maximum query count, or new errors.
+    """
+    regressions = []
+    for mode in MODES:
+        for name, stats in results.get(mode, {}).items():
+            base = baseline.get(mode, {}).get(name)
+            if not base:
+                continue
+            if base['p95_ms'] and stats['p95_ms'] > base['p95_ms'] * (1 + tolerance):
+                regressions.append(f"{mode} {name}: p95 {stats['p95_ms']}ms vs {base['p95_ms']}ms")
+            if stats['max_queries'] is not None and base['max_queries'] is not None and stats['max_queries'] > base['max_queries']:
+                regressions.append(f"{mode} {name}: {stats['max_queries']} queries vs {base['max_queries']}")
+            if stats['errors'] > base['errors']:
+                regressions.append(f"{mode} {name}: {stats['errors']} errors vs {base['errors']}")
+    return regressions
+
+
+def failed_steps(results):
+    """'mode step: N errors' for every step with errors; a baseline must have none."""
+    return [
+        f"{mode} {name}: {stats['errors']} errors"
+        for mode in MODES
+        for name, stats in results.get(mode, {}).items()
+        if stats['errors']
+    ]
@@ -0,0 +1,194 @@
+from decimal import Decimal
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.signing import BadSignature
+
+from .menu_cache import aget_menu_snapshot, aget_versions, get_menu_snapshot, get_menu_version
+
+CART_SESSION_KEY = 'cart'
+CART_SUMMARY_SESSION_KEY = 'cart_summary'
+CART_COOKIE_SALT = 'restaurant.cart'
+
+
+def encode_cart(cart):
+    # {12: 2, 15: 1} -> "12:2.15:1"
+    return '.'.join(f'{item_id}:{quantity}' for item_id, quantity in cart.items())
+
+
+def decode_cart(value):
+    cart = {}
+    for pair in (value or '').split('.'):
+        item_id, _, quantity = pair.partition(':')
+        if item_id.isdigit() and quantity.isdigit() and int(quantity) > 0:
+            cart[int(item_id)] = int(quantity)
+    return cart
+
+
+def _storage():
+    return getattr(settings, 'CART_STORAGE', 'session')
+
+
+def _cookie_name():
+    return getattr(settings, 'CART_COOKIE_NAME', 'cart')
+
+
+def get_cart(request):
+    """
+    The visitor's cart as {menu_item_id: quantity}. Names and prices are not
+    stored; they are resolved from the menu snapshot when the cart is shown.
+    """
+    if not hasattr(request, '_cart'):
+        if _storage() == 'cookie':
+            try:
+                value = request.get_signed_cookie(_cookie_name(), default='', salt=CART_COOKIE_SALT)
+            except BadSignature:
+                value = ''
+        else:
+            value = request.session.get(CART_SESSION_KEY, '')
+            if isinstance(value, dict):
+                # Session written before the compact format: {"12": {"quantity": 2, ...}}
+                value = encode_cart({item_id: data['quantity'] for item_id, data in value.items()})
+        request._cart = decode_cart(value)
+    return request._cart
+
+
+def save_cart(request, cart):
+    request._cart = cart
+    request.__dict__.pop('_cart_summary', None)
+    if _storage() == 'cookie':
+        # Written on the way out by CartCookieMiddleware
+        request._cart_changed = True
+    else:
+        # The session is being written anyway, so store the summary with it
+        summary = CartSummary.from_cart(cart, get_menu_snapshot())
+        request._cart_summary = summary
+        request.session[CART_SESSION_KEY] = encode_cart(cart)
+        request.session[CART_SUMMARY_SESSION_KEY] = summary.to_session(get_menu_version())
+        request.session.modified = True
+
+
+class CartSummary:
+    """
+    Cart lines priced from the menu, with Decimal subtotals, item count and
+    total. Built once per request by get_cart_summary() and shared by the cart,
+    checkout and payment views, the cart API and the nav badge.
+    """
+
+    def __init__(self, lines):
+        self.lines = lines
+        self.count = sum(line['quantity'] for line in lines)
+        self.total = sum((line['subtotal'] for line in lines), Decimal('0.00'))
+
+    @classmethod
+    def from_cart(cls, cart, snapshot):
+        # Items that are no longer available are left out
+        lines = []
+        for item_id, quantity in cart.items():
+            item = snapshot.get_item(item_id)
+            if item is None:
+                continue
+            lines.append({
+                'id': item_id,
+                'name': item['name'],
+                'price': item['price'],
+                'quantity': quantity,
+                'subtotal': item['price'] * quantity,
+            })
+        return cls(lines)
+
+    def to_session(self, menu_version):
+        return {
+            'menu_version': menu_version,
+            'lines': [[line['id'], line['name'], str(line['price']), line['quantity']] for line in self.lines],
+        }
+
+    @classmethod
+    def from_session(cls, data):
+        return cls([{
+            'id': item_id,
+            'name': name,
+            'price': Decimal(price),
+            'quantity': quantity,
+            'subtotal': Decimal(price) * quantity,
+        } for item_id, name, price, quantity in data['lines']])
+
+    def as_json(self):
+        return {
+            'items': [{
+                'id': line['id'],
+                'name': line['name'],
+                'price': f"{line['price']:.2f}",
+                'quantity': line['quantity'],
+                'subtotal': f"{line['subtotal']:.2f}",
+            } for line in self.lines],
+            'count': self.count,
+            'total': f'{self.total:.2f}',
+        }
+
+
+def get_cart_summary(request):
+    if not hasattr(request, '_cart_summary'):
+        summary = None
+        if _storage() == 'session':
+            # Reuse the summary saved with the session while the menu is unchanged
+            data = request.session.get(CART_SUMMARY_SESSION_KEY)
+            if data and data.get('menu_version') == get_menu_version():
+                summary = CartSummary.from_session(data)
+        if summary is None:
+            summary = CartSummary.from_cart(get_cart(request), get_menu_snapshot())
+        request._cart_summary = summary
+    return request._cart_summary
+
+
+async def aget_cart_summary(request):
+    """
+    get_cart_summary() for async views. Loads the session without blocking,
+    so the nav badge can then be rendered from memory.
+    """
+    if not hasattr(request, '_cart_summary'):
+        summary = None
+        if _storage() == 'session':
+            data = await request.session.aget(CART_SUMMARY_SESSION_KEY)
+            if data and data.get('menu_version') == (await aget_versions('menu'))['menu']:
+                summary = CartSummary.from_session(data)
+        if summary is None:
+            summary = CartSummary.from_cart(get_cart(request), await aget_menu_snapshot())
+        request._cart_summary = summary
+    return request._cart_summary
+
+
+class CartCookieMiddleware:
+    """Persist a cart changed during the request to its signed cookie (CART_STORAGE = 'cookie')."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.process_response(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.process_response(request, await self.get_response(request))
+
+    def process_response(self, request, response):
+        if getattr(request, '_cart_changed', False):
+            cart = request._cart
+            if cart:
+                response.set_signed_cookie(
+                    _cookie_name(),
+                    encode_cart(cart),
+                    salt=CART_COOKIE_SALT,
+                    max_age=getattr(settings, 'CART_COOKIE_AGE', 60 * 60 * 24 * 14),
+                    httponly=True,
+                    samesite='Lax',
+                    secure=request.is_secure(),
+                )
+            else:
+                response.delete_cookie(_cookie_name(), samesite='Lax')
+        return response
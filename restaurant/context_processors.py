@@ -0,0 +1,8 @@
+from django.utils.functional import SimpleLazyObject
+
+from .cart import get_cart_summary
+
+
+def cart(request):
+    # Lazy, so pages that never show the badge do not load the cart
+    return {'cart_summary': SimpleLazyObject(lambda: get_cart_summary(request))}
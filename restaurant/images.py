@@ -0,0 +1,133 @@
+"""
+Resized WebP/JPEG derivatives of uploaded menu, chef and review images.
+
+Derivatives live next to the media tree under derivatives/, named after the
+original and the width, e.g. derivatives/menu_items/Chessecake-320w.webp.
+Rendering runs in a process pool so saving a model never waits on Pillow.
+"""
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+
+DERIVATIVE_DIR = 'derivatives'
+FORMATS = {'webp': 'WEBP', 'jpeg': 'JPEG'}
+EXTENSIONS = {'webp': 'webp', 'jpeg': 'jpg'}
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def derivative_widths():
+    return getattr(settings, 'IMAGE_DERIVATIVE_WIDTHS', (320, 640, 960))
+
+
+def derivative_name(name, width, fmt):
+    root, _ = os.path.splitext(name)
+    return f'{DERIVATIVE_DIR}/{root}-{width}w.{EXTENSIONS[fmt]}'
+
+
+def render_derivatives(source_path, targets, quality):
+    """
+    Write each (width, fmt, path) in targets from the image at source_path.
+
+    Runs in a worker process, so it only touches the filesystem and Pillow.
+    Widths at or above the original are skipped rather than upscaled.
+    """
+    from PIL import Image, ImageOps
+
+    written = []
+    with Image.open(source_path) as original:
+        image = ImageOps.exif_transpose(original)
+        for width, fmt, path in targets:
+            if width >= image.width:
+                continue
+            height = round(image.height * width / image.width)
+            resized = image.resize((width, height), Image.LANCZOS)
+            if fmt == 'jpeg' and resized.mode != 'RGB':
+                resized = resized.convert('RGB')
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write to a temporary name so readers never see half a file
+            tmp_path = f'{path}.{os.getpid()}.tmp'
+            resized.save(tmp_path, FORMATS[fmt], quality=quality, optimize=True)
+            os.replace(tmp_path, path)
+            written.append(path)
+    return written
+
+
+def source_width(path):
+    # Width as displayed (after EXIF rotation), from the file header only
+    from PIL import Image
+
+    with Image.open(path) as image:
+        width, height = image.size
+        return height if image.getexif().get(0x0112) in (5, 6, 7, 8) else width
+
+
+def derivative_job(name, force=False):
+    # Arguments for render_derivatives(), or None when there is nothing to do.
+    # Widths at or above the original's are never written, so they are left
+    # out here too rather than counted as missing on every save.
+    if not name:
+        return None
+    source_path = default_storage.path(name)
+    if not os.path.exists(source_path):
+        return None
+    original_width = source_width(source_path)
+    targets = [
+        (width, fmt, default_storage.path(derivative_name(name, width, fmt)))
+        for width in derivative_widths() if width < original_width
+        for fmt in FORMATS
+    ]
+    if not force:
+        targets = [target for target in targets if not os.path.exists(target[2])]
+    if not targets:
+        return None
+    return source_path, targets, getattr(settings, 'IMAGE_DERIVATIVE_QUALITY', 80)
+
+
+def get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=getattr(settings, 'IMAGE_DERIVATIVE_WORKERS', 2))
+        return _pool
+
+
+def schedule_derivatives(name, on_done=None):
+    """
+    Render the derivatives of an uploaded image in the background.
+
+    on_done is called once they are written, e.g. to bump the cache version
+    of the pages that show the image. With IMAGE_DERIVATIVE_WORKERS = 0 the
+    work is done inline.
+    """
+    job = derivative_job(name)
+    if job is None:
+        return
+    if getattr(settings, 'IMAGE_DERIVATIVE_WORKERS', 2) <= 0:
+        render_derivatives(*job)
+        if on_done:
+            on_done()
+        return
+    future = get_pool().submit(render_derivatives, *job)
+    if on_done:
+        future.add_done_callback(lambda f: f.exception() is None and on_done())
+
+
+def image_sources(name):
+    """{'webp': [(width, url), ...], 'jpeg': [...]} for the derivatives that exist."""
+    sources = {}
+    if not name:
+        return sources
+    for fmt in FORMATS:
+        found = []
+        for width in derivative_widths():
+            derivative = derivative_name(name, width, fmt)
+            if default_storage.exists(derivative):
+                found.append((width, default_storage.url(derivative)))
+        if found:
+            sources[fmt] = found
+    return sources
@@ -0,0 +1,218 @@
+import random
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.template import TemplateDoesNotExist
+from django.template.backends.django import DjangoTemplates, Template, reraise
+
+# Timing collector for the request being handled, if it was sampled
+_current_timing = ContextVar('restaurant_request_timing', default=None)
+
+MS_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+
+
+class Histogram:
+    """Fixed-bucket histogram; percentiles are reported as bucket upper bounds."""
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def percentile(self, fraction):
+        if not self.count:
+            return 0
+        rank = fraction * self.count
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return self.max
+
+    def as_dict(self):
+        return {
+            'count': self.count,
+            'mean': round(self.total / self.count, 2) if self.count else 0,
+            'p50': self.percentile(0.50),
+            'p95': self.percentile(0.95),
+            'p99': self.percentile(0.99),
+            'max': round(self.max, 2),
+        }
+
+
+class RouteStats:
+    def __init__(self):
+        self.latency_ms = Histogram(MS_BUCKETS)
+        self.db_ms = Histogram(MS_BUCKETS)
+        self.template_ms = Histogram(MS_BUCKETS)
+        self.queries = Histogram(QUERY_BUCKETS)
+
+    def as_dict(self):
+        return {
+            'latency_ms': self.latency_ms.as_dict(),
+            'db_ms': self.db_ms.as_dict(),
+            'template_ms': self.template_ms.as_dict(),
+            'queries': self.queries.as_dict(),
+        }
+
+
+class MetricsRegistry:
+    # Per-process; each worker reports its own numbers
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes = {}
+
+    def record(self, route, timing, total_ms):
+        with self._lock:
+            stats = self._routes.get(route)
+            if stats is None:
+                stats = self._routes[route] = RouteStats()
+            stats.latency_ms.observe(total_ms)
+            stats.db_ms.observe(timing.db_ms)
+            stats.template_ms.observe(timing.template_ms)
+            stats.queries.observe(timing.queries)
+
+    def as_dict(self):
+        with self._lock:
+            return {route: stats.as_dict() for route, stats in sorted(self._routes.items())}
+
+    def reset(self):
+        with self._lock:
+            self._routes.clear()
+
+
+metrics = MetricsRegistry()
+
+
+class RequestTiming:
+    """Database execute wrapper that counts and times every query."""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_ms = 0.0
+        self.template_ms = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db_ms += (time.perf_counter() - start) * 1000
+
+
+def time_query(execute, sql, params, many, context):
+    """
+    Execute wrapper installed on every connection: counts the query toward the
+    sampled request being handled, if any. The collector is looked up in the
+    context rather than bound to one connection because async views query from
+    a sync_to_async worker thread, with that thread's connection, and the
+    worker runs in a copy of the request's context.
+    """
+    timing = _current_timing.get()
+    if timing is None:
+        return execute(sql, params, many, context)
+    return timing(execute, sql, params, many, context)
+
+
+class InstrumentationMiddleware:
+    """
+    Record query count, DB time, template time and total latency per route for
+    a sample of requests (INSTRUMENTATION_SAMPLE_RATE) and report them in a
+    Server-Timing header. Unsampled requests pay only for one random() call.
+    Async-capable, so it keeps an ASGI middleware chain async.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def sampled(self):
+        rate = getattr(settings, 'INSTRUMENTATION_SAMPLE_RATE', 0)
+        return rate > 0 and random.random() < rate
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.sampled():
+            return self.get_response(request)
+
+        timing = RequestTiming()
+        start = time.perf_counter()
+        with _timing_context(timing):
+            response = self.get_response(request)
+        return self.finish(request, response, timing, start)
+
+    async def __acall__(self, request):
+        if not self.sampled():
+            return await self.get_response(request)
+
+        timing = RequestTiming()
+        start = time.perf_counter()
+        with _timing_context(timing):
+            response = await self.get_response(request)
+        return self.finish(request, response, timing, start)
+
+    def finish(self, request, response, timing, start):
+        total_ms = (time.perf_counter() - start) * 1000
+        match = getattr(request, 'resolver_match', None)
+        metrics.record(match.view_name if match else 'unresolved', timing, total_ms)
+        response['Server-Timing'] = (
+            f'db;desc="{timing.queries} queries";dur={timing.db_ms:.2f}, '
+            f'tpl;dur={timing.template_ms:.2f}, '
+            f'total;dur={total_ms:.2f}'
+        )
+        return response
+
+
+@contextmanager
+def _timing_context(timing):
+    token = _current_timing.set(timing)
+    try:
+        yield
+    finally:
+        _current_timing.reset(token)
+
+
+class InstrumentedTemplate(Template):
+    def render(self, context=None, request=None):
+        timing = _current_timing.get()
+        if timing is None:
+            return super().render(context, request)
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            timing.template_ms += (time.perf_counter() - start) * 1000
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    """Django template backend whose top-level renders are timed per request."""
+
+    def from_string(self, template_code):
+        return InstrumentedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return InstrumentedTemplate(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
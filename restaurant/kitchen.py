@@ -0,0 +1,168 @@
+"""
+Kitchen display events.
+
+Order changes are published once, after their transaction commits, to an
+in-process broker that fans each event out to every connected kitchen
+screen's queue. Screens receive them over Server-Sent Events and never
+query the database; a reconnecting screen sends Last-Event-ID and is sent
+what it missed from a short history.
+
+The broker lives in the process and only hears about orders written by
+that process, so the whole site must run as a single ASGI worker for every
+screen to see every order.
+"""
+import asyncio
+import itertools
+import json
+import threading
+from collections import deque
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+from .models import Order
+
+
+class Subscriber:
+    """One connected screen: an asyncio queue fed from any thread."""
+
+    def __init__(self, loop, max_pending):
+        self.loop = loop
+        self.queue = asyncio.Queue()
+        self.max_pending = max_pending
+
+    def deliver(self, event):
+        try:
+            self.loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            pass  # the screen's event loop has closed
+
+    def _put(self, event):
+        # A screen this far behind is cut off (None) and catches up from the
+        # history when its EventSource reconnects
+        if self.queue.qsize() >= self.max_pending:
+            self.queue.put_nowait(None)
+        else:
+            self.queue.put_nowait(event)
+
+
+class EventBroker:
+    def __init__(self, history=200, max_pending=100):
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._history = deque(maxlen=history)
+        self._subscribers = set()
+        self.max_pending = max_pending
+
+    def publish(self, event_type, data):
+        """Send an event to every subscriber; returns its id."""
+        with self._lock:
+            event = (next(self._ids), event_type, json.dumps(data, cls=DjangoJSONEncoder))
+            self._history.append(event)
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            subscriber.deliver(event)
+        return event[0]
+
+    def subscribe(self, last_event_id=None):
+        """Register a subscriber on the running event loop, queued with anything after last_event_id."""
+        subscriber = Subscriber(asyncio.get_running_loop(), self.max_pending)
+        with self._lock:
+            if last_event_id is not None:
+                for event in self._history:
+                    if event[0] > last_event_id:
+                        subscriber.queue.put_nowait(event)
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    @property
+    def last_event_id(self):
+        with self._lock:
+            return self._history[-1][0] if self._history else 0
+
+    @property
+    def subscriber_count(self):
+        return len(self._subscribers)
+
+
+broker = EventBroker(
+    history=getattr(settings, 'KITCHEN_EVENT_HISTORY', 200),
+    max_pending=getattr(settings, 'KITCHEN_MAX_PENDING_EVENTS', 100),
+)
+
+
+def order_payload(order, order_items=None):
+    # Built from objects already in memory; lines need menu_item loaded
+    data = {
+        'order_id': order.order_id,
+        'table_number': order.table_number,
+        'customer_name': order.customer_name,
+        'payment_status': order.payment_status,
+        'created_at': order.created_at,
+    }
+    if order_items is not None:
+        data['items'] = [{'name': line.menu_item.name, 'quantity': line.quantity} for line in order_items]
+    return data
+
+
+def publish_order(event_type, order, order_items=None):
+    return broker.publish(event_type, order_payload(order, order_items))
+
+
+def publish_order_changed(order_pk):
+    # Staff edits in the admin: reload the order and its lines once, here,
+    # so the screens still never query
+    order = Order.objects.filter(pk=order_pk).prefetch_related('items__menu_item').first()
+    if order is not None:
+        publish_order('order.updated', order, order.items.all())
+
+
+# Orders changed in this thread's current transaction, not yet published
+_changed_orders = threading.local()
+
+
+def publish_order_changed_on_commit(order_pk):
+    """
+    Publish one order.updated for order_pk once the current transaction
+    commits, however many of the order's rows it changes (an admin save
+    writes the order and each inline line).
+
+    Every change queues a callback, and the first to run after the commit
+    takes the order out of the pending set and publishes it. Callbacks
+    queued in a rolled-back transaction never run, so an order left pending
+    by one is published with the next transaction that changes it.
+    """
+    pending = _changed_orders.__dict__.setdefault('orders', set())
+    pending.add(order_pk)
+
+    def publish():
+        if order_pk in pending:
+            pending.discard(order_pk)
+            publish_order_changed(order_pk)
+
+    transaction.on_commit(publish)
+
+
+async def event_stream(last_event_id=None):
+    """Server-Sent Events for one screen, with a comment line as heartbeat."""
+    heartbeat = getattr(settings, 'KITCHEN_HEARTBEAT_SECONDS', 15)
+    subscriber = broker.subscribe(last_event_id)
+    try:
+        yield 'retry: 3000\n\n'
+        while True:
+            try:
+                event = await asyncio.wait_for(subscriber.queue.get(), heartbeat)
+            except asyncio.TimeoutError:
+                yield ': keep-alive\n\n'
+                continue
+            if event is None:
+                return
+            event_id, event_type, data = event
+            yield f'id: {event_id}\nevent: {event_type}\ndata: {data}\n\n'
+    finally:
+        broker.unsubscribe(subscriber)
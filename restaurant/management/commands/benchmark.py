@@ -0,0 +1,154 @@
+import json
+import platform
+import random
+import time
+from pathlib import Path
+
+import django
+from django.conf import settings
+from django.contrib.staticfiles.handlers import StaticFilesHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.testcases import LiveServerThread
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+
+from restaurant.benchmark import FUNNEL, MODES, Recorder, compare, failed_steps, run_client_funnel, run_http_load, summarize
+from restaurant.models import MenuItem, Order, Reservation
+from restaurant.seeding import seed_menu, seed_orders, seed_reservations
+
+
+class Command(BaseCommand):
+    help = 'Seed a benchmark database and measure latency, throughput and queries across the ordering funnel'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=str(settings.BASE_DIR / 'benchmark.sqlite3'),
+                            help='Database file to seed and run against; kept between runs')
+        parser.add_argument('--fresh', action='store_true', help='Recreate the benchmark database from scratch')
+        parser.add_argument('--menu-items', type=int, default=2000)
+        parser.add_argument('--orders', type=int, default=100000)
+        parser.add_argument('--reservations', type=int, default=100000)
+        parser.add_argument('--guests', type=int, default=50, help='Guests walked through the funnel with the test client')
+        parser.add_argument('--workers', type=int, default=8, help='Concurrent HTTP guests')
+        parser.add_argument('--http-guests', type=int, default=25, help='Funnel runs per HTTP worker')
+        parser.add_argument('--skip-http', action='store_true', help='Only run the test client pass')
+        parser.add_argument('--output', help='Write the results as JSON to this file')
+        parser.add_argument('--baseline', default=str(settings.BASE_DIR / 'benchmarks' / 'baseline.json'),
+                            help='Baseline results to compare against')
+        parser.add_argument('--save-baseline', action='store_true', help='Store these results as the new baseline')
+        parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed p95 slowdown against the baseline')
+        parser.add_argument('--fail-on-regression', action='store_true', help='Exit with an error on any regression')
+
+    def handle(self, *args, **options):
+        # Reuses Django's test database machinery so the development
+        # database is never touched and a seeded database can be kept. It
+        # runs with the SQLite production profile, as a deployment would.
+        setup_test_environment()
+        settings_dict = connection.settings_dict
+        saved_options = settings_dict.get('OPTIONS', {})
+        settings_dict['OPTIONS'] = {**saved_options, **settings.SQLITE_PRODUCTION_OPTIONS}
+        settings_dict.setdefault('TEST', {})['NAME'] = options['database']
+        try:
+            with override_settings(INSTRUMENTATION_SAMPLE_RATE=1.0, ALLOWED_HOSTS=['*'], DEBUG=False,
+                                   SQLITE_PRAGMAS=settings.SQLITE_PRODUCTION_PRAGMAS):
+                old_name = connection.creation.create_test_db(
+                    verbosity=0, autoclobber=True, serialize=False, keepdb=not options['fresh'],
+                )
+                try:
+                    self.seed(options)
+                    results = self.run(options)
+                finally:
+                    connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=True)
+        finally:
+            settings_dict['OPTIONS'] = saved_options
+            teardown_test_environment()
+
+        self.report(results)
+        if options['output']:
+            Path(options['output']).write_text(json.dumps(results, indent=2) + '\n')
+
+        baseline_path = Path(options['baseline'])
+        if options['save_baseline']:
+            failures = failed_steps(results)
+            if failures:
+                raise CommandError(f"Not saving a baseline with failed requests: {'; '.join(failures)}")
+            baseline_path.parent.mkdir(parents=True, exist_ok=True)
+            baseline_path.write_text(json.dumps(results, indent=2) + '\n')
+            self.stdout.write(self.style.SUCCESS(f'Baseline saved to {baseline_path}'))
+        elif baseline_path.exists():
+            baseline = json.loads(baseline_path.read_text())
+            failures = failed_steps(baseline)
+            if failures:
+                raise CommandError(f"{baseline_path} records failed requests ({'; '.join(failures)}); regenerate it")
+            regressions = compare(results, baseline, options['tolerance'])
+            for regression in regressions:
+                self.stdout.write(self.style.WARNING(f'[REGRESSION] {regression}'))
+            if not regressions:
+                self.stdout.write(self.style.SUCCESS(f'No regressions against {baseline_path}'))
+            elif options['fail_on_regression']:
+                raise CommandError(f'{len(regressions)} regression(s) against the baseline')
+
+    def seed(self, options):
+        rng = random.Random(42)
+        for model, wanted, seed in [
+            (MenuItem, options['menu_items'], seed_menu),
+            (Order, options['orders'], seed_orders),
+            (Reservation, options['reservations'], seed_reservations),
+        ]:
+            missing = wanted - model.objects.count()
+            if missing > 0:
+                start = time.perf_counter()
+                seed(missing, rng=rng)
+                self.stdout.write(f'Seeded {missing} {model._meta.verbose_name_plural} in {time.perf_counter() - start:.1f}s')
+
+    def run(self, options):
+        results = {
+            'meta': {
+                'menu_items': MenuItem.objects.count(),
+                'orders': Order.objects.count(),
+                'reservations': Reservation.objects.count(),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+            },
+        }
+
+        # One unrecorded guest warms the menu snapshot and template caches
+        run_client_funnel(Recorder(), 1)
+        recorder = Recorder()
+        start = time.perf_counter()
+        run_client_funnel(recorder, options['guests'], rng=random.Random(1))
+        results['client'] = summarize(recorder, time.perf_counter() - start)
+
+        if not options['skip_http']:
+            server = LiveServerThread('localhost', StaticFilesHandler)
+            server.daemon = True
+            server.start()
+            server.is_ready.wait()
+            if server.error:
+                raise server.error
+            try:
+                recorder = Recorder()
+                elapsed = run_http_load(recorder, 'localhost', server.port, options['workers'], options['http_guests'])
+                results['http'] = summarize(recorder, elapsed)
+            finally:
+                server.terminate()
+        return results
+
+    def report(self, results):
+        meta = results['meta']
+        self.stdout.write(
+            f"{meta['menu_items']} menu items, {meta['orders']} orders, {meta['reservations']} reservations "
+            f"on {meta['database']} (Python {meta['python']}, Django {meta['django']})"
+        )
+        for mode in MODES:
+            if mode not in results:
+                continue
+            self.stdout.write(f'\n{mode}')
+            self.stdout.write(f"{'step':<12}{'n':>7}{'err':>5}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'req/s':>9}{'queries':>9}")
+            for name in FUNNEL:
+                s = results[mode][name]
+                queries = '-' if s['max_queries'] is None else str(s['max_queries'])
+                self.stdout.write(
+                    f"{name:<12}{s['count']:>7}{s['errors']:>5}{s['p50_ms']:>9}{s['p95_ms']:>9}{s['p99_ms']:>9}"
+                    f"{s['throughput_rps']:>9}{queries:>9}"
+                )
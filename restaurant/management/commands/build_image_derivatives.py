@@ -0,0 +1,44 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand
+
+from restaurant.images import derivative_job, render_derivatives
+from restaurant.menu_cache import bump_version
+from restaurant.models import Chef, MenuItem, Review
+
+MODELS = [(MenuItem, 'menu'), (Chef, 'chefs'), (Review, 'reviews')]
+
+
+class Command(BaseCommand):
+    help = 'Render missing WebP/JPEG derivatives for menu item, chef and review images in parallel'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Number of worker processes')
+        parser.add_argument('--force', action='store_true', help='Re-render derivatives that already exist')
+
+    def handle(self, *args, **options):
+        jobs = {}
+        for model, _ in MODELS:
+            for name in model.objects.exclude(image='').exclude(image__isnull=True).values_list('image', flat=True):
+                if name not in jobs:
+                    jobs[name] = derivative_job(name, force=options['force'])
+        jobs = {name: job for name, job in jobs.items() if job is not None}
+        if not jobs:
+            self.stdout.write(self.style.SUCCESS('All derivatives are up to date'))
+            return
+
+        written = failed = 0
+        with ProcessPoolExecutor(max_workers=max(options['workers'], 1)) as pool:
+            futures = {pool.submit(render_derivatives, *job): name for name, job in jobs.items()}
+            for future in as_completed(futures):
+                try:
+                    written += len(future.result())
+                except Exception as e:
+                    failed += 1
+                    self.stderr.write(self.style.WARNING(f'{futures[future]}: {e}'))
+
+        # Pages rendered before now point at the originals only
+        for _, version in MODELS:
+            bump_version(version)
+        self.stdout.write(self.style.SUCCESS(f'Wrote {written} derivative(s) for {len(jobs)} image(s), {failed} failed'))
@@ -0,0 +1,119 @@
+import datetime
+
+from django.contrib import admin
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, models
+from django.db.models import Q
+from django.test import RequestFactory
+from django.utils import timezone
+
+from restaurant.admin import KeysetAdmin
+from restaurant.allocation import find_free_tables
+from restaurant.models import About, Category, Chef, MenuItem, Order, OrderItem, OutboxEmail, Review, SlotCapacity
+from restaurant.pagination import older_than
+
+
+def view_querysets():
+    # Mirrors the querysets issued by restaurant/views.py and its services
+    today = datetime.date.today()
+    return [
+        ('home: featured items', MenuItem.objects.filter(is_available=True)[:6]),
+        ('home: categories count', Category.objects.values('id')),
+        ('home: chefs', Chef.objects.filter(is_active=True)[:4]),
+        ('home: reviews', Review.objects.filter(is_featured=True, is_approved=True)[:6]),
+        ('menu snapshot: categories', Category.objects.order_by('id')),
+        ('menu snapshot: items', MenuItem.objects.filter(is_available=True, category__in=[1, 2]).order_by('id')),
+        ('about', About.objects.order_by('pk')[:1]),
+        ('add_to_cart', MenuItem.objects.filter(id=1, is_available=True)),
+        ('payment: in_bulk items', MenuItem.objects.filter(is_available=True, id__in=[1, 2, 3])),
+        ('receipt: order', Order.objects.filter(order_id='ABCDEFGHIJ')[:1]),
+        ('receipt: items', OrderItem.objects.filter(order=1).select_related('menu_item')),
+        ('reservations: free tables', find_free_tables(today, datetime.time(19, 0), 4)),
+        ('reservations: availability', SlotCapacity.objects.filter(
+            date__gte=today, date__lte=today + datetime.timedelta(days=6), booked_tables__gt=0
+        ).values_list('date', 'slot', 'table_capacity', 'booked_tables')),
+        ('send_outbox: claim', OutboxEmail.objects.filter(
+            Q(status='pending', next_attempt_at__lte=timezone.now()) | Q(status='sending', claimed_at__lt=timezone.now())
+        ).order_by('next_attempt_at').values('id')[:50]),
+    ]
+
+
+def sample_filter(field):
+    # A representative lookup for an admin list_filter on this field
+    if isinstance(field, models.ForeignKey):
+        return {f'{field.name}__id__exact': 1}
+    if isinstance(field, models.BooleanField):
+        return {f'{field.name}__exact': 1}
+    if isinstance(field, models.DateTimeField):
+        start = timezone.now() - datetime.timedelta(days=7)
+        return {f'{field.name}__gte': start, f'{field.name}__lt': timezone.now()}
+    if isinstance(field, models.DateField):
+        today = datetime.date.today()
+        return {f'{field.name}__gte': today - datetime.timedelta(days=7), f'{field.name}__lt': today}
+    if field.choices:
+        return {f'{field.name}__exact': field.choices[0][0]}
+    if isinstance(field, models.IntegerField):
+        return {f'{field.name}__exact': 1}
+    return {f'{field.name}__exact': 'x'}
+
+
+def admin_querysets():
+    request = RequestFactory().get('/admin/')
+    request.user = AnonymousUser()
+    for model, model_admin in admin.site._registry.items():
+        if model._meta.app_label != 'restaurant':
+            continue
+        name = model._meta.model_name
+        ordering = model_admin.get_ordering(request) or model._meta.ordering or ['-pk']
+        queryset = model_admin.get_queryset(request).order_by(*ordering)
+        per_page = model_admin.list_per_page
+        yield f'admin {name}: changelist', queryset[:per_page]
+        if isinstance(model_admin, KeysetAdmin):
+            yield f'admin {name}: keyset page', queryset.filter(older_than(timezone.now(), 1000))[:per_page]
+        for list_filter in model_admin.list_filter:
+            if not isinstance(list_filter, str):
+                continue
+            field = model._meta.get_field(list_filter)
+            yield f'admin {name}: filter {list_filter}', queryset.filter(**sample_filter(field))[:per_page]
+
+
+def full_scans(queryset, plan):
+    # SQLite reports "SCAN <table>" for a table scan and "SCAN <table> USING ..."
+    # when it walks an index instead; PostgreSQL reports "Seq Scan"
+    scans = []
+    for line in plan.splitlines():
+        text = line.strip()
+        if 'Seq Scan' in text or ('SCAN ' in text and ' USING ' not in text and 'CONSTANT ROW' not in text):
+            scans.append(text)
+    # An unfiltered scan in primary key order that needs no sort stops at the
+    # LIMIT (e.g. an admin changelist ordered by -pk), so it is not a full scan
+    bounded = queryset.query.high_mark is not None and not queryset.query.where and 'TEMP B-TREE' not in plan
+    return [] if bounded else scans
+
+
+class Command(BaseCommand):
+    help = 'Run EXPLAIN for the querysets issued by the views and admin and report full table scans'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verbose-plans', action='store_true', help='Print every plan, not only the ones with scans')
+        parser.add_argument('--fail-on-scan', action='store_true', help='Exit with an error if any full table scan is found')
+
+    def handle(self, *args, **options):
+        flagged = 0
+        for label, queryset in [*view_querysets(), *admin_querysets()]:
+            plan = queryset.explain()
+            scans = full_scans(queryset, plan)
+            if scans:
+                flagged += 1
+                self.stdout.write(self.style.WARNING(f'[FULL SCAN] {label}'))
+            elif options['verbose_plans']:
+                self.stdout.write(self.style.SUCCESS(f'[ok] {label}'))
+            else:
+                continue
+            for line in plan.splitlines():
+                self.stdout.write(f'    {line}')
+
+        self.stdout.write(f'{flagged} queryset(s) with full table scans on {connection.vendor}')
+        if flagged and options['fail_on_scan']:
+            raise CommandError('Full table scans found')
@@ -0,0 +1,39 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from restaurant.exports import CHUNK_SIZE, EXPORTS, FORMATS, export_lines
+
+
+def date_argument(value):
+    date = parse_date(value)
+    if date is None:
+        raise ValueError(value)
+    return date
+
+
+class Command(BaseCommand):
+    help = 'Stream orders or reservations as CSV or JSONL, optionally limited to a date range'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=list(EXPORTS))
+        parser.add_argument('--format', choices=list(FORMATS), default='csv')
+        parser.add_argument('--since', type=date_argument, help='First date to include (YYYY-MM-DD)')
+        parser.add_argument('--until', type=date_argument, help='Last date to include (YYYY-MM-DD)')
+        parser.add_argument('--output', help='File to write; standard output by default')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='Rows fetched per query')
+
+    def handle(self, *args, **options):
+        if options['since'] and options['until'] and options['since'] > options['until']:
+            raise CommandError('--since must not be after --until')
+        lines = export_lines(options['kind'], options['format'], since=options['since'], until=options['until'],
+                             chunk_size=options['chunk_size'])
+        if options['output']:
+            with open(options['output'], 'w', newline='', encoding='utf-8') as f:
+                f.writelines(lines)
+        else:
+            # Bypass OutputWrapper, which would add a newline after every line
+            out = getattr(self.stdout, '_out', sys.stdout)
+            for line in lines:
+                out.write(line)
@@ -1,5 +1,7 @@
 from django.core.management.base import BaseCommand
+from restaurant.menu_cache import bump_version
 from restaurant.models import Chef, Review
+from restaurant.seeding import bulk_upsert
 
 class Command(BaseCommand):
     help = 'Populate the database with sample chefs and reviews'
@@ -41,11 +43,8 @@ class Command(BaseCommand):
             }
         ]
 
-        for chef_data in chefs_data:
-            Chef.objects.get_or_create(
-                name=chef_data['name'],
-                defaults=chef_data
-            )
+        bulk_upsert(Chef, [Chef(**chef_data) for chef_data in chefs_data], update=False)
+        bump_version('chefs')
 
         # Create Reviews
         reviews_data = [
@@ -87,10 +86,13 @@ class Command(BaseCommand):
             }
         ]
 
-        for review_data in reviews_data:
-            Review.objects.get_or_create(
-                customer_name=review_data['customer_name'],
-                defaults=review_data
-            )
+        # Reviews have no unique key, so skip customers who already have one
+        existing = set(Review.objects.filter(
+            customer_name__in=[review_data['customer_name'] for review_data in reviews_data]
+        ).values_list('customer_name', flat=True))
+        bulk_upsert(Review, [
+            Review(**review_data) for review_data in reviews_data if review_data['customer_name'] not in existing
+        ])
+        bump_version('reviews')
 
         self.stdout.write(self.style.SUCCESS('Successfully populated chefs and reviews!'))
@@ -1,30 +1,24 @@
 from django.core.management.base import BaseCommand
+from restaurant.menu_cache import bump_menu_version
 from restaurant.models import Category, MenuItem, About
+from restaurant.seeding import bulk_upsert
 
 class Command(BaseCommand):
     help = 'Populate the database with sample menu items'
 
     def handle(self, *args, **kwargs):
-        # Create categories
-        appetizers = Category.objects.get_or_create(
-            name='Appetizers',
-            defaults={'description': 'Start your meal with our delicious starters'}
-        )[0]
-        
-        main_courses = Category.objects.get_or_create(
-            name='Main Courses',
-            defaults={'description': 'Our signature main dishes'}
-        )[0]
-        
-        desserts = Category.objects.get_or_create(
-            name='Desserts',
-            defaults={'description': 'Sweet endings to your perfect meal'}
-        )[0]
-        
-        beverages = Category.objects.get_or_create(
-            name='Beverages',
-            defaults={'description': 'Refreshing drinks to complement your meal'}
-        )[0]
+        # Create categories; existing ones are left as they are
+        bulk_upsert(Category, [
+            Category(name='Appetizers', description='Start your meal with our delicious starters'),
+            Category(name='Main Courses', description='Our signature main dishes'),
+            Category(name='Desserts', description='Sweet endings to your perfect meal'),
+            Category(name='Beverages', description='Refreshing drinks to complement your meal'),
+        ], update=False)
+        categories = Category.objects.in_bulk(['Appetizers', 'Main Courses', 'Desserts', 'Beverages'], field_name='name')
+        appetizers = categories['Appetizers']
+        main_courses = categories['Main Courses']
+        desserts = categories['Desserts']
+        beverages = categories['Beverages']
 
         # Create menu items
         menu_items = [
@@ -145,11 +139,8 @@ class Command(BaseCommand):
             },
         ]
 
-        for item_data in menu_items:
-            MenuItem.objects.get_or_create(
-                name=item_data['name'],
-                defaults=item_data
-            )
+        bulk_upsert(MenuItem, [MenuItem(**item_data) for item_data in menu_items], update=False)
+        bump_menu_version()
 
         # Create About content
         About.objects.get_or_create(
@@ -0,0 +1,46 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Min
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from restaurant.models import Order
+from restaurant.sales import rebuild_sales
+
+
+def date_argument(value):
+    date = parse_date(value)
+    if date is None:
+        raise ValueError(value)
+    return date
+
+
+class Command(BaseCommand):
+    help = 'Recompute the daily sales rollups from completed orders, one day per transaction'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', type=date_argument, help='First day to rebuild (default: the first order)')
+        parser.add_argument('--until', type=date_argument, help='Last day to rebuild (default: today)')
+
+    def handle(self, *args, **options):
+        since = options['since']
+        if since is None:
+            first = Order.objects.aggregate(first=Min('created_at'))['first']
+            if first is None:
+                self.stdout.write('No orders to roll up')
+                return
+            since = timezone.localdate(first)
+        until = options['until'] or timezone.localdate()
+        if since > until:
+            raise CommandError('--since must not be after --until')
+
+        days = orders = 0
+        date = since
+        while date <= until:
+            rollup = rebuild_sales(date)
+            if rollup:
+                days += 1
+                orders += rollup.order_count
+            date += datetime.timedelta(days=1)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {since} to {until}: {orders} orders on {days} days'))
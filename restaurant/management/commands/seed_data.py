@@ -0,0 +1,54 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from restaurant import seeding
+
+GENERATORS = {
+    'categories': lambda size, rng, options: seeding.seed_categories(update=not options['skip_existing']),
+    'menu': lambda size, rng, options: seeding.seed_menu(size, rng, update=not options['skip_existing'],
+                                                         chunk_size=options['chunk_size']),
+    'chefs': lambda size, rng, options: seeding.seed_chefs(size, rng, update=not options['skip_existing'],
+                                                           chunk_size=options['chunk_size']),
+    'reviews': lambda size, rng, options: seeding.seed_reviews(size, options['days'], rng, chunk_size=options['chunk_size']),
+    'orders': lambda size, rng, options: seeding.seed_orders(size, options['days'], rng, chunk_size=options['chunk_size']),
+    'reservations': lambda size, rng, options: seeding.seed_reservations(size, options['days'], rng,
+                                                                         chunk_size=options['chunk_size']),
+}
+LOADERS = {
+    'categories': seeding.load_categories,
+    'menu': seeding.load_menu,
+    'chefs': seeding.load_chefs,
+    'reviews': seeding.load_reviews,
+    'orders': seeding.load_orders,
+    'reservations': seeding.load_reservations,
+}
+
+
+class Command(BaseCommand):
+    help = 'Bulk load generated or file-supplied categories, menu items, chefs, reviews, orders or reservations'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=list(LOADERS))
+        source = parser.add_mutually_exclusive_group(required=True)
+        source.add_argument('--size', type=int, help='Number of rows to generate')
+        source.add_argument('--file', help='CSV, JSON or JSONL file of rows to load')
+        parser.add_argument('--chunk-size', type=int, default=seeding.CHUNK_SIZE, help='Rows per transaction')
+        parser.add_argument('--skip-existing', action='store_true',
+                            help='Leave rows whose natural key already exists instead of updating them')
+        parser.add_argument('--days', type=int, default=365, help='Spread generated history over this many days')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for generated rows')
+
+    def handle(self, *args, **options):
+        kind = options['kind']
+        start = time.perf_counter()
+        if options['file']:
+            try:
+                count = LOADERS[kind](seeding.read_rows(options['file']), update=not options['skip_existing'],
+                                      chunk_size=options['chunk_size'])
+            except (OSError, ValueError, KeyError) as e:
+                raise CommandError(f'Could not load {options["file"]}: {e!r}')
+        else:
+            count = GENERATORS[kind](options['size'], random.Random(options['seed']), options)
+        self.stdout.write(self.style.SUCCESS(f'Wrote {count} {kind} in {time.perf_counter() - start:.1f}s'))
@@ -0,0 +1,40 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from restaurant.outbox import claim_batch, deliver_batch, process_batch
+
+
+class Command(BaseCommand):
+    help = 'Deliver queued confirmation emails from the outbox'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help='Number of delivery threads')
+        parser.add_argument('--batch-size', type=int, default=50, help='Emails sent per SMTP connection')
+        parser.add_argument('--loop', action='store_true', help='Keep polling the outbox instead of exiting when it is empty')
+        parser.add_argument('--interval', type=float, default=5.0, help='Seconds to wait between polls with --loop')
+
+    def handle(self, *args, **options):
+        workers = max(options['workers'], 1)
+        batch_size = max(options['batch_size'], 1)
+
+        # Drain everything that is due; with --loop, keep polling afterwards
+        while True:
+            sent, failed = self.run_once(workers, batch_size)
+            if sent or failed:
+                self.stdout.write(f'Sent {sent} email(s), {failed} failed')
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS('Outbox processed'))
+
+    def run_once(self, workers, batch_size):
+        if workers == 1:
+            return deliver_batch(claim_batch(batch_size))
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(process_batch, [batch_size] * workers))
+        return sum(r[0] for r in results), sum(r[1] for r in results)
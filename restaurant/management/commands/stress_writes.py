@@ -0,0 +1,63 @@
+import random
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+
+from restaurant.benchmark import WriteRecorder, run_write_stress
+from restaurant.models import Table
+from restaurant.seeding import seed_menu
+
+
+class Command(BaseCommand):
+    help = 'Pay for orders and book tables from concurrent threads against a scratch SQLite database; fails on any failed write'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=str(settings.BASE_DIR / 'stress.sqlite3'),
+                            help='Scratch database file, deleted afterwards')
+        parser.add_argument('--workers', type=int, default=8, help='Concurrent guests')
+        parser.add_argument('--rounds', type=int, default=25, help='Payments and bookings per guest')
+        parser.add_argument('--untuned', action='store_true',
+                            help="Use Django's default SQLite setup instead of the production profile, for comparison")
+
+    def handle(self, *args, **options):
+        settings_dict = connection.settings_dict
+        if settings_dict['ENGINE'] != 'django.db.backends.sqlite3':
+            raise CommandError('stress_writes runs against SQLite')
+        # The production profile (SQLITE_PRODUCTION) whether or not this
+        # process has it switched on, or none of it with --untuned
+        saved_options = settings_dict.get('OPTIONS', {})
+        if options['untuned']:
+            settings_dict['OPTIONS'] = {k: v for k, v in saved_options.items() if k != 'transaction_mode'}
+            overrides = {'SQLITE_PRAGMAS': {}}
+        else:
+            settings_dict['OPTIONS'] = {**saved_options, **settings.SQLITE_PRODUCTION_OPTIONS}
+            overrides = {'SQLITE_PRAGMAS': settings.SQLITE_PRODUCTION_PRAGMAS}
+
+        # A throwaway database through the test machinery, as in benchmark
+        setup_test_environment()
+        settings_dict.setdefault('TEST', {})['NAME'] = options['database']
+        try:
+            with override_settings(ALLOWED_HOSTS=['*'], DEBUG=False, **overrides):
+                old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+                try:
+                    seed_menu(50, rng=random.Random(42))
+                    Table.objects.bulk_create([Table(number=n, capacity=4) for n in range(1, 11)], ignore_conflicts=True)
+                    recorder = WriteRecorder()
+                    elapsed = run_write_stress(recorder, options['workers'], options['rounds'])
+                finally:
+                    connection.creation.destroy_test_db(old_name, verbosity=0)
+        finally:
+            settings_dict['OPTIONS'] = saved_options
+            teardown_test_environment()
+
+        total = sum(sum(outcomes.values()) for outcomes in recorder.outcomes.values())
+        self.stdout.write(f"{options['workers']} workers, {total} writes in {elapsed:.1f}s ({total / elapsed:.0f}/s)")
+        for name, outcomes in recorder.outcomes.items():
+            for outcome, count in outcomes.most_common():
+                self.stdout.write(f'{name:<12}{count:>6}  {outcome}')
+        failures = recorder.failures()
+        if failures:
+            raise CommandError(f'{failures} of {total} writes failed')
+        self.stdout.write(self.style.SUCCESS('No failed writes'))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from restaurant.routers import replica_alias
+
+
+class Command(BaseCommand):
+    help = 'Copy the primary SQLite database into the replica, for running with a local stand-in replica'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', help='Replica alias (default: REPLICA_DATABASE)')
+
+    def handle(self, *args, **options):
+        alias = options['database'] or replica_alias()
+        if not alias or alias not in connections:
+            raise CommandError('No replica configured: set REPLICA_DATABASE or pass --database')
+        source, target = connections[DEFAULT_DB_ALIAS], connections[alias]
+        if source.vendor != 'sqlite' or target.vendor != 'sqlite':
+            raise CommandError('sync_replica copies SQLite files; a real replica is fed by database replication')
+
+        # SQLite's online backup: a consistent copy, schema included, taken
+        # while the primary stays in use
+        source.ensure_connection()
+        target.ensure_connection()
+        source.connection.backup(target.connection)
+        self.stdout.write(self.style.SUCCESS(f'Copied {source.settings_dict["NAME"]} to {target.settings_dict["NAME"]}'))
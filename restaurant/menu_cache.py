@@ -0,0 +1,177 @@
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import Prefetch
+from django.utils.functional import cached_property
+
+from .images import image_sources
+from .models import Category, MenuItem
+from .search import SearchIndex
+
+VERSION_KEY = 'restaurant:{name}:version'
+MENU_SNAPSHOT_KEY = 'restaurant:menu:snapshot:{version}'
+LIST_KEY = 'restaurant:{name}:list:{version}'
+
+# Per-process copy of the last snapshot as one (version, snapshot) tuple,
+# replaced whole so a reader never pairs one version with another's snapshot
+_local = (None, None)
+_lock = threading.Lock()
+
+
+class MenuSnapshot:
+    """Pre-filtered, read-only copy of the menu: only available items, plain dicts."""
+
+    def __init__(self, categories):
+        self.categories = categories
+        self.items = {item['id']: item for category in categories for item in category['items']}
+
+    def get_item(self, item_id):
+        return self.items.get(int(item_id))
+
+    def first_items(self, limit):
+        return [self.items[item_id] for item_id in sorted(self.items)[:limit]]
+
+    @cached_property
+    def search_index(self):
+        # Built on the first search in each process, and never cached with
+        # the snapshot (see __getstate__)
+        return SearchIndex(self.items.values(), {category['id']: category['name'] for category in self.categories})
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop('search_index', None)
+        return state
+
+
+def get_menu_cache():
+    return caches[getattr(settings, 'MENU_CACHE_ALIAS', 'default')]
+
+
+def _initial_version():
+    # A timestamp, so a flushed or evicted key never reuses an old version
+    return int(time.time() * 1000)
+
+
+def get_versions(*names):
+    """Current version of each named content group, e.g. get_versions('menu', 'chefs')."""
+    cache = get_menu_cache()
+    keys = {name: VERSION_KEY.format(name=name) for name in names}
+    found = cache.get_many(keys.values())
+    versions = {}
+    for name, key in keys.items():
+        if key not in found:
+            cache.add(key, _initial_version(), None)
+            found[key] = cache.get(key)
+        versions[name] = found[key]
+    return versions
+
+
+async def aget_versions(*names):
+    """get_versions() for async views."""
+    cache = get_menu_cache()
+    keys = {name: VERSION_KEY.format(name=name) for name in names}
+    found = await cache.aget_many(keys.values())
+    versions = {}
+    for name, key in keys.items():
+        if key not in found:
+            await cache.aadd(key, _initial_version(), None)
+            found[key] = await cache.aget(key)
+        versions[name] = found[key]
+    return versions
+
+
+def bump_version(name):
+    cache = get_menu_cache()
+    key = VERSION_KEY.format(name=name)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, _initial_version(), None)
+
+
+def get_menu_version():
+    return get_versions('menu')['menu']
+
+
+def bump_menu_version():
+    bump_version('menu')
+
+
+def build_menu_snapshot():
+    # Read from the primary: the snapshot is cached under the version that was
+    # just bumped, and a lagging replica would freeze stale rows under it
+    available_items = Prefetch('items', queryset=MenuItem.objects.filter(is_available=True).order_by('id'))
+    categories = []
+    for category in Category.objects.using(DEFAULT_DB_ALIAS).order_by('id').prefetch_related(available_items):
+        categories.append({
+            'id': category.id,
+            'name': category.name,
+            'description': category.description,
+            'items': [{
+                'id': item.id,
+                'name': item.name,
+                'description': item.description,
+                'price': item.price,
+                'image_url': item.image.url if item.image else '',
+                'image_sources': image_sources(item.image.name),
+                'category_id': category.id,
+            } for item in category.items.all()],
+        })
+    return MenuSnapshot(categories)
+
+
+def get_menu_snapshot():
+    global _local
+    version = get_menu_version()
+    local_version, snapshot = _local
+    if snapshot is not None and local_version == version:
+        return snapshot
+
+    with _lock:
+        local_version, snapshot = _local
+        if snapshot is not None and local_version == version:
+            return snapshot
+
+        cache = get_menu_cache()
+        key = MENU_SNAPSHOT_KEY.format(version=version)
+        snapshot = cache.get(key)
+        if snapshot is None:
+            snapshot = build_menu_snapshot()
+            cache.set(key, snapshot, getattr(settings, 'MENU_CACHE_TIMEOUT', 60 * 60 * 24))
+
+        _local = (version, snapshot)
+    return snapshot
+
+
+async def aget_menu_snapshot():
+    # The per-process copy is returned without leaving the event loop; only a
+    # rebuild, once per menu version, runs in a thread (behind the same lock)
+    version = (await aget_versions('menu'))['menu']
+    local_version, snapshot = _local
+    if snapshot is not None and local_version == version:
+        return snapshot
+    return await sync_to_async(get_menu_snapshot)()
+
+
+async def aget_cached_list(name, version, queryset):
+    """
+    The rows of queryset, read with async iteration (from the primary, as
+    for the snapshot) and cached under the given version of content group
+    `name` until it is bumped.
+    """
+    cache = get_menu_cache()
+    key = LIST_KEY.format(name=name, version=version)
+    rows = await cache.aget(key)
+    if rows is None:
+        rows = [obj async for obj in queryset.using(DEFAULT_DB_ALIAS)]
+        await cache.aset(key, rows, getattr(settings, 'MENU_CACHE_TIMEOUT', 60 * 60 * 24))
+    return rows
+
+
+def clear_local_menu_snapshot():
+    global _local
+    _local = (None, None)
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurant', '0005_outboxemail'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Table',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.PositiveIntegerField(unique=True)),
+                ('capacity', models.PositiveIntegerField(help_text='Maximum number of guests')),
+                ('is_active', models.BooleanField(default=True)),
+            ],
+            options={
+                'ordering': ['number'],
+            },
+        ),
+        migrations.CreateModel(
+            name='TableSlot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('slot', models.PositiveSmallIntegerField(help_text='Index of the slot within the day')),
+                ('reservation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='table_slots', to='restaurant.reservation')),
+                ('table', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='slots', to='restaurant.table')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['date', 'slot'], name='restaurant__date_aa544e_idx')],
+                'constraints': [models.UniqueConstraint(fields=('table', 'date', 'slot'), name='unique_table_slot')],
+            },
+        ),
+    ]
@@ -0,0 +1,43 @@
+from django.db import migrations
+
+# Twenty tables, matching the 1-20 range reservations were assigned from before
+DEFAULT_TABLES = [2] * 6 + [4] * 8 + [6] * 4 + [8, 10]
+
+SLOT_MINUTES = 30
+DURATION_MINUTES = 120
+
+
+def seed_tables(apps, schema_editor):
+    Table = apps.get_model('restaurant', 'Table')
+    TableSlot = apps.get_model('restaurant', 'TableSlot')
+    Reservation = apps.get_model('restaurant', 'Reservation')
+
+    if not Table.objects.exists():
+        Table.objects.bulk_create([
+            Table(number=number, capacity=capacity) for number, capacity in enumerate(DEFAULT_TABLES, start=1)
+        ])
+
+    # Reserve slots for existing bookings; clashes from the old random
+    # assignment are kept as they are rather than failing the migration
+    tables = {table.number: table for table in Table.objects.all()}
+    slots = []
+    for reservation in Reservation.objects.exclude(status='cancelled').exclude(table_number=None):
+        table = tables.get(reservation.table_number)
+        if table is None:
+            continue
+        start = reservation.time.hour * 60 + reservation.time.minute
+        end = start + DURATION_MINUTES
+        for slot in range(start // SLOT_MINUTES, (end - 1) // SLOT_MINUTES + 1):
+            slots.append(TableSlot(table=table, reservation=reservation, date=reservation.date, slot=slot))
+    TableSlot.objects.bulk_create(slots, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurant', '0006_table_tableslot'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_tables, migrations.RunPython.noop),
+    ]
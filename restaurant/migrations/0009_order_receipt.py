@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurant', '0008_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='receipt',
+            field=models.JSONField(blank=True, editable=False, help_text='Frozen receipt of a completed order', null=True),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:22
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def count_booked_slots(apps, schema_editor):
+    TableSlot = apps.get_model('restaurant', 'TableSlot')
+    SlotCapacity = apps.get_model('restaurant', 'SlotCapacity')
+    counts = TableSlot.objects.values('date', 'slot', 'table__capacity').annotate(booked=Count('id')).order_by()
+    SlotCapacity.objects.bulk_create([
+        SlotCapacity(date=row['date'], slot=row['slot'], table_capacity=row['table__capacity'], booked_tables=row['booked'])
+        for row in counts
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurant', '0009_order_receipt'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlotCapacity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('slot', models.PositiveSmallIntegerField(help_text='Index of the slot within the day')),
+                ('table_capacity', models.PositiveIntegerField()),
+                ('booked_tables', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name_plural': 'Slot capacities',
+                'constraints': [models.UniqueConstraint(fields=('date', 'slot', 'table_capacity'), name='unique_slot_capacity')],
+            },
+        ),
+        migrations.RunPython(count_booked_slots, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:32
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def rename_duplicates(apps, schema_editor):
+    # Older databases may repeat names; keep the first and suffix the rest
+    # with their id so the unique constraints can be added
+    for model_name, key in (('Category', ['name']), ('Chef', ['name']), ('MenuItem', ['category', 'name'])):
+        model = apps.get_model('restaurant', model_name)
+        for row in model.objects.values(*key).annotate(n=Count('id')).filter(n__gt=1).order_by():
+            for obj in model.objects.filter(**{field: row[field] for field in key}).order_by('id')[1:]:
+                obj.name = f'{obj.name} ({obj.pk})'
+                obj.save(update_fields=['name'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurant', '0010_slotcapacity'),
+    ]
+
+    operations = [
+        migrations.RunPython(rename_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='category',
+            constraint=models.UniqueConstraint(fields=('name',), name='unique_category_name'),
+        ),
+        migrations.AddConstraint(
+            model_name='chef',
+            constraint=models.UniqueConstraint(fields=('name',), name='unique_chef_name'),
+        ),
+        migrations.AddConstraint(
+            model_name='menuitem',
+            constraint=models.UniqueConstraint(fields=('category', 'name'), name='unique_menuitem_category_name'),
+        ),
+    ]
@@ -1,4 +1,8 @@
+from decimal import Decimal
+
 from django.db import models
+from django.db.models import Q
+from django.utils import timezone
 
 class Category(models.Model):
     name = models.CharField(max_length=100)
@@ -6,6 +10,9 @@ class Category(models.Model):
     
     class Meta:
         verbose_name_plural = "Categories"
+        constraints = [
+            models.UniqueConstraint(fields=['name'], name='unique_category_name'),
+        ]
     
     def __str__(self):
         return self.name
@@ -19,6 +26,17 @@ class MenuItem(models.Model):
     is_available = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     
+    class Meta:
+        indexes = [
+            # Partial: SQLite compiles filter(is_available=True) to a bare
+            # `WHERE is_available`, which only a matching partial index serves
+            models.Index(fields=['category', 'id'], condition=Q(is_available=True), name='menuitem_available_idx'),
+        ]
+        constraints = [
+            # Natural keys for bulk upserts (see seeding.py)
+            models.UniqueConstraint(fields=['category', 'name'], name='unique_menuitem_category_name'),
+        ]
+    
     def __str__(self):
         return self.name
 
@@ -40,6 +58,11 @@ class Contact(models.Model):
     message = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
     
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at'], name='contact_created_idx'),
+        ]
+    
     def __str__(self):
         return f"{self.name} - {self.subject}"
 
@@ -59,6 +82,13 @@ class Reservation(models.Model):
         ('cancelled', 'Cancelled')
     ], default='pending')
     
+    class Meta:
+        indexes = [
+            models.Index(fields=['date', 'time', 'status'], name='reservation_date_time_idx'),
+            models.Index(fields=['status', 'date'], name='reservation_status_date_idx'),
+            models.Index(fields=['created_at'], name='reservation_created_idx'),
+        ]
+    
     def __str__(self):
         return f"{self.name} - {self.date} at {self.time}"
 
@@ -76,6 +106,13 @@ class Order(models.Model):
         ('failed', 'Failed')
     ], default='pending')
     created_at = models.DateTimeField(auto_now_add=True)
+    receipt = models.JSONField(null=True, blank=True, editable=False, help_text="Frozen receipt of a completed order")
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at'], name='order_created_idx'),
+            models.Index(fields=['payment_status', 'created_at'], name='order_status_created_idx'),
+        ]
     
     def __str__(self):
         return f"Order {self.order_id} - {self.customer_name}"
@@ -104,6 +141,12 @@ class Chef(models.Model):
     
     class Meta:
         ordering = ['order', 'name']
+        indexes = [
+            models.Index(fields=['order', 'name'], condition=Q(is_active=True), name='chef_active_order_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['name'], name='unique_chef_name'),
+        ]
     
     def __str__(self):
         return f"{self.name} - {self.position}"
@@ -125,9 +168,143 @@ class Review(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at'], name='review_created_idx'),
+            # Home page: featured, approved reviews, newest first
+            models.Index(fields=['-created_at'], condition=Q(is_featured=True, is_approved=True), name='review_featured_idx'),
+        ]
     
     def __str__(self):
         return f"{self.customer_name} - {self.rating} stars"
     
     def get_stars(self):
         return '⭐' * self.rating
+
+class OutboxEmail(models.Model):
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=254, blank=True)
+    recipient = models.EmailField()
+    status = models.CharField(max_length=20, choices=[
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed')
+    ], default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    claim_token = models.CharField(max_length=32, blank=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        verbose_name_plural = "Outbox emails"
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.subject} -> {self.recipient} ({self.status})"
+
+class Table(models.Model):
+    number = models.PositiveIntegerField(unique=True)
+    capacity = models.PositiveIntegerField(help_text="Maximum number of guests")
+    is_active = models.BooleanField(default=True)
+    
+    class Meta:
+        ordering = ['number']
+        indexes = [
+            models.Index(fields=['capacity', 'number'], condition=Q(is_active=True), name='table_active_capacity_idx'),
+        ]
+    
+    def __str__(self):
+        return f"Table {self.number} ({self.capacity} seats)"
+
+class TableSlot(models.Model):
+    # One row per table per time slot a reservation occupies. The unique
+    # constraint is what stops two concurrent bookings taking the same table.
+    table = models.ForeignKey(Table, on_delete=models.CASCADE, related_name='slots')
+    reservation = models.ForeignKey(Reservation, on_delete=models.CASCADE, related_name='table_slots')
+    date = models.DateField()
+    slot = models.PositiveSmallIntegerField(help_text="Index of the slot within the day")
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['table', 'date', 'slot'], name='unique_table_slot'),
+        ]
+        indexes = [
+            models.Index(fields=['date', 'slot']),
+        ]
+    
+    def __str__(self):
+        return f"{self.table} - {self.date} slot {self.slot}"
+
+class SlotCapacity(models.Model):
+    # Running count of tables of each size held in each slot of a day, kept
+    # in step with TableSlot so availability never aggregates reservations
+    date = models.DateField()
+    slot = models.PositiveSmallIntegerField(help_text="Index of the slot within the day")
+    table_capacity = models.PositiveIntegerField()
+    booked_tables = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        verbose_name_plural = "Slot capacities"
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'slot', 'table_capacity'], name='unique_slot_capacity'),
+        ]
+    
+    def __str__(self):
+        return f"{self.date} slot {self.slot}: {self.booked_tables} x {self.table_capacity}-seat"
+
+class DailySales(models.Model):
+    # Completed orders per local day, added to as orders are paid so that
+    # reports never aggregate Order/OrderItem (see sales.py)
+    date = models.DateField(unique=True)
+    order_count = models.PositiveIntegerField(default=0)
+    items_sold = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    
+    class Meta:
+        ordering = ['-date']
+        verbose_name_plural = "Daily sales"
+    
+    @property
+    def average_ticket(self):
+        if not self.order_count:
+            return Decimal('0.00')
+        return (self.revenue / self.order_count).quantize(Decimal('0.01'))
+    
+    def __str__(self):
+        return f"{self.date}: {self.order_count} orders, {self.revenue}"
+
+class DailyItemSales(models.Model):
+    date = models.DateField()
+    menu_item = models.ForeignKey(MenuItem, on_delete=models.CASCADE, related_name='daily_sales')
+    quantity = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    
+    class Meta:
+        verbose_name_plural = "Daily item sales"
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'menu_item'], name='unique_daily_item_sales'),
+        ]
+    
+    def __str__(self):
+        return f"{self.date} {self.menu_item}: {self.quantity}"
+
+class DailyCategorySales(models.Model):
+    date = models.DateField()
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='daily_sales')
+    quantity = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    
+    class Meta:
+        verbose_name_plural = "Daily category sales"
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'category'], name='unique_daily_category_sales'),
+        ]
+    
+    def __str__(self):
+        return f"{self.date} {self.category}: {self.quantity}"
@@ -0,0 +1,138 @@
+import os
+import random
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Crockford base32: no I, L, O or U, so IDs read back unambiguously
+ALPHABET = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'
+
+EPOCH_MS = 1735689600000  # 2025-01-01 00:00 UTC
+NODE_BITS = 10
+SEQUENCE_BITS = 12
+MAX_NODE = (1 << NODE_BITS) - 1
+MAX_SEQUENCE = (1 << SEQUENCE_BITS) - 1
+# 41 bits of milliseconds + node + sequence fit in 13 base32 characters
+ID_LENGTH = 13
+
+
+def encode(value):
+    chars = []
+    for _ in range(ID_LENGTH):
+        value, index = divmod(value, 32)
+        chars.append(ALPHABET[index])
+    return ''.join(reversed(chars))
+
+
+def decode(order_id):
+    value = 0
+    for char in order_id:
+        value = value * 32 + ALPHABET.index(char)
+    return value
+
+
+# Lock files of the nodes this process holds; kept open until it exits
+_claimed_nodes = []
+
+
+def claim_node(directory):
+    """
+    Lock a node file no other live process on this host holds and keep it
+    locked for the life of the process. Returns None when no node is free or
+    file locks are unavailable.
+
+    Nodes are tried from a random starting point so that hosts sharing a
+    database rarely pick the same one.
+    """
+    if fcntl is None:
+        return None
+    os.makedirs(directory, exist_ok=True)
+    start = random.randrange(MAX_NODE + 1)
+    for offset in range(MAX_NODE + 1):
+        node = (start + offset) & MAX_NODE
+        handle = open(os.path.join(directory, f'node-{node}.lock'), 'a')
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            handle.close()
+            continue
+        _claimed_nodes.append(handle)
+        return node
+    return None
+
+
+class SnowflakeGenerator:
+    """
+    Snowflake-style order IDs: milliseconds since EPOCH_MS, a node number and
+    a per-millisecond sequence, written as fixed-width base32.
+
+    IDs from one generator are strictly increasing and sort by creation time,
+    so new orders land at the end of the order_id index. IDs from different
+    processes cannot collide as long as each process has its own node number.
+    The node is resolved in each process, after any fork: the ORDER_ID_NODE
+    environment variable (set per worker, e.g. from the server's post-fork
+    hook), else a node claimed with a lock file in ORDER_ID_NODE_DIR, else a
+    random one.
+    """
+
+    def __init__(self, node=None):
+        self._configured_node = node
+        self._reset()
+
+    def _reset(self):
+        self._lock = threading.Lock()
+        self.node = None
+        self._last_ms = -1
+        self._sequence = 0
+
+    def _resolve_node(self):
+        node = self._configured_node
+        if node is None and os.environ.get('ORDER_ID_NODE'):
+            node = int(os.environ['ORDER_ID_NODE'])
+        if node is None:
+            directory = getattr(settings, 'ORDER_ID_NODE_DIR', None)
+            node = claim_node(directory or os.path.join(tempfile.gettempdir(), 'restaurant-order-id-nodes'))
+        if node is None:
+            node = random.randrange(MAX_NODE + 1)
+        return node & MAX_NODE
+
+    def __call__(self):
+        with self._lock:
+            if self.node is None:
+                self.node = self._resolve_node()
+            now = int(time.time() * 1000) - EPOCH_MS
+            if now > self._last_ms:
+                self._last_ms = now
+                self._sequence = 0
+            else:
+                # Same millisecond, or the clock stepped back: keep counting
+                # from the last timestamp, borrowing the next millisecond when
+                # the sequence runs out
+                self._sequence += 1
+                if self._sequence > MAX_SEQUENCE:
+                    self._last_ms += 1
+                    self._sequence = 0
+            value = (self._last_ms << (NODE_BITS + SEQUENCE_BITS)) | (self.node << SEQUENCE_BITS) | self._sequence
+        return encode(value)
+
+
+_default_generator = SnowflakeGenerator()
+
+# A forked worker must not continue its parent's sequence under the parent's node
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_default_generator._reset)
+
+
+def new_order_id():
+    path = getattr(settings, 'ORDER_ID_GENERATOR', None)
+    if path:
+        return import_string(path)()
+    return _default_generator()
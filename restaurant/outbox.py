@@ -0,0 +1,98 @@
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import close_old_connections
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import OutboxEmail
+
+
+def queue_email(subject, message, recipient, from_email=None):
+    return OutboxEmail.objects.create(
+        subject=subject,
+        body=message,
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+        recipient=recipient
+    )
+
+
+def retry_delay(attempts):
+    # Exponential backoff: base, 2x base, 4x base, ... capped at one hour
+    base = getattr(settings, 'EMAIL_OUTBOX_RETRY_DELAY', 60)
+    return timedelta(seconds=min(base * 2 ** (attempts - 1), 60 * 60))
+
+
+def claim_batch(batch_size):
+    """
+    Mark up to batch_size due emails as 'sending' under a fresh claim token
+    and return them. The conditional UPDATE means two workers never claim the
+    same row; rows stuck in 'sending' by a crashed worker are reclaimed.
+    """
+    now = timezone.now()
+    stale = now - timedelta(seconds=getattr(settings, 'EMAIL_OUTBOX_CLAIM_TIMEOUT', 10 * 60))
+    due = Q(status='pending', next_attempt_at__lte=now) | Q(status='sending', claimed_at__lt=stale)
+    ids = list(OutboxEmail.objects.filter(due).order_by('next_attempt_at').values_list('id', flat=True)[:batch_size])
+    if not ids:
+        return []
+
+    token = uuid.uuid4().hex
+    OutboxEmail.objects.filter(due, id__in=ids).update(status='sending', claim_token=token, claimed_at=now)
+    return list(OutboxEmail.objects.filter(claim_token=token, status='sending'))
+
+
+def deliver_batch(emails):
+    """Send a claimed batch over one reused connection and record each result."""
+    if not emails:
+        return 0, 0
+
+    max_attempts = getattr(settings, 'EMAIL_OUTBOX_MAX_ATTEMPTS', 5)
+    sent = failed = 0
+    connection = get_connection()
+    try:
+        connection.open()
+    except Exception as e:
+        for email in emails:
+            _record_failure(email, e, max_attempts)
+        return 0, len(emails)
+
+    try:
+        for email in emails:
+            message = EmailMessage(email.subject, email.body, email.from_email, [email.recipient], connection=connection)
+            try:
+                connection.send_messages([message])
+            except Exception as e:
+                _record_failure(email, e, max_attempts)
+                failed += 1
+            else:
+                email.status = 'sent'
+                email.attempts += 1
+                email.sent_at = timezone.now()
+                email.last_error = ''
+                email.save(update_fields=['status', 'attempts', 'sent_at', 'last_error'])
+                sent += 1
+    finally:
+        connection.close()
+    return sent, failed
+
+
+def _record_failure(email, error, max_attempts):
+    email.attempts += 1
+    email.last_error = str(error)
+    if email.attempts >= max_attempts:
+        email.status = 'failed'
+    else:
+        email.status = 'pending'
+        email.next_attempt_at = timezone.now() + retry_delay(email.attempts)
+    email.save(update_fields=['status', 'attempts', 'last_error', 'next_attempt_at'])
+
+
+def process_batch(batch_size):
+    # Entry point for worker threads: each thread uses its own DB and SMTP connection
+    close_old_connections()
+    try:
+        return deliver_batch(claim_batch(batch_size))
+    finally:
+        close_old_connections()
@@ -0,0 +1,106 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.dateparse import parse_datetime
+
+from .models import Order
+
+RECEIPT_KEY = 'restaurant:receipt:{order_id}'
+
+
+def get_receipt_cache():
+    return caches[getattr(settings, 'RECEIPT_CACHE_ALIAS', 'default')]
+
+
+def build_receipt(order, order_items):
+    """
+    The receipt as plain JSON data: money as strings, lines as
+    [name, quantity, price, total]. Stored on Order.receipt and in the cache.
+    """
+    return {
+        'order_id': order.order_id,
+        'customer_name': order.customer_name,
+        'customer_email': order.customer_email,
+        'customer_phone': order.customer_phone,
+        'table_number': order.table_number,
+        'payment_method': order.payment_method,
+        'payment_status': order.payment_status,
+        'total_amount': f'{order.total_amount:.2f}',
+        'created_at': order.created_at.isoformat(),
+        'items': [
+            [item.menu_item.name, item.quantity, f'{item.price:.2f}', f'{item.get_total():.2f}']
+            for item in order_items
+        ],
+    }
+
+
+def _receipt_timeout():
+    return getattr(settings, 'RECEIPT_CACHE_TIMEOUT', 60 * 60 * 24)
+
+
+def _cache_receipt(data):
+    get_receipt_cache().set(RECEIPT_KEY.format(order_id=data['order_id']), data, _receipt_timeout())
+
+
+def freeze_receipt(order, order_items):
+    # order_items must already carry their menu_item, as they do in place_order()
+    data = build_receipt(order, order_items)
+    Order.objects.filter(pk=order.pk).update(receipt=data)
+    order.receipt = data
+    transaction.on_commit(lambda: _cache_receipt(data))
+    return data
+
+
+def get_receipt(order_id):
+    """
+    Receipt data for order_id, or None if there is no such order.
+
+    A completed order does not change, so its receipt is served from the
+    cache, then from Order.receipt (one indexed row); only an order without a
+    frozen receipt loads its lines, in one joined query.
+    """
+    data = get_receipt_cache().get(RECEIPT_KEY.format(order_id=order_id))
+    if data is not None:
+        return data
+
+    order = Order.objects.filter(order_id=order_id).first()
+    if order is None:
+        return None
+    data = order.receipt
+    if data is None:
+        data = build_receipt(order, order.items.select_related('menu_item'))
+        if order.payment_status == 'completed':
+            Order.objects.filter(pk=order.pk).update(receipt=data)
+    if order.payment_status == 'completed':
+        _cache_receipt(data)
+    return data
+
+
+async def aget_receipt(order_id):
+    """get_receipt() for async views: the same cache, row, lines fallbacks."""
+    key = RECEIPT_KEY.format(order_id=order_id)
+    data = await get_receipt_cache().aget(key)
+    if data is not None:
+        return data
+
+    order = await Order.objects.filter(order_id=order_id).afirst()
+    if order is None:
+        return None
+    data = order.receipt
+    if data is None:
+        data = build_receipt(order, [item async for item in order.items.select_related('menu_item')])
+        if order.payment_status == 'completed':
+            await Order.objects.filter(pk=order.pk).aupdate(receipt=data)
+    if order.payment_status == 'completed':
+        await get_receipt_cache().aset(key, data, _receipt_timeout())
+    return data
+
+
+def discard_receipt(order):
+    # Order.update() does not send post_save, so this cannot recurse
+    Order.objects.filter(pk=order.pk).update(receipt=None)
+    transaction.on_commit(lambda: get_receipt_cache().delete(RECEIPT_KEY.format(order_id=order.order_id)))
+
+
+def receipt_context(data):
+    return {**data, 'created_at': parse_datetime(data['created_at'])}
@@ -0,0 +1,125 @@
+"""
+Primary/replica database routing.
+
+Catalog models (menu, chefs, reviews, about) are read from the replica
+named by REPLICA_DATABASE, and so are the reporting and export queries
+that ask for reporting_db(). Every write, and every other read, uses the
+primary. So that visitors see their own changes, a request that writes is
+pinned to the primary for the rest of the request and, through a short
+cookie, for REPLICA_PIN_SECONDS afterwards.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPLICA_MODELS = {
+    'restaurant.category',
+    'restaurant.menuitem',
+    'restaurant.chef',
+    'restaurant.review',
+    'restaurant.about',
+}
+PIN_COOKIE = 'use_primary'
+
+# Whether a read scope is active, whether its reads must stay on the
+# primary, and whether it wrote
+_scoped = ContextVar('restaurant_read_scope', default=False)
+_pinned = ContextVar('restaurant_pinned_to_primary', default=False)
+_wrote = ContextVar('restaurant_wrote_to_primary', default=False)
+
+
+def replica_alias():
+    return getattr(settings, 'REPLICA_DATABASE', None)
+
+
+def use_replica():
+    # Reads inside a transaction on the primary stay with it, e.g. the
+    # prices place_order() reads before writing the order
+    return bool(replica_alias()) and not _pinned.get() and not connections[DEFAULT_DB_ALIAS].in_atomic_block
+
+
+def reporting_db():
+    """Alias for reporting and export reads: the replica when it may be used."""
+    return replica_alias() if use_replica() else DEFAULT_DB_ALIAS
+
+
+@contextmanager
+def read_scope(pinned=False):
+    """
+    One unit of work (a request, a job) that reads from the replica until
+    it writes. Yields a callable telling whether it wrote.
+    """
+    tokens = _scoped.set(True), _pinned.set(pinned), _wrote.set(False)
+    try:
+        yield _wrote.get
+    finally:
+        _scoped.reset(tokens[0])
+        _pinned.reset(tokens[1])
+        _wrote.reset(tokens[2])
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        # Related objects are read from the database their instance came from
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db:
+            return instance._state.db
+        if model._meta.label_lower in REPLICA_MODELS and use_replica():
+            return replica_alias()
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        # Pinning lasts as long as the read scope; outside one (a command, a
+        # thread) there is nothing to reset it, so nothing is pinned
+        if _scoped.get():
+            _pinned.set(True)
+            _wrote.set(True)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica is a copy of the primary, schema included
+        return db == DEFAULT_DB_ALIAS
+
+
+class ReplicaPinningMiddleware:
+    """
+    Give each request its own read scope, pinned if it carries the pin
+    cookie, and set the cookie on the response of a request that wrote.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with read_scope(PIN_COOKIE in request.COOKIES) as wrote:
+            return self.process_response(request, self.get_response(request), wrote())
+
+    async def __acall__(self, request):
+        with read_scope(PIN_COOKIE in request.COOKIES) as wrote:
+            response = await self.get_response(request)
+            return self.process_response(request, response, wrote())
+
+    def process_response(self, request, response, wrote):
+        if wrote and replica_alias():
+            response.set_cookie(
+                PIN_COOKIE,
+                '1',
+                max_age=getattr(settings, 'REPLICA_PIN_SECONDS', 5),
+                httponly=True,
+                samesite='Lax',
+                secure=request.is_secure(),
+            )
+        return response
@@ -0,0 +1,135 @@
+"""
+Daily sales rollups.
+
+DailySales, DailyCategorySales and DailyItemSales are added to in the same
+transaction that completes an order, so reports read a few rollup rows
+instead of aggregating Order/OrderItem. rebuild_sales() recomputes days
+from the orders, for a backfill or after orders are edited or deleted.
+"""
+import datetime
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, Count, F, Sum, Value, When
+from django.utils import timezone
+
+from .models import DailyCategorySales, DailyItemSales, DailySales, Order, OrderItem
+from .routers import reporting_db
+
+
+def add_to_rollup(model, date, amounts, key_field=None):
+    """
+    Add amounts, {key: {field: value}}, to model's rows for date, creating the
+    missing rows first. Two queries however many keys: an INSERT that ignores
+    existing rows and one UPDATE of every key with F() expressions.
+    """
+    if not amounts:
+        return
+    fields = list(next(iter(amounts.values())))
+    model.objects.bulk_create([
+        model(date=date, **({key_field: key} if key_field else {})) for key in amounts
+    ], ignore_conflicts=True)
+    rows = model.objects.filter(date=date)
+    if key_field is None:
+        values = amounts[None]
+        rows.update(**{field: F(field) + values[field] for field in fields})
+        return
+    rows.filter(**{f'{key_field}__in': list(amounts)}).update(**{
+        field: F(field) + Case(
+            *[When(**{key_field: key}, then=Value(values[field])) for key, values in amounts.items()],
+            default=Value(0),
+            output_field=model._meta.get_field(field),
+        )
+        for field in fields
+    })
+
+
+def record_sales(orders, order_items, category_ids):
+    """
+    Add completed orders and their lines to the rollups. category_ids maps
+    menu item id to category id; must run inside the orders' transaction.
+    """
+    days = defaultdict(lambda: {'totals': defaultdict(Decimal), 'items': {}, 'categories': {}})
+    day_of_order = {}
+    for order in orders:
+        if order.payment_status != 'completed':
+            continue
+        day = days[timezone.localdate(order.created_at)]
+        day_of_order[order.pk] = day
+        day['totals']['order_count'] += 1
+        day['totals']['revenue'] += order.total_amount
+
+    for line in order_items:
+        day = day_of_order.get(line.order_id)
+        if day is None:
+            continue
+        revenue = line.price * line.quantity
+        day['totals']['items_sold'] += line.quantity
+        for key, group in ((line.menu_item_id, day['items']), (category_ids[line.menu_item_id], day['categories'])):
+            totals = group.setdefault(key, {'quantity': 0, 'revenue': Decimal('0.00')})
+            totals['quantity'] += line.quantity
+            totals['revenue'] += revenue
+
+    for date, day in days.items():
+        add_to_rollup(DailySales, date, {None: {
+            'order_count': day['totals']['order_count'],
+            'items_sold': day['totals']['items_sold'],
+            'revenue': day['totals']['revenue'],
+        }})
+        add_to_rollup(DailyCategorySales, date, day['categories'], 'category_id')
+        add_to_rollup(DailyItemSales, date, day['items'], 'menu_item_id')
+
+
+def day_range(date):
+    start = timezone.make_aware(datetime.datetime.combine(date, datetime.time.min))
+    return start, start + datetime.timedelta(days=1)
+
+
+def rebuild_sales(date):
+    """Recompute one day's rollups from its completed orders."""
+    start, end = day_range(date)
+    completed = Order.objects.filter(created_at__gte=start, created_at__lt=end, payment_status='completed')
+    lines = OrderItem.objects.filter(order__in=completed).values('menu_item_id', 'menu_item__category_id').annotate(
+        total_quantity=Sum('quantity'), total_revenue=Sum(F('price') * F('quantity')),
+    ).order_by()
+
+    with transaction.atomic():
+        for model in (DailySales, DailyCategorySales, DailyItemSales):
+            model.objects.filter(date=date).delete()
+        totals = completed.aggregate(order_count=Count('id'), revenue=Sum('total_amount'))
+        if not totals['order_count']:
+            return None
+        items, categories = [], defaultdict(lambda: {'quantity': 0, 'revenue': Decimal('0.00')})
+        for row in lines:
+            items.append(DailyItemSales(date=date, menu_item_id=row['menu_item_id'],
+                                        quantity=row['total_quantity'], revenue=row['total_revenue']))
+            category = categories[row['menu_item__category_id']]
+            category['quantity'] += row['total_quantity']
+            category['revenue'] += row['total_revenue']
+        DailyItemSales.objects.bulk_create(items)
+        DailyCategorySales.objects.bulk_create([
+            DailyCategorySales(date=date, category_id=category_id, **values) for category_id, values in categories.items()
+        ])
+        return DailySales.objects.create(
+            date=date,
+            order_count=totals['order_count'],
+            items_sold=sum(item.quantity for item in items),
+            revenue=totals['revenue'],
+        )
+
+
+def sales_report(start, end):
+    """Dashboard figures for the local dates start..end, read from the rollups only."""
+    db = reporting_db()
+    days = list(DailySales.objects.using(db).filter(date__gte=start, date__lte=end).order_by('date'))
+    revenue = sum((day.revenue for day in days), Decimal('0.00'))
+    orders = sum(day.order_count for day in days)
+    summary = DailySales(date=end, order_count=orders, revenue=revenue, items_sold=sum(day.items_sold for day in days))
+    top_items = DailyItemSales.objects.using(db).filter(date__gte=start, date__lte=end).values('menu_item__name').annotate(
+        total_quantity=Sum('quantity'), total_revenue=Sum('revenue'),
+    ).order_by('-total_revenue')[:10]
+    categories = DailyCategorySales.objects.using(db).filter(date__gte=start, date__lte=end).values('category__name').annotate(
+        total_quantity=Sum('quantity'), total_revenue=Sum('revenue'),
+    ).order_by('-total_revenue')
+    return {'days': days, 'summary': summary, 'top_items': list(top_items), 'categories': list(categories)}
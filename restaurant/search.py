@@ -0,0 +1,131 @@
+"""
+Menu search over an in-memory inverted index.
+
+The index is built from the menu snapshot, once per process and menu
+version, so a MenuItem save (which bumps the version) shows up in the next
+search and no search touches the database. Every query word matches indexed
+words by prefix ("chick" finds "chicken"); results are ranked by BM25 over
+the item's name, description and category, with the name counting most.
+"""
+import heapq
+import math
+import operator
+import re
+import unicodedata
+from bisect import bisect_left
+from collections import Counter, defaultdict
+
+WORD = re.compile(r'\w+')
+FIELD_WEIGHTS = (('name', 3), ('category', 1), ('description', 1))
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+# Merged postings of prefixes that match several words, and the results of
+# recent several-word queries, are kept up to this many entries each
+CACHE_SIZE = 512
+
+
+def remember(cache, key, value):
+    # Bounded memo: start over when full rather than track recency
+    if len(cache) >= CACHE_SIZE:
+        cache.clear()
+    cache[key] = value
+    return value
+
+
+def tokenize(text):
+    # Case- and accent-insensitive words: "Crème Brûlée" -> ['creme', 'brulee']
+    text = unicodedata.normalize('NFKD', text or '').casefold()
+    return WORD.findall(''.join(char for char in text if not unicodedata.combining(char)))
+
+
+class SearchIndex:
+    """
+    Postings {word: {item_id: BM25 score}} over every item, plus each word's
+    items best first, so a one-word query reads only as many postings as it
+    returns and a several-word query intersects sets rather than scoring
+    every match.
+    """
+
+    def __init__(self, items, category_names):
+        self.items = {item['id']: item for item in items}
+        frequencies = {}
+        for item in self.items.values():
+            counts = Counter()
+            for field, weight in FIELD_WEIGHTS:
+                text = category_names.get(item['category_id'], '') if field == 'category' else item[field]
+                for word in tokenize(text):
+                    counts[word] += weight
+            frequencies[item['id']] = counts
+
+        total = len(frequencies)
+        average_length = sum(counts.total() for counts in frequencies.values()) / max(total, 1)
+        document_counts = Counter(word for counts in frequencies.values() for word in counts)
+        idf = {word: math.log(1 + (total - df + 0.5) / (df + 0.5)) for word, df in document_counts.items()}
+        self.postings = defaultdict(dict)
+        for item_id, counts in frequencies.items():
+            norm = K1 * (1 - B + B * counts.total() / average_length)
+            for word, tf in counts.items():
+                self.postings[word][item_id] = idf[word] * tf * (K1 + 1) / (tf + norm)
+
+        self.words = sorted(self.postings)
+        self.ranked = {}
+        self._prefix_scores = {}
+        self._results = {}
+
+    def expand(self, prefix):
+        """Indexed words starting with prefix, from the sorted word list."""
+        start = bisect_left(self.words, prefix)
+        end = bisect_left(self.words, prefix + '\U0010ffff', start)
+        return self.words[start:end]
+
+    def ranked_items(self, word):
+        # (-score, item_id) best first, sorted on first use
+        ranked = self.ranked.get(word)
+        if ranked is None:
+            ranked = self.ranked[word] = sorted((-score, item_id) for item_id, score in self.postings[word].items())
+        return ranked
+
+    def prefix_scores(self, prefix):
+        """{item_id: best score of its words starting with prefix}."""
+        words = self.expand(prefix)
+        if len(words) == 1:
+            return self.postings[words[0]]
+        scores = self._prefix_scores.get(prefix)
+        if scores is None:
+            scores = {}
+            for word in words:
+                for item_id, score in self.postings[word].items():
+                    if score > scores.get(item_id, 0):
+                        scores[item_id] = score
+            remember(self._prefix_scores, prefix, scores)
+        return scores
+
+    def search(self, query, limit=20):
+        """The best `limit` items that match every word of query, best first."""
+        prefixes = list(dict.fromkeys(tokenize(query)))
+        if not prefixes or limit < 1:
+            return []
+
+        if len(prefixes) == 1:
+            # Merge the words' best-first lists and stop after `limit` items
+            results, seen = [], set()
+            for _, item_id in heapq.merge(*(self.ranked_items(word) for word in self.expand(prefixes[0]))):
+                if item_id not in seen:
+                    seen.add(item_id)
+                    results.append(self.items[item_id])
+                    if len(results) == limit:
+                        break
+            return results
+
+        key = (tuple(sorted(prefixes)), limit)
+        results = self._results.get(key)
+        if results is None:
+            # Items matching every word, scored by the sum of their words'
+            # scores; map/zip keep the per-item work out of the interpreter loop
+            scores = sorted((self.prefix_scores(prefix) for prefix in prefixes), key=len)
+            item_ids = list(set(scores[0]).intersection(*scores[1:]))
+            totals = map(sum, zip(*(map(s.__getitem__, item_ids) for s in scores)))
+            best = heapq.nlargest(limit, zip(totals, map(operator.neg, item_ids)))
+            results = remember(self._results, key, [self.items[-negative_id] for _, negative_id in best])
+        return results
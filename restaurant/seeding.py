@@ -0,0 +1,403 @@
+"""
+Bulk data for staging databases, benchmarks and load tests.
+
+Rows are generated (deterministic for a given random seed) or read from
+CSV/JSON/JSONL files, and written with bulk_create() in chunked
+transactions. Models with a natural key (Category.name, MenuItem category +
+name, Chef.name, Order.order_id) are upserted: existing rows are updated, or
+left alone with update=False.
+"""
+import csv
+import json
+import random
+from datetime import time, timedelta
+from decimal import Decimal
+from itertools import islice
+from pathlib import Path
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_time
+
+from .allocation import rebuild_slot_capacity, reservation_slots
+from .menu_cache import bump_menu_version, bump_version
+from .models import Category, Chef, MenuItem, Order, OrderItem, Reservation, Review, Table, TableSlot
+from .order_ids import new_order_id
+from .sales import record_sales
+
+CHUNK_SIZE = 1000
+
+CATEGORY_NAMES = ['Appetizers', 'Soups', 'Salads', 'Main Courses', 'Biryani', 'Breads', 'Desserts', 'Beverages']
+DISH_WORDS = ['Paneer', 'Chicken', 'Lamb', 'Prawn', 'Veg', 'Mushroom', 'Dal', 'Aloo', 'Fish', 'Egg']
+DISH_STYLES = ['Tikka', 'Masala', 'Korma', 'Vindaloo', 'Kebab', 'Curry', 'Fry', 'Handi', 'Kadai', 'Makhani']
+FIRST_NAMES = ['Asha', 'Ravi', 'Meera', 'John', 'Priya', 'Arjun', 'Sara', 'Vikram', 'Leela', 'Omar']
+LAST_NAMES = ['Rao', 'Sharma', 'Iyer', 'Smith', 'Khan', 'Patel', 'Das', 'Nair', 'Gupta', 'Singh']
+POSITIONS = ['Head Chef', 'Sous Chef', 'Pastry Chef', 'Tandoor Chef', 'Line Cook']
+PAYMENT_METHODS = ['Cash', 'Card', 'UPI']
+REVIEW_COMMENTS = [
+    'Wonderful food and friendly staff.',
+    'The biryani was the best we have had in years.',
+    'Great ambience, slightly slow service.',
+    'Portions were generous and the desserts excellent.',
+    'Will definitely come back with the family.',
+]
+
+# Fields refreshed when an upserted row already exists
+UPSERT = {
+    Category: (['name'], ['description']),
+    MenuItem: (['category', 'name'], ['description', 'price', 'is_available']),
+    Chef: (['name'], ['position', 'bio', 'experience_years', 'specialty', 'is_active', 'order']),
+}
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def bulk_upsert(model, objs, update=True, chunk_size=CHUNK_SIZE):
+    """
+    Write objs (any iterable, consumed lazily) chunk_size rows per transaction
+    and return how many were sent. For models in UPSERT, rows clashing on the
+    natural key are updated (update=True) or skipped (update=False).
+    """
+    unique_fields, update_fields = UPSERT.get(model, (None, None))
+    sent = 0
+    for batch in batched(objs, chunk_size):
+        with transaction.atomic():
+            if unique_fields is None:
+                model.objects.bulk_create(batch)
+            elif update:
+                model.objects.bulk_create(batch, update_conflicts=True, unique_fields=unique_fields,
+                                          update_fields=update_fields)
+            else:
+                model.objects.bulk_create(batch, ignore_conflicts=True)
+        sent += len(batch)
+    return sent
+
+
+def read_rows(path):
+    """Rows as dicts from a .csv, .json (a list of objects) or .jsonl file, streamed where possible."""
+    path = Path(path)
+    suffix = path.suffix.lower()
+    with open(path, newline='', encoding='utf-8') as f:
+        if suffix == '.csv':
+            yield from csv.DictReader(f)
+        elif suffix == '.jsonl':
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        elif suffix == '.json':
+            yield from json.load(f)
+        else:
+            raise ValueError(f'Unsupported file type {suffix!r}: use .csv, .json or .jsonl')
+
+
+def as_bool(value, default):
+    if value in (None, ''):
+        return default
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ('1', 'true', 'yes', 'y')
+
+
+def spread_created_at(model, objs, created_at):
+    # created_at is auto_now_add, so bulk_create() stamps every row with now;
+    # move the chunk back to when it is supposed to have happened
+    model.objects.filter(pk__in=[obj.pk for obj in objs]).update(created_at=created_at)
+
+
+class CategoryResolver:
+    # Category by name for file rows, creating the ones not seen before
+    def __init__(self):
+        self.by_name = dict(Category.objects.values_list('name', 'id'))
+
+    def __call__(self, name):
+        if name not in self.by_name:
+            self.by_name[name] = Category.objects.get_or_create(name=name)[0].id
+        return self.by_name[name]
+
+
+# Generated data
+
+def seed_categories(update=True):
+    sent = bulk_upsert(Category, (Category(name=name) for name in CATEGORY_NAMES), update=update)
+    bump_menu_version()
+    return sent
+
+
+def seed_menu(items, rng=None, update=True, chunk_size=CHUNK_SIZE):
+    """Create the categories and `items` available menu items spread across them."""
+    rng = rng or random.Random(0)
+    seed_categories(update=False)
+    category_ids = list(Category.objects.filter(name__in=CATEGORY_NAMES).values_list('id', flat=True))
+    existing = MenuItem.objects.count()
+    sent = bulk_upsert(MenuItem, (
+        MenuItem(
+            name=f'{rng.choice(DISH_WORDS)} {rng.choice(DISH_STYLES)} #{existing + i + 1}',
+            description='House special',
+            price=Decimal(rng.randrange(99, 1999)) / 100,
+            category_id=rng.choice(category_ids),
+        )
+        for i in range(items)
+    ), update=update, chunk_size=chunk_size)
+    bump_menu_version()
+    return sent
+
+
+def seed_chefs(count, rng=None, update=True, chunk_size=CHUNK_SIZE):
+    rng = rng or random.Random(0)
+    existing = Chef.objects.count()
+    sent = bulk_upsert(Chef, (
+        Chef(
+            name=f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} #{existing + i + 1}',
+            position=rng.choice(POSITIONS),
+            bio='Trained in kitchens across India and Europe.',
+            experience_years=rng.randint(1, 30),
+            specialty=rng.choice(DISH_STYLES),
+            order=existing + i + 1,
+        )
+        for i in range(count)
+    ), update=update, chunk_size=chunk_size)
+    bump_version('chefs')
+    return sent
+
+
+def seed_reviews(count, days=365, rng=None, chunk_size=CHUNK_SIZE):
+    """Create `count` approved reviews over the last `days` days; about one in fifty is featured."""
+    rng = rng or random.Random(0)
+    now = timezone.now()
+    total_chunks = max((count + chunk_size - 1) // chunk_size, 1)
+    for number, batch in enumerate(batched(range(count), chunk_size)):
+        with transaction.atomic():
+            reviews = Review.objects.bulk_create([
+                Review(
+                    customer_name=f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}',
+                    rating=rng.choices([1, 2, 3, 4, 5], weights=[1, 1, 3, 8, 12])[0],
+                    comment=rng.choice(REVIEW_COMMENTS),
+                    is_featured=rng.random() < 0.02,
+                )
+                for _ in batch
+            ])
+            spread_created_at(Review, reviews, now - timedelta(days=days * (total_chunks - number - 1) / total_chunks))
+    bump_version('reviews')
+    return count
+
+
+def seed_orders(count, days=365, rng=None, chunk_size=CHUNK_SIZE):
+    """Create `count` completed orders of 1-4 lines each, spread over the last `days` days."""
+    rng = rng or random.Random(0)
+    menu = list(MenuItem.objects.filter(is_available=True).values_list('id', 'price'))
+    now = timezone.now()
+    total_chunks = max((count + chunk_size - 1) // chunk_size, 1)
+    for number, batch in enumerate(batched(range(count), chunk_size)):
+        rows = []
+        for i in batch:
+            lines = rng.sample(menu, rng.randint(1, min(4, len(menu))))
+            rows.append({
+                'customer_name': f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}',
+                'customer_email': f'guest{i}@example.com',
+                'table_number': rng.randint(1, 20),
+                'payment_method': rng.choice(PAYMENT_METHODS),
+                'items': [(item_id, price, rng.randint(1, 3)) for item_id, price in lines],
+            })
+        # Oldest chunk first, so IDs and dates increase together
+        insert_orders(rows, created_at=now - timedelta(days=days * (total_chunks - number - 1) / total_chunks))
+    return count
+
+
+def insert_orders(rows, created_at=None):
+    """
+    Insert one chunk of orders and their lines in a transaction, adding the
+    completed ones to the sales rollups. Each row has the Order fields plus
+    items as [(menu_item_id, price, quantity), ...].
+    """
+    with transaction.atomic():
+        orders = Order.objects.bulk_create([
+            Order(
+                order_id=row.get('order_id') or new_order_id(),
+                customer_name=row['customer_name'],
+                customer_email=row['customer_email'],
+                customer_phone=row.get('customer_phone') or '7004125809',
+                table_number=row['table_number'],
+                total_amount=sum((price * quantity for _, price, quantity in row['items']), Decimal('0.00')),
+                payment_method=row['payment_method'],
+                payment_status=row.get('payment_status') or 'completed',
+            )
+            for row in rows
+        ])
+        order_items = OrderItem.objects.bulk_create([
+            OrderItem(order=order, menu_item_id=item_id, quantity=quantity, price=price)
+            for order, row in zip(orders, rows)
+            for item_id, price, quantity in row['items']
+        ])
+        if created_at is not None:
+            spread_created_at(Order, orders, created_at)
+            for order in orders:
+                order.created_at = created_at
+        category_ids = dict(MenuItem.objects.filter(
+            id__in={line.menu_item_id for line in order_items}
+        ).values_list('id', 'category_id'))
+        record_sales(orders, order_items, category_ids)
+    return orders
+
+
+def seed_reservations(count, days=365, rng=None, chunk_size=CHUNK_SIZE):
+    """
+    Create `count` reservations made over the last `days` days, each for a
+    date up to two weeks after it was made but before today. They hold no
+    table slots, so they never affect availability for upcoming dates.
+    """
+    rng = rng or random.Random(0)
+    now = timezone.now()
+    yesterday = timezone.localdate() - timedelta(days=1)
+    total_chunks = max((count + chunk_size - 1) // chunk_size, 1)
+    for number, batch in enumerate(batched(range(count), chunk_size)):
+        created_at = now - timedelta(days=days * (total_chunks - number) / total_chunks)
+        booked_on = timezone.localtime(created_at).date()
+        with transaction.atomic():
+            reservations = Reservation.objects.bulk_create([
+                Reservation(
+                    name=f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}',
+                    email=f'guest{i}@example.com',
+                    phone='7004125809',
+                    date=min(booked_on + timedelta(days=rng.randint(0, 14)), yesterday),
+                    time=time(rng.randint(11, 21), rng.choice([0, 30])),
+                    guests=rng.randint(1, 8),
+                    table_number=rng.randint(1, 20),
+                    status=rng.choices(['confirmed', 'pending', 'cancelled'], weights=[7, 2, 1])[0],
+                )
+                for i in batch
+            ])
+            spread_created_at(Reservation, reservations, created_at)
+    return count
+
+
+# Data from files
+
+def load_categories(rows, update=True, chunk_size=CHUNK_SIZE):
+    sent = bulk_upsert(Category, (
+        Category(name=row['name'], description=row.get('description') or '') for row in rows
+    ), update=update, chunk_size=chunk_size)
+    bump_menu_version()
+    return sent
+
+
+def load_menu(rows, update=True, chunk_size=CHUNK_SIZE):
+    # Columns: name, description, price, category (name), is_available
+    category_id = CategoryResolver()
+    sent = bulk_upsert(MenuItem, (
+        MenuItem(
+            name=row['name'],
+            description=row.get('description') or '',
+            price=Decimal(str(row['price'])),
+            category_id=category_id(row['category']),
+            is_available=as_bool(row.get('is_available'), True),
+        )
+        for row in rows
+    ), update=update, chunk_size=chunk_size)
+    bump_menu_version()
+    return sent
+
+
+def load_chefs(rows, update=True, chunk_size=CHUNK_SIZE):
+    sent = bulk_upsert(Chef, (
+        Chef(
+            name=row['name'],
+            position=row.get('position') or '',
+            bio=row.get('bio') or '',
+            experience_years=int(row.get('experience_years') or 0),
+            specialty=row.get('specialty') or '',
+            is_active=as_bool(row.get('is_active'), True),
+            order=int(row.get('order') or 0),
+        )
+        for row in rows
+    ), update=update, chunk_size=chunk_size)
+    bump_version('chefs')
+    return sent
+
+
+def load_reviews(rows, update=True, chunk_size=CHUNK_SIZE):
+    # Reviews have no natural key, so every row is a new review
+    sent = bulk_upsert(Review, (
+        Review(
+            customer_name=row['customer_name'],
+            rating=int(row['rating']),
+            comment=row.get('comment') or '',
+            is_featured=as_bool(row.get('is_featured'), False),
+            is_approved=as_bool(row.get('is_approved'), True),
+        )
+        for row in rows
+    ), chunk_size=chunk_size)
+    bump_version('reviews')
+    return sent
+
+
+def parse_order_items(value):
+    # "12:2;15:1" in CSV, or [[12, 2], [15, 1]] / {"12": 2} in JSON
+    if isinstance(value, dict):
+        return [(int(item_id), int(quantity)) for item_id, quantity in value.items()]
+    if isinstance(value, list):
+        return [(int(item_id), int(quantity)) for item_id, quantity in value]
+    pairs = [pair.split(':') for pair in str(value).split(';') if pair.strip()]
+    return [(int(item_id), int(quantity)) for item_id, quantity in pairs]
+
+
+def load_orders(rows, update=True, chunk_size=CHUNK_SIZE):
+    """
+    Orders priced from the current menu. An order_id that already exists is
+    skipped with its lines, whatever `update` says, so lines never double up.
+    """
+    prices = dict(MenuItem.objects.values_list('id', 'price'))
+    sent = 0
+    for batch in batched(rows, chunk_size):
+        ids = [row['order_id'] for row in batch if row.get('order_id')]
+        existing = set(Order.objects.filter(order_id__in=ids).values_list('order_id', flat=True)) if ids else set()
+        chunk = []
+        for row in batch:
+            if row.get('order_id') in existing:
+                continue
+            items = [(item_id, prices[item_id], quantity) for item_id, quantity in parse_order_items(row['items'])]
+            chunk.append({**row, 'table_number': int(row['table_number']), 'items': items})
+        if chunk:
+            insert_orders(chunk)
+        sent += len(chunk)
+    return sent
+
+
+def load_reservations(rows, update=True, chunk_size=CHUNK_SIZE):
+    """
+    Reservations as given. Those still to come hold their table's slots, as
+    if staff had entered them in the admin, and the slot counts are rebuilt
+    from today on, so they are taken out of availability.
+    """
+    today = timezone.localdate()
+    tables = Table.objects.in_bulk(field_name='number')
+    sent = 0
+    for batch in batched((
+        Reservation(
+            name=row['name'],
+            email=row['email'],
+            phone=row.get('phone') or '',
+            date=parse_date(row['date']),
+            time=parse_time(row['time']),
+            guests=int(row['guests']),
+            table_number=int(row['table_number']) if row.get('table_number') else None,
+            special_requests=row.get('special_requests') or '',
+            status=row.get('status') or 'pending',
+        )
+        for row in rows
+    ), chunk_size):
+        with transaction.atomic():
+            reservations = Reservation.objects.bulk_create(batch)
+            # A clash with a slot already held is skipped, as in sync_table_slots()
+            TableSlot.objects.bulk_create([
+                TableSlot(table=tables[reservation.table_number], reservation=reservation, date=reservation.date, slot=slot)
+                for reservation in reservations
+                if reservation.date >= today and reservation.status != 'cancelled' and reservation.table_number in tables
+                for slot in reservation_slots(reservation.time)
+            ], ignore_conflicts=True)
+        sent += len(batch)
+    rebuild_slot_capacity(today)
+    return sent
@@ -0,0 +1,55 @@
+from decimal import Decimal
+
+from django.db import transaction
+
+from .models import MenuItem, Order, OrderItem
+from .kitchen import publish_order
+from .receipts import freeze_receipt
+from .sales import record_sales
+
+
+class OrderError(Exception):
+    pass
+
+
+def place_order(cart, order_id, customer_name, customer_email, customer_phone, table_number, payment_method):
+    """
+    Create an Order and all of its OrderItems from a cart of {menu_item_id: quantity}.
+
+    Lines are re-priced from the database rather than the session, and the
+    whole order costs the same number of queries however many lines it has:
+    one in_bulk() lookup, one Order INSERT, one bulk_create(), one UPDATE
+    that freezes the receipt and two per sales rollup.
+    """
+    quantities = {int(item_id): int(quantity) for item_id, quantity in cart.items()}
+    if not quantities:
+        raise OrderError('Your cart is empty!')
+
+    with transaction.atomic():
+        menu_items = MenuItem.objects.filter(is_available=True).in_bulk(list(quantities))
+        missing = [item_id for item_id in quantities if item_id not in menu_items]
+        if missing:
+            raise OrderError('Some items in your cart are no longer available.')
+
+        total = sum((menu_items[item_id].price * quantity for item_id, quantity in quantities.items()), Decimal('0.00'))
+
+        order = Order.objects.create(
+            order_id=order_id,
+            customer_name=customer_name,
+            customer_email=customer_email,
+            customer_phone=customer_phone,
+            table_number=table_number,
+            total_amount=total,
+            payment_method=payment_method,
+            payment_status='completed'
+        )
+
+        order_items = OrderItem.objects.bulk_create([
+            OrderItem(order=order, menu_item=menu_items[item_id], quantity=quantity, price=menu_items[item_id].price)
+            for item_id, quantity in quantities.items()
+        ])
+        freeze_receipt(order, order_items)
+        record_sales([order], order_items, {item_id: item.category_id for item_id, item in menu_items.items()})
+        transaction.on_commit(lambda: publish_order('order.created', order, order_items))
+
+    return order, order_items
@@ -0,0 +1,151 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .allocation import allocate_reservation, rebuild_slot_capacity, release_table_slots, sync_table_slots
+from .images import schedule_derivatives
+from .instrumentation import time_query
+from .kitchen import broker, publish_order_changed_on_commit
+from .menu_cache import bump_menu_version, bump_version
+from .models import Category, Chef, MenuItem, Order, OrderItem, Reservation, Review, Table
+from .receipts import discard_receipt
+
+
+# SQLITE_PRAGMAS on every new SQLite connection, run on the raw connection so
+# they are not counted among the request's queries
+@receiver(connection_created)
+def configure_sqlite(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    for name, value in getattr(settings, 'SQLITE_PRAGMAS', {}).items():
+        connection.connection.execute(f'PRAGMA {name} = {value}')
+
+
+# Query timing for sampled requests, on every connection in every thread
+@receiver(connection_created)
+def install_query_timer(sender, connection, **kwargs):
+    if time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(time_query)
+
+
+# Bump after commit so no reader can rebuild the snapshot from uncommitted rows
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=MenuItem)
+@receiver(post_delete, sender=MenuItem)
+def invalidate_menu_snapshot(sender, **kwargs):
+    transaction.on_commit(bump_menu_version)
+
+
+# Home page fragments for chefs and reviews are keyed on these versions
+@receiver(post_save, sender=Chef)
+@receiver(post_delete, sender=Chef)
+def invalidate_chefs_fragment(sender, **kwargs):
+    transaction.on_commit(lambda: bump_version('chefs'))
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def invalidate_reviews_fragment(sender, **kwargs):
+    transaction.on_commit(lambda: bump_version('reviews'))
+
+
+# Pages showing each model's images, re-rendered once its derivatives exist
+IMAGE_VERSIONS = {MenuItem: 'menu', Chef: 'chefs', Review: 'reviews'}
+
+
+@receiver(pre_save, sender=MenuItem)
+@receiver(pre_save, sender=Chef)
+@receiver(pre_save, sender=Review)
+def remember_stored_image(sender, instance, raw=False, update_fields=None, **kwargs):
+    # The image as stored before this save, so post_save can tell whether it changed
+    if raw or instance.pk is None or (update_fields is not None and 'image' not in update_fields):
+        return
+    instance._stored_image = sender.objects.filter(pk=instance.pk).values_list('image', flat=True).first()
+
+
+@receiver(post_save, sender=MenuItem)
+@receiver(post_save, sender=Chef)
+@receiver(post_save, sender=Review)
+def render_image_derivatives(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    # Only a new or replaced image is rendered; other edits leave it alone
+    if raw or not instance.image or (update_fields is not None and 'image' not in update_fields):
+        return
+    name = instance.image.name
+    if not created and getattr(instance, '_stored_image', None) == name:
+        return
+    version = IMAGE_VERSIONS[sender]
+    transaction.on_commit(lambda: schedule_derivatives(name, on_done=lambda: bump_version(version)))
+
+
+@receiver(post_save, sender=Reservation)
+def update_reservation_table_slots(sender, instance, created, raw=False, **kwargs):
+    # Edits (status, table or time changed in the admin) re-sync the slots.
+    # book_table() gives new bookings theirs in the same transaction; other new
+    # reservations (admin add, fixtures) are allocated once that commits
+    if created:
+        transaction.on_commit(lambda: allocate_reservation(instance.pk))
+    elif not raw:
+        sync_table_slots(instance)
+
+
+@receiver(pre_delete, sender=Reservation)
+def release_reservation_table_slots(sender, instance, **kwargs):
+    # Before the cascade removes the slots, so the capacity counts can follow
+    release_table_slots(instance)
+
+
+@receiver(post_save, sender=Table)
+@receiver(post_delete, sender=Table)
+def recount_slot_capacity(sender, created=False, raw=False, **kwargs):
+    # Counts are kept per table size for active tables; resizing, retiring or
+    # removing a table changes them
+    if created or raw:
+        return
+    rebuild_slot_capacity(timezone.localdate())
+
+
+# A frozen receipt is dropped when staff edit the order or its lines, and is
+# rebuilt on the next view. place_order() writes through update() and
+# bulk_create(), which send no signals.
+@receiver(post_save, sender=Order)
+@receiver(post_delete, sender=Order)
+def invalidate_order_receipt(sender, instance, created=False, raw=False, **kwargs):
+    if created or raw:
+        return
+    discard_receipt(instance)
+
+
+@receiver(post_save, sender=OrderItem)
+@receiver(post_delete, sender=OrderItem)
+def invalidate_order_item_receipt(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    discard_receipt(instance.order)
+
+
+# Kitchen screens hear about staff edits once they commit, one event per
+# order however many of its rows changed. New orders are published by
+# place_order() with their lines.
+@receiver(post_save, sender=Order)
+def publish_order_update(sender, instance, created=False, raw=False, **kwargs):
+    if created or raw:
+        return
+    publish_order_changed_on_commit(instance.pk)
+
+
+@receiver(post_delete, sender=Order)
+def publish_order_deletion(sender, instance, **kwargs):
+    transaction.on_commit(lambda: broker.publish('order.deleted', {'order_id': instance.order_id}))
+
+
+@receiver(post_save, sender=OrderItem)
+@receiver(post_delete, sender=OrderItem)
+def publish_order_item_change(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    publish_order_changed_on_commit(instance.order_id)
+
@@ -0,0 +1,256 @@
+"""
+Production static and media files without a front proxy.
+
+CompressedManifestStaticFilesStorage adds gzip (and brotli, if installed)
+copies of every hashed asset at collectstatic time. serve_static and
+serve_media stream files with FileResponse, so WSGI servers that provide
+wsgi.file_wrapper (gunicorn, uWSGI) send them with sendfile(); they also
+handle conditional GETs, single byte ranges and precompressed variants.
+"""
+import gzip
+import io
+import mimetypes
+import os
+import re
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified
+from django.urls import re_path
+from django.utils._os import safe_join
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.svg', '.json', '.txt', '.html', '.map', '.xml', '.ico')
+HASHED_NAME = re.compile(r'\.[0-9a-f]{12}\.[^./]+$')
+RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+ONE_YEAR = 60 * 60 * 24 * 365
+# Precompressed variants, best first, with the ETag suffix of each
+VARIANTS = (('.br', 'br', 'br'), ('.gz', 'gzip', 'gz'))
+
+
+def compress_file(path):
+    """Write path.gz and path.br next to path, keeping only those that are smaller."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    written = []
+    variants = [('.gz', lambda: gzip.compress(data, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        variants.append(('.br', lambda: brotli.compress(data, quality=11)))
+    for suffix, compress in variants:
+        compressed = compress()
+        if len(compressed) < len(data):
+            with open(path + suffix, 'wb') as f:
+                f.write(compressed)
+            written.append(path + suffix)
+    return written
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """ManifestStaticFilesStorage that also precompresses the hashed text assets."""
+
+    def post_process(self, paths, dry_run=False, **options):
+        hashed_names = set()
+        for name, hashed_name, processed in super().post_process(paths, dry_run, **options):
+            if hashed_name and not isinstance(processed, Exception):
+                hashed_names.add(hashed_name)
+            yield name, hashed_name, processed
+        if dry_run:
+            return
+        for hashed_name in sorted(hashed_names):
+            if hashed_name.endswith(COMPRESSIBLE_EXTENSIONS):
+                compress_file(self.path(hashed_name))
+
+
+class FileRange(io.RawIOBase):
+    """
+    Read-only view of bytes [start, start + length) of an open file.
+
+    fileno() is the underlying descriptor, positioned at start, so servers
+    that sendfile() from the current offset up to Content-Length (gunicorn)
+    still send the range zero-copy; everything else reads through read().
+    """
+
+    def __init__(self, file, start, length):
+        self.file = file
+        self.start = start
+        self.length = length
+        self.position = 0
+        file.seek(start)
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self.position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self.position, io.SEEK_END: self.length}[whence]
+        self.position = min(max(base + offset, 0), self.length)
+        self.file.seek(self.start + self.position)
+        return self.position
+
+    def read(self, size=-1):
+        remaining = self.length - self.position
+        if size is None or size < 0 or size > remaining:
+            size = remaining
+        data = self.file.read(size)
+        self.position += len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+        super().close()
+
+
+def parse_range(header, size):
+    # (start, length) for a single satisfiable range, None to ignore the
+    # header and send the whole file, or False if it cannot be satisfied
+    match = RANGE.match(header.strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+        if start > end:
+            return False
+    elif last:
+        if not int(last):
+            return False
+        start = max(size - int(last), 0)
+        end = size - 1
+    else:
+        return None
+    return start, end - start + 1
+
+
+def accepted_encodings(header):
+    # {coding: q} from an Accept-Encoding header; q=0 means "not acceptable"
+    accepted = {}
+    for part in header.split(','):
+        coding, *params = [piece.strip() for piece in part.split(';')]
+        if not coding:
+            continue
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[coding.lower()] = q
+    return accepted
+
+
+def precompressed(request, path):
+    # The precompressed variant the client prefers among those it accepts,
+    # by name or through "*", as (path, encoding, ETag suffix); ties go to
+    # the smaller variant
+    accepted = accepted_encodings(request.headers.get('Accept-Encoding', ''))
+    best, best_q = (path, None, None), 0
+    for suffix, encoding, tag in VARIANTS:
+        q = accepted.get(encoding, accepted.get('*', 0))
+        if q > best_q and os.path.exists(path + suffix):
+            best, best_q = (path + suffix, encoding, tag), q
+    return best
+
+
+def serve_file(request, path, document_root, cache_control, compressed=False):
+    try:
+        fullpath = safe_join(document_root, path)
+    except SuspiciousFileOperation:
+        raise Http404('Not found')
+    if not os.path.isfile(fullpath):
+        raise Http404('Not found')
+
+    stat = os.stat(fullpath)
+    last_modified = http_date(stat.st_mtime)
+    content_type = mimetypes.guess_type(fullpath)[0] or 'application/octet-stream'
+    has_variants = compressed and path.endswith(COMPRESSIBLE_EXTENSIONS)
+
+    # Byte ranges are served from the file itself; a whole-file response may
+    # be a precompressed variant, which then gets an ETag of its own
+    range_header = request.headers.get('Range')
+    sendpath, encoding, tag = fullpath, None, None
+    if has_variants and not range_header:
+        sendpath, encoding, tag = precompressed(request, fullpath)
+    version = f'{int(stat.st_mtime):x}-{stat.st_size:x}'
+    etag = f'"{version}-{tag}"' if tag else f'"{version}"'
+
+    def finish(response):
+        response['ETag'] = etag
+        response['Last-Modified'] = last_modified
+        response['Cache-Control'] = cache_control
+        response['Accept-Ranges'] = 'bytes'
+        if has_variants:
+            response['Vary'] = 'Accept-Encoding'
+        return response
+
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match:
+        if etag in [tag.strip().removeprefix('W/') for tag in if_none_match.split(',')] or if_none_match.strip() == '*':
+            return finish(HttpResponseNotModified())
+    else:
+        modified_since = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+        if modified_since is not None and int(stat.st_mtime) <= modified_since:
+            return finish(HttpResponseNotModified())
+
+    byte_range = None
+    if_range = request.headers.get('If-Range')
+    if range_header and (not if_range or if_range in (etag, last_modified)):
+        byte_range = parse_range(range_header, stat.st_size)
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{stat.st_size}'
+        return finish(response)
+
+    if byte_range:
+        start, length = byte_range
+        response = FileResponse(FileRange(open(fullpath, 'rb'), start, length), content_type=content_type, status=206)
+        response['Content-Range'] = f'bytes {start}-{start + length - 1}/{stat.st_size}'
+        return finish(response)
+
+    response = FileResponse(open(sendpath, 'rb'), content_type=content_type)
+    if encoding:
+        response['Content-Encoding'] = encoding
+    return finish(response)
+
+
+@require_safe
+def serve_static(request, path):
+    # Hashed names never change content, so they can be cached for a year
+    if HASHED_NAME.search(path):
+        cache_control = f'public, max-age={ONE_YEAR}, immutable'
+    else:
+        cache_control = f"public, max-age={getattr(settings, 'STATIC_CACHE_MAX_AGE', 60)}"
+    return serve_file(request, path, settings.STATIC_ROOT, cache_control, compressed=True)
+
+
+@require_safe
+def serve_media(request, path):
+    cache_control = f"public, max-age={getattr(settings, 'MEDIA_CACHE_MAX_AGE', 60 * 60 * 24)}"
+    return serve_file(request, path, settings.MEDIA_ROOT, cache_control)
+
+
+def file_urlpatterns():
+    """URL patterns for serve_static and serve_media under STATIC_URL and MEDIA_URL."""
+    patterns = []
+    for url, view in ((settings.STATIC_URL, serve_static), (settings.MEDIA_URL, serve_media)):
+        prefix = urlsplit(url).path.strip('/')
+        patterns.append(re_path(rf'^{re.escape(prefix)}/(?P<path>.+)$', view))
+    return patterns
@@ -0,0 +1,49 @@
+from django import template
+from django.utils.html import format_html, format_html_join
+
+from restaurant.images import image_sources
+
+register = template.Library()
+
+# Card images are full width on phones and roughly a third of the page otherwise
+DEFAULT_SIZES = '(max-width: 768px) 100vw, 400px'
+
+
+def srcset(sources):
+    return ', '.join(f'{url} {width}w' for width, url in sources)
+
+
+@register.simple_tag
+def responsive_image(image, alt='', sizes=DEFAULT_SIZES, sources=None, **attrs):
+    """
+    <picture> with WebP and JPEG srcsets for an image's derivatives, falling
+    back to the original when none have been rendered yet.
+
+    image is an ImageField file or an already resolved URL; with a URL, pass
+    sources from the menu snapshot, which has them precomputed.
+
+        {% responsive_image chef.image alt=chef.name class="chef-image" %}
+        {% responsive_image item.image_url alt=item.name sources=item.image_sources %}
+    """
+    if not image:
+        return ''
+    if isinstance(image, str):
+        url = image
+    else:
+        url = image.url
+        if sources is None:
+            sources = image_sources(image.name)
+    sources = sources or {}
+
+    extra = format_html_join('', ' {}="{}"', sorted(attrs.items()))
+    if not sources:
+        return format_html('<img src="{}" alt="{}" loading="lazy" decoding="async"{}>', url, alt, extra)
+
+    webp = ''
+    if 'webp' in sources:
+        webp = format_html('<source type="image/webp" srcset="{}" sizes="{}">', srcset(sources['webp']), sizes)
+    jpeg = format_html(' srcset="{}" sizes="{}"', srcset(sources['jpeg']), sizes) if 'jpeg' in sources else ''
+    return format_html(
+        '<picture>{}<img src="{}"{} alt="{}" loading="lazy" decoding="async"{}></picture>',
+        webp, url, jpeg, alt, extra,
+    )
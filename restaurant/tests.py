@@ -1,3 +1,1271 @@
-from django.test import TestCase
+import asyncio
+import datetime
+import gzip
+import json
+import os
+import pickle
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.core import mail
+from django.core.cache import caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.http import Http404
+from django.db import connection, transaction
+from django.template import Context, Template
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .admin import ContactAdmin
+from .allocation import NoTableAvailable, OutsideSeatingHours, book_table, slot_availability
+from .benchmark import FUNNEL, Recorder, compare, failed_steps, percentile, run_client_funnel, summarize
+from .cart import CartSummary, decode_cart, encode_cart
+from .exports import export_lines, export_response
+from .images import derivative_job, derivative_name, render_derivatives
+from .instrumentation import metrics
+from .kitchen import broker, event_stream
+from .menu_cache import clear_local_menu_snapshot, get_menu_snapshot, get_menu_version
+from . import views
+from .models import About, Category, Contact, DailyCategorySales, DailyItemSales, DailySales, MenuItem, Order, OrderItem, OutboxEmail, Reservation, SlotCapacity, Table, TableSlot, Chef, Review
+from .order_ids import ID_LENGTH, MAX_SEQUENCE, SnowflakeGenerator, claim_node, decode
+from .outbox import claim_batch, deliver_batch, queue_email
+from .routers import PIN_COOKIE, read_scope, reporting_db
+from .seeding import seed_menu, seed_orders, seed_reservations
+from .services import OrderError, place_order
+from .staticfiles import serve_media, serve_static
+
+
+class MenuSnapshotTests(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+        clear_local_menu_snapshot()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category = Category.objects.create(name='Main Courses')
+            self.item = MenuItem.objects.create(
+                name='Paneer Masala', description='Cottage cheese curry',
+                price=Decimal('12.50'), category=self.category,
+            )
+            MenuItem.objects.create(
+                name='Sold Out Special', description='Gone for today',
+                price=Decimal('9.00'), category=self.category, is_available=False,
+            )
+
+    def test_snapshot_only_contains_available_items(self):
+        snapshot = get_menu_snapshot()
+        self.assertEqual([item['name'] for item in snapshot.categories[0]['items']], ['Paneer Masala'])
+        self.assertEqual(snapshot.get_item(self.item.id)['price'], Decimal('12.50'))
+
+    def test_menu_served_without_queries_when_unchanged(self):
+        self.client.get(reverse('menu'))
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('menu'))
+        self.assertContains(response, 'Paneer Masala')
+        self.assertNotContains(response, 'Sold Out Special')
+
+    def test_save_invalidates_snapshot(self):
+        get_menu_snapshot()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.item.name = 'Kadai Paneer'
+            self.item.save()
+        self.assertContains(self.client.get(reverse('order_food')), 'Kadai Paneer')
+
+
+class HomeFragmentTests(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+        clear_local_menu_snapshot()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.chef = Chef.objects.create(name='Marco Rossi', position='Head Chef', bio='Pasta')
+            Review.objects.create(customer_name='John Smith', rating=5, comment='Amazing', is_featured=True)
+
+    def test_warm_home_page_runs_no_queries(self):
+        self.client.get(reverse('home'))
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('home'))
+        self.assertContains(response, 'Marco Rossi')
+        self.assertContains(response, 'John Smith')
+
+    def test_chef_save_refreshes_only_after_bump(self):
+        self.client.get(reverse('home'))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.chef.name = 'Sanjeev Kapoor'
+            self.chef.save()
+        self.assertContains(self.client.get(reverse('home')), 'Sanjeev Kapoor')
+
+
+
+def jpeg_upload(name, size=(100, 50)):
+    from PIL import Image
+
+    buffer = BytesIO()
+    Image.new('RGB', size, 'orange').save(buffer, 'JPEG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/jpeg')
+
+
+@override_settings(IMAGE_DERIVATIVE_WORKERS=0, IMAGE_DERIVATIVE_WIDTHS=(32, 64, 128))
+class ImageDerivativeTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        media = override_settings(MEDIA_ROOT=self.media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+        caches['default'].clear()
+        clear_local_menu_snapshot()
+        self.category = Category.objects.create(name='Desserts')
+
+    def exists(self, name):
+        return os.path.exists(os.path.join(self.media_root, name))
+
+    def test_save_renders_derivatives_below_original_width(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            item = MenuItem.objects.create(
+                name='Cheesecake', description='', price=Decimal('5.00'), category=self.category,
+                image=jpeg_upload('cake.jpg'),
+            )
+        for fmt in ['webp', 'jpeg']:
+            self.assertTrue(self.exists(derivative_name(item.image.name, 32, fmt)))
+            self.assertTrue(self.exists(derivative_name(item.image.name, 64, fmt)))
+            # Never upscaled
+            self.assertFalse(self.exists(derivative_name(item.image.name, 128, fmt)))
+
+        sources = get_menu_snapshot().get_item(item.id)['image_sources']
+        self.assertEqual([width for width, _ in sources['webp']], [32, 64])
+        response = self.client.get(reverse('menu'))
+        self.assertContains(response, '<source type="image/webp" srcset="/media/derivatives/menu_items/cake-32w.webp 32w')
+        self.assertContains(response, 'cake-64w.jpg 64w')
+
+    def test_saves_that_keep_the_image_render_it_once(self):
+        with mock.patch('restaurant.images.render_derivatives', wraps=render_derivatives) as render:
+            with self.captureOnCommitCallbacks(execute=True):
+                item = MenuItem.objects.create(
+                    name='Tart', description='', price=Decimal('5.00'), category=self.category,
+                    image=jpeg_upload('tart.jpg'),
+                )
+            version = get_menu_version()
+            for price in ('6.00', '7.00'):
+                with self.captureOnCommitCallbacks(execute=True):
+                    item.price = Decimal(price)
+                    item.save()
+        self.assertEqual(render.call_count, 1)
+        # One bump per save, none from rendering
+        self.assertEqual(get_menu_version(), version + 2)
+        # The 128px derivatives are never written, so nothing is left to do
+        self.assertIsNone(derivative_job(item.image.name))
+
+    def test_tag_falls_back_to_original(self):
+        html = Template('{% load image_tags %}{% responsive_image url alt="Chef" class="chef-image" %}').render(
+            Context({'url': '/media/chefs/a.jpg'})
+        )
+        self.assertEqual(html, '<img src="/media/chefs/a.jpg" alt="Chef" loading="lazy" decoding="async" class="chef-image">')
+
+    def test_backfill_command_renders_missing_derivatives(self):
+        # Created without running on_commit, as if uploaded before the pipeline existed
+        chef = Chef.objects.create(name='Marco', position='Head Chef', bio='', image=jpeg_upload('marco.jpg'))
+        self.assertFalse(self.exists(derivative_name(chef.image.name, 32, 'webp')))
+        out = StringIO()
+        call_command('build_image_derivatives', workers=2, stdout=out)
+        self.assertIn('Wrote 4 derivative(s) for 1 image(s), 0 failed', out.getvalue())
+        self.assertTrue(self.exists(derivative_name(chef.image.name, 64, 'webp')))
+
+
+class StaticFilesTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.static_root = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, cls.static_root)
+        storages = {
+            'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+            'staticfiles': {'BACKEND': 'restaurant.staticfiles.CompressedManifestStaticFilesStorage'},
+        }
+        cls.enterClassContext(override_settings(STATIC_ROOT=cls.static_root, STORAGES=storages))
+        call_command('collectstatic', interactive=False, verbosity=0)
+        from django.contrib.staticfiles.storage import staticfiles_storage
+        cls.css = staticfiles_storage.stored_name('css/style.css')
+
+    def get(self, view, path, **headers):
+        return view(RequestFactory().get('/', headers=headers), path)
+
+    def test_hashed_assets_are_precompressed_and_cached_for_a_year(self):
+        self.assertRegex(self.css, r'^css/style\.[0-9a-f]{12}\.css$')
+        response = self.get(serve_static, self.css, accept_encoding='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+        with open(os.path.join(self.static_root, self.css), 'rb') as f:
+            self.assertEqual(gzip.decompress(b''.join(response.streaming_content)), f.read())
+
+    def test_compressed_variant_has_its_own_etag_and_q0_is_refused(self):
+        plain = self.get(serve_static, self.css)
+        gzipped = self.get(serve_static, self.css, accept_encoding='gzip')
+        self.assertEqual(gzipped['ETag'], plain['ETag'][:-1] + '-gz"')
+        self.assertEqual(self.get(serve_static, self.css, accept_encoding='gzip', if_none_match=gzipped['ETag']).status_code, 304)
+        self.assertEqual(self.get(serve_static, self.css, if_none_match=gzipped['ETag']).status_code, 200)
+        for header in ('gzip;q=0', 'gzip; q=0.0, identity', '*;q=0', 'deflate'):
+            response = self.get(serve_static, self.css, accept_encoding=header)
+            self.assertNotIn('Content-Encoding', response, header)
+            self.assertEqual(response['ETag'], plain['ETag'], header)
+            self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(self.get(serve_static, self.css, accept_encoding='br;q=0, *')['Content-Encoding'], 'gzip')
+
+    def test_unhashed_name_gets_short_cache_and_etag_revalidates(self):
+        response = self.get(serve_static, 'css/style.css')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=60')
+        self.assertNotIn('Content-Encoding', response)
+        self.assertEqual(self.get(serve_static, 'css/style.css', if_none_match=response['ETag']).status_code, 304)
+
+    def test_path_traversal_is_404(self):
+        with self.assertRaises(Http404):
+            self.get(serve_static, '../settings.py')
+
+    @override_settings(MEDIA_ROOT=os.path.join(os.path.dirname(os.path.dirname(__file__)), 'media'))
+    def test_media_byte_ranges(self):
+        name = 'chefs/Sanjeev_Kapoor.jpg'
+        with open(os.path.join(settings.MEDIA_ROOT, name), 'rb') as f:
+            data = f.read()
+
+        response = self.get(serve_media, name, range='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 10-19/{len(data)}')
+        self.assertEqual(response['Content-Length'], '10')
+        self.assertEqual(b''.join(response.streaming_content), data[10:20])
+
+        response = self.get(serve_media, name, range='bytes=-5')
+        self.assertEqual(b''.join(response.streaming_content), data[-5:])
+
+        response = self.get(serve_media, name, range=f'bytes={len(data)}-')
+        self.assertEqual(response.status_code, 416)
+
+        # A stale If-Range gets the whole file
+        response = self.get(serve_media, name, range='bytes=0-1', if_range='"stale"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), data)
+
+class CartStorageTests(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+        clear_local_menu_snapshot()
+        category = Category.objects.create(name='Desserts')
+        self.item = MenuItem.objects.create(name='Rasmalai', description='', price=Decimal('4.50'), category=category)
+
+    def test_codec_round_trip_ignores_garbage(self):
+        self.assertEqual(encode_cart({12: 2, 15: 1}), '12:2.15:1')
+        self.assertEqual(decode_cart('12:2.15:1.x:3.7:0'), {12: 2, 15: 1})
+
+    def test_legacy_session_cart_is_read(self):
+        session = self.client.session
+        session['cart'] = {str(self.item.id): {'name': 'Old name', 'price': 0.01, 'quantity': 3}}
+        session.save()
+        response = self.client.get(reverse('view_cart'))
+        self.assertEqual(response.context['cart_items'][0]['quantity'], 3)
+        self.assertEqual(response.context['cart_items'][0]['price'], Decimal('4.50'))
+
+    @override_settings(CART_STORAGE='cookie')
+    def test_cookie_cart_writes_no_session(self):
+        self.client.get(reverse('add_to_cart', args=[self.item.id]))
+        self.client.get(reverse('add_to_cart', args=[self.item.id]))
+        self.assertFalse(Session.objects.exists())
+        self.assertIn(':2', self.client.cookies['cart'].value)
+        response = self.client.get(reverse('view_cart'))
+        self.assertContains(response, 'Rasmalai')
+        self.assertEqual(response.context['total'], Decimal('9.00'))
+
+    @override_settings(CART_STORAGE='cookie')
+    def test_tampered_cookie_is_ignored(self):
+        self.client.cookies['cart'] = f'{self.item.id}:5'
+        self.assertEqual(self.client.get(reverse('view_cart')).context['cart_items'], [])
+
+
+class CartSummaryTests(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+        clear_local_menu_snapshot()
+        category = Category.objects.create(name='Beverages')
+        self.item = MenuItem.objects.create(name='Fresh Orange Juice', description='', price=Decimal('0.10'), category=category)
+
+    def test_decimal_totals_match_order_total(self):
+        self.client.post(reverse('api_update_cart', args=[self.item.id]), {'quantity': 3})
+        response = self.client.get(reverse('checkout'))
+        self.assertEqual(response.context['total'], Decimal('0.30'))
+        self.client.post(reverse('payment'), {
+            'customer_name': 'Asha', 'customer_email': 'asha@example.com', 'customer_phone': '1',
+            'table_number': '4', 'payment_method': 'Cash',
+        })
+        self.assertEqual(Order.objects.get().total_amount, response.context['total'])
+
+    def test_summary_saved_with_session_is_reused(self):
+        self.client.post(reverse('api_update_cart', args=[self.item.id]), {'quantity': 2})
+        with mock.patch.object(CartSummary, 'from_cart') as from_cart:
+            response = self.client.get(reverse('menu'))
+        from_cart.assert_not_called()
+        self.assertContains(response, '<span class="cart-count">2</span>', html=True)
+
+
+class CartApiTests(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+        clear_local_menu_snapshot()
+        category = Category.objects.create(name='Beverages')
+        self.lassi = MenuItem.objects.create(name='Mango Lassi', description='', price=Decimal('3.25'), category=category)
+        self.tea = MenuItem.objects.create(name='Lemon Iced Tea', description='', price=Decimal('2.50'), category=category)
+
+    def test_add_update_remove_return_summary(self):
+        self.client.post(reverse('api_add_to_cart', args=[self.lassi.id]))
+        data = self.client.post(reverse('api_add_to_cart', args=[self.tea.id])).json()
+        self.assertEqual((data['count'], data['total']), (2, '5.75'))
+
+        data = self.client.post(reverse('api_update_cart', args=[self.lassi.id]), {'quantity': 3}).json()
+        self.assertEqual((data['count'], data['total']), (4, '12.25'))
+
+        data = self.client.post(reverse('api_remove_from_cart', args=[self.tea.id])).json()
+        self.assertEqual(data['items'], [
+            {'id': self.lassi.id, 'name': 'Mango Lassi', 'price': '3.25', 'quantity': 3, 'subtotal': '9.75'}
+        ])
+
+    def test_errors_are_json(self):
+        self.assertEqual(self.client.post(reverse('api_add_to_cart', args=[999])).status_code, 404)
+        response = self.client.post(reverse('api_update_cart', args=[self.lassi.id]), {'quantity': 'many'})
+        self.assertEqual(response.json(), {'error': 'Invalid quantity'})
+        self.assertEqual(self.client.get(reverse('api_add_to_cart', args=[self.lassi.id])).status_code, 405)
+
+
+class PlaceOrderTests(TestCase):
+    def setUp(self):
+        category = Category.objects.create(name='Main Courses')
+        self.items = [
+            MenuItem.objects.create(name=f'Dish {i}', description='', price=Decimal('10.00') + i, category=category)
+            for i in range(5)
+        ]
+
+    def checkout_form(self):
+        return {
+            'customer_name': 'Asha', 'customer_email': 'asha@example.com', 'customer_phone': '7004125809',
+            'table_number': '4', 'payment_method': 'Cash',
+        }
+
+    def set_cart(self, items):
+        session = self.client.session
+        session['cart'] = encode_cart({item.id: 2 for item in items})
+        session.save()
+
+    def test_lines_are_repriced_from_database(self):
+        self.set_cart(self.items[:2])
+        self.client.post(reverse('payment'), self.checkout_form())
+        order = Order.objects.get()
+        self.assertEqual(order.total_amount, Decimal('42.00'))
+        self.assertEqual(sorted(order.items.values_list('price', flat=True)), [Decimal('10.00'), Decimal('11.00')])
+
+    def test_query_count_does_not_grow_with_lines(self):
+        counts = []
+        for items in (self.items[:1], self.items):
+            self.set_cart(items)
+            with CaptureQueriesContext(connection) as ctx:
+                self.client.post(reverse('payment'), self.checkout_form())
+            counts.append(len(ctx.captured_queries))
+        self.assertEqual(counts[0], counts[1])
+        self.assertEqual(OrderItem.objects.count(), 6)
+
+    def test_unavailable_item_leaves_no_partial_order(self):
+        self.items[1].is_available = False
+        self.items[1].save()
+        with self.assertRaises(OrderError):
+            place_order({self.items[0].id: 2, self.items[1].id: 2}, 'ORDER1', 'Asha', 'asha@example.com', '1', 4, 'Cash')
+        self.assertFalse(Order.objects.exists())
+
+
+
+class ReceiptTests(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+        category = Category.objects.create(name='Main Courses')
+        self.items = [
+            MenuItem.objects.create(name=f'Dish {i}', description='', price=Decimal('10.00') + i, category=category)
+            for i in range(3)
+        ]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.order, _ = place_order(
+                {item.id: 2 for item in self.items}, 'ORDER1', 'Asha', 'asha@example.com', '1', 4, 'Cash'
+            )
+        # Warm menu snapshot for the nav badge
+        clear_local_menu_snapshot()
+        get_menu_snapshot()
+
+    def test_completed_order_is_frozen_at_payment(self):
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.receipt['total_amount'], '66.00')
+        self.assertEqual(self.order.receipt['items'][0], ['Dish 0', 2, '10.00', '20.00'])
+
+    def test_receipt_is_served_from_cache(self):
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('receipt', args=['ORDER1']))
+        self.assertContains(response, 'Dish 2')
+        self.assertContains(response, '₹66.00')
+
+    def test_unfrozen_receipt_loads_lines_in_one_joined_query(self):
+        Order.objects.update(receipt=None)
+        caches['default'].delete('restaurant:receipt:ORDER1')
+        with self.assertNumQueries(3):
+            # Order, items joined to menu items, then the receipt is frozen
+            self.client.get(reverse('receipt', args=['ORDER1']))
+        self.assertIsNotNone(Order.objects.get().receipt)
+
+    def test_staff_edit_discards_frozen_receipt(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.order.customer_name = 'Asha Rao'
+            self.order.save()
+        self.assertIsNone(Order.objects.get().receipt)
+        self.assertContains(self.client.get(reverse('receipt', args=['ORDER1'])), 'Asha Rao')
+
+    def test_unknown_order_is_404(self):
+        self.assertEqual(self.client.get(reverse('receipt', args=['NOPE'])).status_code, 404)
+
+
+class OrderIdTests(TestCase):
+    def test_ids_are_unique_and_increasing(self):
+        generate = SnowflakeGenerator(node=1)
+        ids = [generate() for _ in range(5000)]
+        self.assertEqual(len(set(ids)), len(ids))
+        self.assertEqual(ids, sorted(ids))
+        self.assertTrue(all(len(order_id) == ID_LENGTH for order_id in ids))
+
+    def test_nodes_never_collide_in_the_same_millisecond(self):
+        with mock.patch('restaurant.order_ids.time.time', return_value=1800000000.0):
+            first = [SnowflakeGenerator(node=1)() for _ in range(3)]
+            second = [SnowflakeGenerator(node=2)() for _ in range(3)]
+        self.assertFalse(set(first) & set(second))
+
+    def test_clock_going_back_or_sequence_running_out_stays_monotonic(self):
+        generate = SnowflakeGenerator(node=1)
+        with mock.patch('restaurant.order_ids.time.time', return_value=1800000000.0):
+            ids = [generate() for _ in range(MAX_SEQUENCE + 3)]
+        with mock.patch('restaurant.order_ids.time.time', return_value=1799999999.0):
+            ids.append(generate())
+        self.assertEqual(ids, sorted(set(ids)))
+        # The 4097th ID in one millisecond borrows the next one
+        self.assertEqual(decode(ids[MAX_SEQUENCE + 1]) >> 22, (decode(ids[0]) >> 22) + 1)
+
+    def test_each_process_resolves_its_own_node(self):
+        with mock.patch.dict(os.environ, {'ORDER_ID_NODE': '7'}):
+            self.assertEqual(SnowflakeGenerator()._resolve_node(), 7)
+        # A claimed node stays locked, so the next claim gets another one
+        directory = tempfile.mkdtemp()
+        self.assertNotEqual(claim_node(directory), claim_node(directory))
+        with mock.patch.dict(os.environ, {'ORDER_ID_NODE': ''}), override_settings(ORDER_ID_NODE_DIR=directory):
+            self.assertNotIn(SnowflakeGenerator()._resolve_node(), (claim_node(directory), None))
+
+    def test_payment_uses_generator(self):
+        category = Category.objects.create(name='Main Courses')
+        item = MenuItem.objects.create(name='Dish', description='', price=Decimal('10.00'), category=category)
+        session = self.client.session
+        session['cart'] = encode_cart({item.id: 1})
+        session.save()
+        with override_settings(ORDER_ID_GENERATOR='restaurant.tests.fixed_order_id'):
+            self.client.post(reverse('payment'), {
+                'customer_name': 'Asha', 'customer_email': 'asha@example.com', 'customer_phone': '1',
+                'table_number': '4', 'payment_method': 'Cash',
+            })
+        self.assertEqual(Order.objects.get().order_id, 'FIXED00000001')
+
+    def test_payment_retries_a_duplicate_id(self):
+        category = Category.objects.create(name='Main Courses')
+        item = MenuItem.objects.create(name='Dish', description='', price=Decimal('10.00'), category=category)
+        place_order({item.id: 1}, 'FIXED00000001', 'Asha', 'asha@example.com', '1', 4, 'Cash')
+        session = self.client.session
+        session['cart'] = encode_cart({item.id: 2})
+        session.save()
+        with mock.patch('restaurant.views.new_order_id', side_effect=['FIXED00000001', 'FIXED00000002']):
+            self.client.post(reverse('payment'), {
+                'customer_name': 'Ravi', 'customer_email': 'ravi@example.com', 'customer_phone': '1',
+                'table_number': '4', 'payment_method': 'Cash',
+            })
+        self.assertEqual(Order.objects.get(order_id='FIXED00000002').customer_name, 'Ravi')
+
+
+def fixed_order_id():
+    return 'FIXED00000001'
+
+class OutboxTests(TestCase):
+    def test_reservation_queues_email_instead_of_sending(self):
+        self.client.post(reverse('reservations'), {
+            'name': 'Test User', 'email': 'test@example.com', 'phone': '1234567890',
+            'date': '2025-12-01', 'time': '18:00', 'guests': 4,
+        })
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(OutboxEmail.objects.get().recipient, 'test@example.com')
+
+    def test_batch_delivered_over_one_connection(self):
+        for i in range(3):
+            queue_email('Order Confirmation', 'Thanks!', f'guest{i}@example.com')
+        call_command('send_outbox', workers=1, stdout=StringIO())
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertEqual(OutboxEmail.objects.filter(status='sent').count(), 3)
+
+    def test_failed_delivery_is_retried_with_backoff(self):
+        email = queue_email('Order Confirmation', 'Thanks!', 'guest@example.com')
+        with mock.patch('django.core.mail.backends.locmem.EmailBackend.send_messages', side_effect=OSError('down')):
+            deliver_batch(claim_batch(10))
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), ('pending', 1))
+        self.assertGreater(email.next_attempt_at, timezone.now())
+        self.assertEqual(claim_batch(10), [])
+
+
+class TableAllocationTests(TestCase):
+    def setUp(self):
+        # Migrations seed a default floor plan; use a small known one here
+        Table.objects.all().delete()
+        self.two_top = Table.objects.create(number=1, capacity=2)
+        self.four_top = Table.objects.create(number=2, capacity=4)
+
+    def book(self, time, guests=2):
+        return book_table(date=datetime.date(2025, 12, 1), time=datetime.time(*time), guests=guests,
+                          name='Guest', email='guest@example.com', phone='1')
+
+    def test_best_fit_table_is_chosen(self):
+        self.assertEqual(self.book((18, 0)).table_number, 1)
+        self.assertEqual(self.book((18, 0), guests=3).table_number, 2)
+
+    def test_overlapping_bookings_never_share_a_table(self):
+        self.assertEqual(self.book((18, 0)).table_number, 1)
+        self.assertEqual(self.book((19, 30)).table_number, 2)
+        with self.assertRaises(NoTableAvailable):
+            self.book((18, 45))
+        self.assertEqual(self.book((20, 0)).table_number, 1)
+
+    def test_constant_number_of_queries(self):
+        with self.assertNumQueries(7):
+            self.book((12, 0))
+        with self.assertNumQueries(7):
+            self.book((12, 0), guests=4)
+
+    def test_cancelling_frees_the_table(self):
+        reservation = self.book((18, 0), guests=4)
+        reservation.status = 'cancelled'
+        reservation.save()
+        self.assertEqual(self.book((18, 0), guests=4).table_number, 2)
+
+    def test_parties_need_a_guest_and_a_time_that_ends_by_midnight(self):
+        with self.assertRaises(ValueError):
+            self.book((18, 0), guests=0)
+        with self.assertRaises(OutsideSeatingHours):
+            self.book((22, 30))
+        # Before the first seating, which availability never offers
+        with self.assertRaises(OutsideSeatingHours):
+            self.book((3, 0))
+        with override_settings(RESERVATION_LAST_SEATING='23:30'):
+            with self.assertRaises(OutsideSeatingHours):
+                self.book((23, 30))
+            self.assertEqual(self.book((22, 0)).table_number, 1)
+        for guests, time in [('0', '18:00'), ('2', '23:30')]:
+            self.client.post(reverse('reservations'), {
+                'name': 'Guest', 'email': 'guest@example.com', 'phone': '1',
+                'date': '2025-12-02', 'time': time, 'guests': guests,
+            })
+        self.assertFalse(Reservation.objects.filter(date=datetime.date(2025, 12, 2)).exists())
+
+    def test_reservations_added_in_the_admin_hold_their_table(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'pw'))
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('admin:restaurant_reservation_add'), {
+                'name': 'Walk-in', 'email': 'walkin@example.com', 'phone': '1', 'date': '2025-12-01',
+                'time': '18:00', 'guests': '2', 'table_number': '1', 'status': 'confirmed',
+            })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.book((18, 30)).table_number, 2)
+        with self.assertRaises(NoTableAvailable):
+            self.book((19, 0))
+
+
+
+@override_settings(RESERVATION_FIRST_SEATING='17:00', RESERVATION_LAST_SEATING='21:00')
+class AvailabilityTests(TestCase):
+    date = datetime.date(2025, 12, 24)
+
+    def setUp(self):
+        Table.objects.all().delete()
+        Table.objects.create(number=1, capacity=2)
+        Table.objects.create(number=2, capacity=4)
+
+    def book(self, time, guests=2):
+        return book_table(date=self.date, time=datetime.time(*time), guests=guests,
+                          name='Guest', email='guest@example.com', phone='1')
+
+    def slot(self, time, guests=2):
+        day, = slot_availability(self.date, self.date, guests)
+        return next(slot for slot in day['slots'] if slot['time'] == time)
+
+    def booked(self):
+        totals = {}
+        for slot, count in SlotCapacity.objects.filter(booked_tables__gt=0).values_list('slot', 'booked_tables'):
+            totals[slot] = totals.get(slot, 0) + count
+        return totals
+
+    def test_counts_follow_bookings_cancellations_and_deletes(self):
+        reservation = self.book((18, 0))
+        self.assertEqual(self.booked(), {36: 1, 37: 1, 38: 1, 39: 1})
+        self.book((19, 0), guests=4)
+        self.assertEqual(self.booked(), {36: 1, 37: 1, 38: 2, 39: 2, 40: 1, 41: 1})
+
+        reservation.status = 'cancelled'
+        reservation.save()
+        self.assertEqual(self.booked(), {38: 1, 39: 1, 40: 1, 41: 1})
+        Reservation.objects.all().delete()
+        self.assertEqual(self.booked(), {})
+
+    def test_retired_tables_are_not_counted(self):
+        # Counts are rebuilt from today on when a table changes
+        self.date = timezone.localdate() + datetime.timedelta(days=7)
+        spare = Table.objects.create(number=3, capacity=2)
+        self.assertEqual(self.book((18, 0)).table_number, 1)
+        retired = Table.objects.get(number=1)
+        retired.is_active = False
+        retired.save()
+        # Table 3 is still free at 18:00 though table 1 is booked and retired
+        self.assertEqual(self.slot('18:00')['free_tables'], 2)
+        self.assertTrue(self.slot('18:00')['available'])
+        self.assertEqual(self.book((18, 0)).table_number, spare.number)
+        self.assertEqual(self.slot('18:00')['free_tables'], 1)
+
+    def test_slots_report_free_tables_and_fit_for_party(self):
+        self.book((18, 0))
+        self.assertEqual(self.slot('18:00'), {'time': '18:00', 'free_tables': 1, 'free_seats': 4, 'available': True})
+        self.book((18, 0), guests=4)
+        self.assertFalse(self.slot('18:00')['available'])
+        # 19:30 would still overlap the 18:00 bookings; 20:00 is clear
+        self.assertFalse(self.slot('19:30')['available'])
+        self.assertTrue(self.slot('20:00')['available'])
+        self.assertFalse(self.slot('20:00', guests=5)['available'])
+
+    def test_cost_does_not_grow_with_reservations(self):
+        for hour in (17, 19, 21):
+            self.book((hour, 0))
+        with self.assertNumQueries(2):
+            slot_availability(self.date, self.date + datetime.timedelta(days=6), 2)
+
+    def test_api(self):
+        self.book((18, 0), guests=4)
+        response = self.client.get(reverse('reservation_availability'), {'start': '2025-12-24', 'guests': '3'})
+        day, = response.json()['dates']
+        self.assertEqual(day['date'], '2025-12-24')
+        self.assertEqual(day['slots'][0]['time'], '17:00')
+        self.assertFalse(next(slot for slot in day['slots'] if slot['time'] == '18:30')['available'])
+        self.assertEqual(self.client.get(reverse('reservation_availability'), {'start': 'soon'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('reservation_availability'),
+                                         {'start': '2025-12-01', 'end': '2025-12-31'}).status_code, 400)
+
+class QueryPlanTests(TestCase):
+    def test_hot_filters_use_indexes(self):
+        out = StringIO()
+        call_command('explain_queries', stdout=out)
+        for label in ['home: featured items', 'home: chefs', 'home: reviews', 'admin order: filter created_at',
+                      'admin reservation: filter date', 'reservations: free tables', 'admin order: keyset page',
+                      'admin contact: keyset page', 'admin review: keyset page']:
+            self.assertNotIn(f'[FULL SCAN] {label}\n', out.getvalue())
+
+
+
+class BenchmarkTests(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+        clear_local_menu_snapshot()
+
+    def test_seeding_spreads_orders_over_time(self):
+        seed_menu(20)
+        seed_orders(2500, days=30)
+        seed_reservations(1500, days=30)
+        self.assertEqual(MenuItem.objects.count(), 20)
+        self.assertEqual(Order.objects.count(), 2500)
+        self.assertGreaterEqual(OrderItem.objects.count(), 2500)
+        self.assertEqual(Reservation.objects.count(), 1500)
+        oldest = Order.objects.order_by('created_at').first()
+        self.assertLess(oldest.created_at, timezone.now() - datetime.timedelta(days=19))
+        self.assertFalse(Reservation.objects.filter(date__gte=timezone.localdate()).exists())
+
+    def test_client_funnel_reports_every_step(self):
+        seed_menu(10)
+        recorder = Recorder()
+        run_client_funnel(recorder, 2)
+        results = summarize(recorder, 1.0)
+        self.assertEqual(list(results), FUNNEL)
+        self.assertEqual(results['add_to_cart']['count'], 6)
+        self.assertTrue(all(step['errors'] == 0 for step in results.values()))
+        self.assertEqual(Order.objects.count(), 2)
+
+    def test_compare_flags_slower_p95_and_more_queries(self):
+        base = {'p95_ms': 10.0, 'max_queries': 2, 'errors': 0}
+        baseline = {'client': {'menu': base, 'home': base}}
+        results = {'client': {
+            'menu': {'p95_ms': 12.0, 'max_queries': 2, 'errors': 0},
+            'home': {'p95_ms': 14.0, 'max_queries': 3, 'errors': 0},
+        }}
+        self.assertEqual(compare(results, baseline, 0.25), [
+            'client home: p95 14.0ms vs 10.0ms',
+            'client home: 3 queries vs 2',
+        ])
+        self.assertEqual(percentile(list(range(1, 101)), 0.95), 95)
+
+    def test_compare_runs_on_real_results(self):
+        seed_menu(10)
+        recorder = Recorder()
+        run_client_funnel(recorder, 2)
+        results = {'meta': {'menu_items': 10, 'database': 'sqlite'}, 'client': summarize(recorder, 1.0)}
+        self.assertEqual(compare(results, results, 0.25), [])
+        self.assertEqual(failed_steps(results), [])
+        slower = json.loads(json.dumps(results))
+        slower['client']['payment'].update(errors=3, max_queries=99)
+        self.assertEqual(compare(slower, results, 0.25), [
+            f"client payment: 99 queries vs {results['client']['payment']['max_queries']}",
+            'client payment: 3 errors vs 0',
+        ])
+        self.assertEqual(failed_steps(slower), ['client payment: 3 errors'])
+
+
+class SeedDataTests(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+
+    def write(self, name, text):
+        path = os.path.join(self.tmpdir, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        return path
+
+    def test_populate_commands_are_idempotent(self):
+        for _ in range(2):
+            call_command('populate_menu', stdout=StringIO())
+            call_command('populate_chefs_reviews', stdout=StringIO())
+        self.assertEqual(Category.objects.count(), 4)
+        self.assertEqual(MenuItem.objects.count(), 18)
+        self.assertEqual(Chef.objects.count(), 4)
+        self.assertEqual(Review.objects.count(), 6)
+
+    def test_file_upserts_on_natural_key(self):
+        path = self.write('menu.csv', 'name,description,price,category\nSamosa,Crisp,3.50,Starters\nLassi,Sweet,2.00,Drinks\n')
+        call_command('seed_data', 'menu', file=path, stdout=StringIO())
+        path = self.write('menu.json', '[{"name": "Samosa", "description": "Crisper", "price": "4.00", "category": "Starters"}]')
+        call_command('seed_data', 'menu', file=path, stdout=StringIO())
+        self.assertEqual(MenuItem.objects.count(), 2)
+        self.assertEqual(MenuItem.objects.get(name='Samosa').price, Decimal('4.00'))
+
+        call_command('seed_data', 'menu', file=path, skip_existing=True, stdout=StringIO())
+        self.assertEqual(MenuItem.objects.get(name='Samosa').description, 'Crisper')
+
+    def test_orders_file_skips_existing_order_ids(self):
+        category = Category.objects.create(name='Mains')
+        dish = MenuItem.objects.create(name='Curry', description='Hot', price=Decimal('10.00'), category=category)
+        line = f'{{"order_id": "A1", "customer_name": "Asha", "customer_email": "a@example.com", ' \
+               f'"table_number": 3, "payment_method": "Cash", "items": [[{dish.id}, 2]]}}\n'
+        path = self.write('orders.jsonl', line)
+        for _ in range(2):
+            call_command('seed_data', 'orders', file=path, chunk_size=1, stdout=StringIO())
+        order = Order.objects.get()
+        self.assertEqual(order.total_amount, Decimal('20.00'))
+        self.assertEqual(order.items.count(), 1)
+
+    def test_future_reservations_from_a_file_hold_their_tables(self):
+        Table.objects.all().delete()
+        Table.objects.create(number=1, capacity=2)
+        upcoming = timezone.localdate() + datetime.timedelta(days=7)
+        past = timezone.localdate() - datetime.timedelta(days=7)
+        path = self.write('reservations.csv', 'name,email,date,time,guests,table_number\n'
+                                              f'Asha,a@example.com,{upcoming},18:00,2,1\n'
+                                              f'Ravi,r@example.com,{past},18:00,2,1\n')
+        call_command('seed_data', 'reservations', file=path, stdout=StringIO())
+        self.assertEqual(set(TableSlot.objects.values_list('date', flat=True)), {upcoming})
+        day, = slot_availability(upcoming, upcoming, 2)
+        self.assertFalse(next(slot for slot in day['slots'] if slot['time'] == '18:00')['available'])
+        with self.assertRaises(NoTableAvailable):
+            book_table(date=upcoming, time=datetime.time(19, 0), guests=2, name='Guest', email='g@example.com', phone='1')
+
+    def test_generated_rows_use_chunked_bulk_inserts(self):
+        seed_menu(5)
+        with CaptureQueriesContext(connection) as queries:
+            call_command('seed_data', 'chefs', size=250, chunk_size=100, stdout=StringIO())
+        self.assertEqual(Chef.objects.count(), 250)
+        inserts = [q for q in queries.captured_queries if q['sql'].startswith('INSERT')]
+        self.assertEqual(len(inserts), 3)
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        seed_menu(10)
+        seed_orders(30, days=30)
+        seed_reservations(20, days=30)
+
+    def test_admin_action_streams_csv_of_selected_orders(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'pw'))
+        orders = list(Order.objects.order_by('created_at')[:3])
+        response = self.client.post(reverse('admin:restaurant_order_changelist'), {
+            'action': 'export_csv', '_selected_action': [order.pk for order in orders],
+        })
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0].split(',')[0], 'order_id')
+        self.assertEqual([line.split(',')[0] for line in lines[1:]], [order.order_id for order in orders])
+        self.assertIn(' x ', lines[1])
+
+    def test_command_writes_jsonl_for_date_range_in_chunks(self):
+        since = timezone.localdate() - datetime.timedelta(days=10)
+        expected = Order.objects.filter(created_at__date__gte=since).count()
+        path = os.path.join(tempfile.mkdtemp(), 'orders.jsonl')
+        self.addCleanup(shutil.rmtree, os.path.dirname(path))
+        with CaptureQueriesContext(connection) as queries:
+            call_command('export_data', 'orders', '--format=jsonl', f'--since={since}', f'--output={path}', '--chunk-size=10')
+        with open(path, encoding='utf-8') as f:
+            rows = [json.loads(line) for line in f]
+        self.assertEqual(len(rows), expected)
+        self.assertTrue(all(row['items'] for row in rows))
+        # One query for each chunk of orders plus one for its lines
+        self.assertLessEqual(len(queries.captured_queries), 2 * (expected // 10 + 1))
+
+    def test_reservation_csv_filters_on_date(self):
+        day = Reservation.objects.order_by('date').first().date
+        out = StringIO()
+        call_command('export_data', 'reservations', f'--since={day}', f'--until={day}', stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertEqual(len(lines) - 1, Reservation.objects.filter(date=day).count())
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'pw'))
+        now = timezone.now()
+        for i in range(25):
+            Contact.objects.create(name=f'Guest {i}', email='g@example.com', subject=f'Subject {i}', message='Hi')
+        # Pairs share a timestamp so the id tie-break matters
+        for contact in Contact.objects.all():
+            Contact.objects.filter(pk=contact.pk).update(created_at=now - datetime.timedelta(minutes=contact.pk // 2))
+        self.newest_first = list(Contact.objects.order_by('-created_at', '-pk').values_list('subject', flat=True))
+        patcher = mock.patch.object(ContactAdmin, 'list_per_page', 10)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def page(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response, [contact.subject for contact in response.context['cl'].result_list]
+
+    def test_cursors_walk_every_row_once_in_both_directions(self):
+        url = reverse('admin:restaurant_contact_changelist')
+        response, subjects = self.page(url)
+        seen = subjects
+        while response.context['cl'].next_url:
+            response, subjects = self.page(url + response.context['cl'].next_url)
+            seen += subjects
+        self.assertEqual(seen, self.newest_first)
+
+        response, subjects = self.page(url + response.context['cl'].previous_url)
+        self.assertEqual(subjects, self.newest_first[10:20])
+
+    def test_no_unbounded_count(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('admin:restaurant_contact_changelist'))
+        counts = [q['sql'] for q in queries.captured_queries if 'COUNT(' in q['sql'] and 'restaurant_contact' in q['sql']]
+        self.assertTrue(counts)
+        self.assertTrue(all('LIMIT' in sql for sql in counts))
+
+    @override_settings(ADMIN_EXACT_COUNT_LIMIT=20)
+    def test_count_is_estimated_past_the_limit(self):
+        response = self.client.get(reverse('admin:restaurant_contact_changelist'))
+        self.assertContains(response, 'About 25 contacts')
+        response = self.client.get(reverse('admin:restaurant_contact_changelist') + '?q=Subject')
+        self.assertContains(response, 'More than 20 contacts')
+
+
+class SalesRollupTests(TestCase):
+    def setUp(self):
+        self.mains = Category.objects.create(name='Mains')
+        self.drinks = Category.objects.create(name='Drinks')
+        self.curry = MenuItem.objects.create(name='Curry', description='', price=Decimal('10.00'), category=self.mains)
+        self.lassi = MenuItem.objects.create(name='Lassi', description='', price=Decimal('3.00'), category=self.drinks)
+
+    def rollups(self):
+        return (
+            list(DailySales.objects.values_list('date', 'order_count', 'items_sold', 'revenue')),
+            sorted(DailyItemSales.objects.values_list('date', 'menu_item_id', 'quantity', 'revenue')),
+            sorted(DailyCategorySales.objects.values_list('date', 'category_id', 'quantity', 'revenue')),
+        )
+
+    def test_completed_orders_are_added_to_the_day(self):
+        place_order({self.curry.id: 2, self.lassi.id: 1}, 'A1', 'Asha', 'a@example.com', '1', 4, 'Cash')
+        place_order({self.curry.id: 1}, 'A2', 'Ravi', 'r@example.com', '1', 5, 'Card')
+        today = timezone.localdate()
+        day = DailySales.objects.get(date=today)
+        self.assertEqual((day.order_count, day.items_sold, day.revenue), (2, 4, Decimal('33.00')))
+        self.assertEqual(day.average_ticket, Decimal('16.50'))
+        self.assertEqual(DailyItemSales.objects.get(menu_item=self.curry).quantity, 3)
+        self.assertEqual(DailyCategorySales.objects.get(category=self.mains).revenue, Decimal('30.00'))
+
+        incremental = self.rollups()
+        call_command('rebuild_sales_rollups', stdout=StringIO())
+        self.assertEqual(self.rollups(), incremental)
+
+    def test_seeded_orders_match_a_rebuild(self):
+        seed_orders(300, days=10, chunk_size=30)
+        incremental = self.rollups()
+        self.assertGreaterEqual(len(incremental[0]), 10)
+        call_command('rebuild_sales_rollups', stdout=StringIO())
+        self.assertEqual(self.rollups(), incremental)
+
+    def test_dashboard_reads_only_rollups(self):
+        place_order({self.curry.id: 2}, 'A1', 'Asha', 'a@example.com', '1', 4, 'Cash')
+        self.client.force_login(User.objects.create_user('staff', password='pw', is_staff=True))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('sales_dashboard'))
+        self.assertContains(response, 'Curry')
+        self.assertContains(response, '₹20.00')
+        sql = ' '.join(q['sql'] for q in queries.captured_queries)
+        self.assertNotIn('"restaurant_order"', sql)
+        self.assertNotIn('"restaurant_orderitem"', sql)
+
+
+class KitchenDisplayTests(TestCase):
+    def setUp(self):
+        category = Category.objects.create(name='Mains')
+        self.curry = MenuItem.objects.create(name='Curry', description='', price=Decimal('10.00'), category=category)
+
+    def test_one_order_fans_out_to_every_screen(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            place_order({self.curry.id: 2}, 'K1', 'Asha', 'a@example.com', '1', 7, 'Cash')
+
+        async def screens():
+            streams = [event_stream() for _ in range(3)]
+            for stream in streams:
+                self.assertEqual(await anext(stream), 'retry: 3000\n\n')
+            for callback in callbacks:
+                callback()
+            events = [await anext(stream) for stream in streams]
+            for stream in streams:
+                await stream.aclose()
+            return events
+
+        with self.assertNumQueries(0):
+            events = asyncio.run(screens())
+        self.assertEqual(len(set(events)), 1)
+        kind, data = events[0].split('\n')[1:3]
+        self.assertEqual(kind, 'event: order.created')
+        order = json.loads(data.removeprefix('data: '))
+        self.assertEqual((order['order_id'], order['table_number']), ('K1', 7))
+        self.assertEqual(order['items'], [{'name': 'Curry', 'quantity': 2}])
+        self.assertEqual(broker.subscriber_count, 0)
+
+    def test_reconnecting_screen_gets_missed_events(self):
+        first = broker.publish('order.deleted', {'order_id': 'A'})
+        broker.publish('order.deleted', {'order_id': 'B'})
+
+        async def reconnect():
+            stream = event_stream(last_event_id=first)
+            await anext(stream)
+            event = await anext(stream)
+            await stream.aclose()
+            return event
+
+        self.assertIn('"order_id": "B"', asyncio.run(reconnect()))
+
+    def test_admin_edit_publishes_update(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            order, _ = place_order({self.curry.id: 1}, 'K2', 'Ravi', 'r@example.com', '1', 3, 'Card')
+        with self.captureOnCommitCallbacks(execute=True):
+            order.table_number = 9
+            order.save()
+        event_type, data = broker._history[-1][1:]
+        self.assertEqual(event_type, 'order.updated')
+        self.assertEqual(json.loads(data)['table_number'], 9)
+
+    def test_one_event_per_order_per_transaction(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            order, items = place_order({self.curry.id: 1}, 'K3', 'Ravi', 'r@example.com', '1', 3, 'Card')
+        last_event_id = broker.last_event_id
+        # An admin save with inlines: the order, then each of its lines
+        with self.captureOnCommitCallbacks(execute=True), transaction.atomic():
+            order.table_number = 5
+            order.save()
+            for line in OrderItem.objects.filter(order=order):
+                line.quantity = 4
+                line.save()
+            OrderItem.objects.create(order=order, menu_item=self.curry, quantity=1, price=self.curry.price)
+        self.assertEqual(broker.last_event_id, last_event_id + 1)
+        event_type, data = broker._history[-1][1:]
+        self.assertEqual(event_type, 'order.updated')
+        self.assertEqual([line['quantity'] for line in json.loads(data)['items']], [4, 1])
+
+    async def test_event_stream_view_is_staff_only(self):
+        response = await self.async_client.get(reverse('kitchen_events'))
+        self.assertEqual(response.status_code, 302)
+        user = await User.objects.acreate_user('cook', password='pw', is_staff=True)
+        await self.async_client.aforce_login(user)
+        response = await self.async_client.get(reverse('kitchen_events'))
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = aiter(response.streaming_content)
+        self.assertEqual(await anext(stream), b'retry: 3000\n\n')
+        broker.publish('order.deleted', {'order_id': 'Z'})
+        self.assertIn(b'event: order.deleted', await anext(stream))
+        await response.streaming_content.aclose()
+
+    def test_event_stream_needs_asgi(self):
+        self.client.force_login(User.objects.create_user('cook', password='pw', is_staff=True))
+        response = self.client.get(reverse('kitchen_events'))
+        self.assertEqual(response.status_code, 501)
+
+class MenuSearchTests(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+        clear_local_menu_snapshot()
+        mains = Category.objects.create(name='Main Courses')
+        desserts = Category.objects.create(name='Desserts')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.tikka = MenuItem.objects.create(name='Chicken Tikka', description='Charred in the tandoor',
+                                                 price=Decimal('12.00'), category=mains)
+            self.chana = MenuItem.objects.create(name='Chana Masala', description='Chickpeas in a spiced gravy',
+                                                 price=Decimal('9.00'), category=mains)
+            MenuItem.objects.create(name='Crème Brûlée', description='Vanilla custard', price=Decimal('6.00'), category=desserts)
+
+    def search(self, query, **params):
+        response = self.client.get(reverse('menu_search'), {'q': query, **params})
+        return [item['name'] for item in response.json()['results']]
+
+    def test_words_match_by_prefix_and_name_ranks_first(self):
+        self.assertEqual(self.search('chick'), ['Chicken Tikka', 'Chana Masala'])
+        self.assertEqual(self.search('tik CHI'), ['Chicken Tikka'])
+        self.assertEqual(self.search('creme brul'), ['Crème Brûlée'])
+        self.assertEqual(self.search('dessert'), ['Crème Brûlée'])
+        self.assertEqual(self.search('chicken custard'), [])
+        self.assertEqual(self.search(''), [])
+
+    def test_saves_are_searchable_straight_away(self):
+        self.search('chick')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.tikka.name = 'Murgh Tikka'
+            self.tikka.save()
+            self.chana.is_available = False
+            self.chana.save()
+        self.assertEqual(self.search('murgh'), ['Murgh Tikka'])
+        self.assertEqual(self.search('chick'), [])
+
+    def test_warm_search_runs_no_queries(self):
+        self.search('tikka')
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('menu_search'), {'q': 'chana', 'limit': 1})
+        self.assertEqual(response.json()['results'][0]['price'], '9.00')
+        self.assertEqual(self.client.get(reverse('menu_search'), {'q': 'a', 'limit': 0}).status_code, 400)
+
+    def test_index_is_not_cached_with_the_snapshot(self):
+        snapshot = get_menu_snapshot()
+        self.assertEqual(len(snapshot.search_index.search('masala')), 1)
+        self.assertNotIn('search_index', pickle.loads(pickle.dumps(snapshot)).__dict__)
+
+
+class SQLiteTuningTests(TestCase):
+    def test_production_profile_is_opt_in(self):
+        # Settings as a fresh process reads them, with and without the flag
+        code = ("from django.conf import settings; "
+                "print(settings.SQLITE_PRAGMAS.get('journal_mode'), "
+                "settings.DATABASES['default']['OPTIONS'].get('transaction_mode'))")
+        for flag, expected in [('', 'None None'), ('1', 'wal IMMEDIATE')]:
+            result = subprocess.run(
+                [sys.executable, 'manage.py', 'shell', '--no-imports', '-c', code], cwd=settings.BASE_DIR,
+                env={**os.environ, 'SQLITE_PRODUCTION': flag}, capture_output=True, text=True, timeout=60,
+            )
+            self.assertEqual(result.stdout.strip(), expected, result.stderr)
+
+    @override_settings(SQLITE_PRAGMAS={'busy_timeout': 1234, 'synchronous': 'normal'})
+    def test_new_connections_get_the_pragmas(self):
+        new_connection = connection.copy()
+        try:
+            with new_connection.cursor() as cursor:
+                cursor.execute('PRAGMA busy_timeout')
+                self.assertEqual(cursor.fetchone()[0], 1234)
+                cursor.execute('PRAGMA synchronous')
+                self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+        finally:
+            new_connection.close()
+
+    def test_concurrent_payments_and_bookings_do_not_fail(self):
+        # Run against a real database file in its own process; the test
+        # database is in memory, where neither WAL nor busy_timeout applies
+        path = os.path.join(tempfile.mkdtemp(), 'stress.sqlite3')
+        result = subprocess.run(
+            [sys.executable, 'manage.py', 'stress_writes', '--database', path, '--workers', '6', '--rounds', '5'],
+            cwd=settings.BASE_DIR, capture_output=True, text=True, timeout=300,
+        )
+        self.assertEqual(result.returncode, 0, result.stdout + result.stderr)
+        self.assertRegex(result.stdout, r'payment\s+30\s+ok')
+        self.assertRegex(result.stdout, r'reservation\s+30\s+ok')
+        self.assertIn('No failed writes', result.stdout)
+        self.assertFalse(os.path.exists(path))
+
+
+@override_settings(REPLICA_DATABASE='replica')
+class ReplicaRoutingTests(TransactionTestCase):
+    # Two separate SQLite databases; the replica only sees what sync_replica copies
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        caches['default'].clear()
+        clear_local_menu_snapshot()
+        self.category = Category.objects.create(name='Mains')
+        About.objects.create(title='Our Story', content='Since 1990')
+        call_command('sync_replica', stdout=StringIO())
+
+    def test_catalog_reads_use_the_replica_until_a_write(self):
+        with read_scope() as wrote:
+            self.assertEqual(MenuItem.objects.all().db, 'replica')
+            self.assertEqual(Order.objects.all().db, 'default')
+            self.assertEqual(reporting_db(), 'replica')
+            MenuItem.objects.create(name='Curry', description='', price=Decimal('10.00'), category=self.category)
+            self.assertTrue(wrote())
+            self.assertEqual(MenuItem.objects.get().name, 'Curry')
+            self.assertEqual(reporting_db(), 'default')
+        with read_scope():
+            self.assertFalse(MenuItem.objects.exists())
+            call_command('sync_replica', stdout=StringIO())
+            self.assertTrue(MenuItem.objects.exists())
+
+    def test_request_that_writes_is_sticky_to_the_primary(self):
+        About.objects.update(content='Since 1991')
+        self.assertContains(self.client.get(reverse('about')), 'Since 1990')
+        response = self.client.post(reverse('contact'), {'name': 'A', 'email': 'a@example.com', 'subject': 'Hi', 'message': 'Hello'})
+        self.assertIn(PIN_COOKIE, response.cookies)
+        self.assertContains(self.client.get(reverse('about')), 'Since 1991')
+        del self.client.cookies[PIN_COOKIE]
+        self.assertContains(self.client.get(reverse('about')), 'Since 1990')
+
+    def test_exports_read_from_the_replica(self):
+        Order.objects.create(order_id='R1', customer_name='A', customer_email='a@example.com', customer_phone='1',
+                             table_number=1, total_amount=Decimal('1.00'), payment_method='Cash')
+        with read_scope():
+            self.assertNotIn('R1', ''.join(export_lines('orders', 'csv')))
+            call_command('sync_replica', stdout=StringIO())
+            self.assertIn('R1', ''.join(export_lines('orders', 'csv')))
+        with read_scope(pinned=True):
+            Order.objects.create(order_id='R2', customer_name='A', customer_email='a@example.com', customer_phone='1',
+                                 table_number=1, total_amount=Decimal('1.00'), payment_method='Cash')
+            self.assertIn('R2', ''.join(export_lines('orders', 'csv')))
+            response = export_response('orders', 'csv')
+        # Streamed after the scope ends, still from the primary it was pinned to
+        self.assertIn(b'R2', b''.join(response.streaming_content))
+
+    def test_writes_outside_a_read_scope_pin_nothing(self):
+        self.assertEqual(reporting_db(), 'replica')
+        Order.objects.create(order_id='R3', customer_name='A', customer_email='a@example.com', customer_phone='1',
+                             table_number=1, total_amount=Decimal('1.00'), payment_method='Cash')
+        self.assertEqual(reporting_db(), 'replica')
+        self.assertEqual(MenuItem.objects.all().db, 'replica')
+
+
+@override_settings(INSTRUMENTATION_SAMPLE_RATE=1.0)
+class AsyncPageTests(TestCase):
+    # The async client runs the ASGI handler: an async middleware chain and
+    # the views on the event loop, where any synchronous query would raise
+    def setUp(self):
+        caches['default'].clear()
+        clear_local_menu_snapshot()
+        category = Category.objects.create(name='Main Courses')
+        self.curry = MenuItem.objects.create(name='Curry', description='', price=Decimal('10.00'), category=category)
+        About.objects.create(title='Our Story', content='Since 1990')
+        with self.captureOnCommitCallbacks(execute=True):
+            Chef.objects.create(name='Marco Rossi', position='Head Chef', bio='Pasta')
+            place_order({self.curry.id: 2}, 'ORDER1', 'Asha', 'asha@example.com', '1', 4, 'Cash')
+
+    def test_read_views_are_coroutines(self):
+        for view in (views.home, views.menu, views.about, views.receipt):
+            self.assertTrue(asyncio.iscoroutinefunction(view), view.__name__)
+
+    async def test_pages_render_from_a_cold_cache(self):
+        await caches['default'].aclear()
+        clear_local_menu_snapshot()
+        await self.async_client.get(reverse('add_to_cart', args=[self.curry.id]))
+        pages = [('home', [], 'Marco Rossi'), ('menu', [], 'Curry'), ('about', [], 'Since 1990'),
+                 ('receipt', ['ORDER1'], 'Asha')]
+        for name, args, text in pages:
+            response = await self.async_client.get(reverse(name, args=args))
+            self.assertContains(response, text)
+            self.assertContains(response, 'cart-count">1<')
+        response = await self.async_client.get(reverse('receipt', args=['NOPE']))
+        self.assertEqual(response.status_code, 404)
+
+    async def test_queries_are_counted_cold_and_skipped_warm(self):
+        # The ORM runs on a sync_to_async thread's connection, not the loop's
+        def queries(response):
+            return int(re.search(r'"(\d+) queries"', response['Server-Timing']).group(1))
+
+        for name, args in [('home', []), ('menu', []), ('receipt', ['ORDER1'])]:
+            await caches['default'].aclear()
+            clear_local_menu_snapshot()
+            cold = await self.async_client.get(reverse(name, args=args))
+            self.assertGreater(queries(cold), 0, name)
+            warm = await self.async_client.get(reverse(name, args=args))
+            self.assertEqual(queries(warm), 0, name)
+
+
+@override_settings(INSTRUMENTATION_SAMPLE_RATE=1.0)
+class QueryBudgetTests(TestCase):
+    # Upper bounds on queries per view, with a non-empty session and a warm menu cache
+    budgets = {
+        'home': 0,
+        'menu': 0,
+        'order_food': 1,
+        'view_cart': 1,
+        'checkout': 1,
+        # Order, lines, receipt, outbox and two queries for each of the three sales rollups
+        'payment': 16,
+        # Order row with its frozen receipt; a warm cache needs none
+        'receipt': 1,
+    }
+
+    def setUp(self):
+        caches['default'].clear()
+        clear_local_menu_snapshot()
+        metrics.reset()
+        category = Category.objects.create(name='Main Courses')
+        self.items = [
+            MenuItem.objects.create(name=f'Dish {i}', description='', price=Decimal('10.00'), category=category)
+            for i in range(3)
+        ]
+        for item in self.items:
+            self.client.get(reverse('add_to_cart', args=[item.id]))
+        self.client.get(reverse('menu'))
+        self.client.get(reverse('home'))
+
+    def server_timing_queries(self, response):
+        return int(re.search(r'"(\d+) queries"', response['Server-Timing']).group(1))
+
+    def assertWithinBudget(self, name, response):
+        self.assertLessEqual(self.server_timing_queries(response), self.budgets[name], name)
+
+    def test_read_views_stay_within_budget(self):
+        for name in ['home', 'menu', 'order_food', 'view_cart', 'checkout']:
+            self.assertWithinBudget(name, self.client.get(reverse(name)))
+
+    def test_payment_and_receipt_stay_within_budget(self):
+        response = self.client.post(reverse('payment'), {
+            'customer_name': 'Asha', 'customer_email': 'asha@example.com', 'customer_phone': '1',
+            'table_number': '4', 'payment_method': 'Cash',
+        })
+        self.assertWithinBudget('payment', response)
+        self.assertWithinBudget('receipt', self.client.get(response['Location']))
+
+    def test_metrics_are_staff_only(self):
+        metrics.reset()
+        self.client.get(reverse('home'))
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 302)
+        staff = User.objects.create_user('staff', password='pw', is_staff=True)
+        self.client.force_login(staff)
+        data = self.client.get(reverse('metrics')).json()
+        self.assertEqual(data['home']['latency_ms']['count'], 1)
+        self.assertIn('p95', data['home']['queries'])
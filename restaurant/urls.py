@@ -7,12 +7,21 @@ urlpatterns = [
     path('about/', views.about, name='about'),
     path('contact/', views.contact, name='contact'),
     path('reservations/', views.reservations, name='reservations'),
+    path('api/reservations/availability/', views.reservation_availability, name='reservation_availability'),
+    path('api/menu/search/', views.menu_search, name='menu_search'),
     path('order/', views.order_food, name='order_food'),
     path('cart/', views.view_cart, name='view_cart'),
     path('add-to-cart/<int:item_id>/', views.add_to_cart, name='add_to_cart'),
     path('update-cart/<int:item_id>/', views.update_cart, name='update_cart'),
     path('remove-from-cart/<int:item_id>/', views.remove_from_cart, name='remove_from_cart'),
+    path('api/cart/add/<int:item_id>/', views.api_add_to_cart, name='api_add_to_cart'),
+    path('api/cart/update/<int:item_id>/', views.api_update_cart, name='api_update_cart'),
+    path('api/cart/remove/<int:item_id>/', views.api_remove_from_cart, name='api_remove_from_cart'),
     path('checkout/', views.checkout, name='checkout'),
     path('payment/', views.payment, name='payment'),
     path('receipt/<str:order_id>/', views.receipt, name='receipt'),
+    path('metrics/', views.metrics, name='metrics'),
+    path('dashboard/sales/', views.sales_dashboard, name='sales_dashboard'),
+    path('kitchen/', views.kitchen, name='kitchen'),
+    path('kitchen/events/', views.kitchen_events, name='kitchen_events'),
 ]
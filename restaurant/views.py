@@ -1,30 +1,61 @@
-from django.shortcuts import render, redirect, get_object_or_404
-from django.contrib import messages
-from django.core.mail import send_mail
+from django.shortcuts import render, redirect
 from django.conf import settings
-from .models import MenuItem, Category, About, Contact, Reservation, Order, OrderItem, Chef, Review
-import random
-import string
-from datetime import datetime
-
-def home(request):
-    featured_items = MenuItem.objects.filter(is_available=True)[:6]
-    categories_count = Category.objects.count()
-    chefs = Chef.objects.filter(is_active=True)[:4]
-    reviews = Review.objects.filter(is_featured=True, is_approved=True)[:6]
+from django.contrib import messages
+from django.contrib.admin.views.decorators import staff_member_required
+from django.db import IntegrityError
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils.dateparse import parse_date, parse_time
+from django.views.decorators.http import require_GET, require_POST
+from .models import About, Contact, Order, Chef, Review
+from .menu_cache import aget_cached_list, aget_menu_snapshot, aget_versions, get_menu_snapshot
+from .cart import aget_cart_summary, get_cart, get_cart_summary, save_cart
+from .services import OrderError, place_order
+from .outbox import queue_email
+from .allocation import NoTableAvailable, OutsideSeatingHours, book_table, slot_availability
+from .receipts import aget_receipt, receipt_context
+from .order_ids import new_order_id
+from .instrumentation import metrics as route_metrics
+from .sales import sales_report
+from .kitchen import broker, event_stream
+from django.utils import timezone
+from datetime import datetime, timedelta
+
+# Fresh order IDs tried before a duplicate-ID failure is given up on
+ORDER_ID_ATTEMPTS = 3
+
+# home, menu, about and receipt are async: under ASGI they run on the event
+# loop, read through the async cache and ORM APIs, and load the session (for
+# the nav badge) before rendering, so the template itself never does I/O.
+
+async def home(request):
+    # Every section is a cached fragment keyed on its content version; chefs
+    # and reviews are cached as lists under the same versions, so a warm page
+    # runs no queries at all
+    snapshot = await aget_menu_snapshot()
+    versions = await aget_versions('menu', 'chefs', 'reviews')
+    chefs = await aget_cached_list('chefs', versions['chefs'], Chef.objects.filter(is_active=True)[:4])
+    reviews = await aget_cached_list(
+        'reviews', versions['reviews'], Review.objects.filter(is_featured=True, is_approved=True)[:6],
+    )
+    await aget_cart_summary(request)
     return render(request, 'restaurant/home.html', {
-        'featured_items': featured_items,
-        'categories_count': categories_count,
+        'featured_items': snapshot.first_items(6),
+        'categories_count': len(snapshot.categories),
         'chefs': chefs,
         'reviews': reviews,
+        'versions': versions,
+        'fragment_timeout': settings.HOME_FRAGMENT_TIMEOUT,
     })
 
-def menu(request):
-    categories = Category.objects.prefetch_related('items').all()
-    return render(request, 'restaurant/menu.html', {'categories': categories})
+async def menu(request):
+    snapshot = await aget_menu_snapshot()
+    await aget_cart_summary(request)
+    return render(request, 'restaurant/menu.html', {'categories': snapshot.categories})
 
-def about(request):
-    about_info = About.objects.first()
+async def about(request):
+    about_info = await About.objects.afirst()
+    await aget_cart_summary(request)
     return render(request, 'restaurant/about.html', {'about': about_info})
 
 def contact(request):
@@ -55,25 +86,35 @@ def reservations(request):
         guests = request.POST.get('guests')
         special_requests = request.POST.get('special_requests', '')
         
-        # Assign random table number
-        table_number = random.randint(1, 20)
-        
-        reservation = Reservation.objects.create(
-            name=name,
-            email=email,
-            phone=phone,
-            date=date,
-            time=time,
-            guests=guests,
-            table_number=table_number,
-            special_requests=special_requests
-        )
+        reservation_date = parse_date(date or '')
+        reservation_time = parse_time(time or '')
+        if reservation_date is None or reservation_time is None or not (guests or '').isdigit() or int(guests) < 1:
+            messages.warning(request, 'Please enter a valid date, time and number of guests.')
+            return redirect('reservations')
         
-        # Send email notification
+        # Assign the smallest free table that fits the party
         try:
-            send_mail(
-                subject='Table Reservation Confirmation - Delicious Bites',
-                message=f'''Dear {name},
+            reservation = book_table(
+                date=reservation_date,
+                time=reservation_time,
+                guests=int(guests),
+                name=name,
+                email=email,
+                phone=phone,
+                special_requests=special_requests
+            )
+        except NoTableAvailable:
+            messages.warning(request, f'Sorry, no table for {guests} guests is available at that time. Please choose another time.')
+            return redirect('reservations')
+        except OutsideSeatingHours as e:
+            messages.warning(request, str(e))
+            return redirect('reservations')
+        table_number = reservation.table_number
+        
+        # Queue email notification (delivered by the send_outbox worker)
+        queue_email(
+            subject='Table Reservation Confirmation - Delicious Bites',
+            message=f'''Dear {name},
 
 Thank you for choosing Delicious Bites!
 
@@ -90,122 +131,151 @@ We look forward to serving you!
 Best regards,
 Delicious Bites Team
 Phone: 7004125809''',
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=[email],
-                fail_silently=True,
-            )
-        except:
-            pass
+            recipient=email
+        )
         
         messages.success(request, f'Your table #{table_number} has been reserved! Confirmation sent to {email} and {phone}.')
         return redirect('reservations')
     
     return render(request, 'restaurant/reservations.html')
 
-# Cart and Order Functions
-def get_cart(request):
-    return request.session.get('cart', {})
+# Free capacity per seating slot, used by static/js/reservations.js before the
+# form is submitted: /api/reservations/availability/?start=2025-12-24&end=2025-12-26&guests=4
+@require_GET
+def reservation_availability(request):
+    start = parse_date(request.GET.get('start', ''))
+    end = parse_date(request.GET.get('end', '')) if request.GET.get('end') else start
+    guests = request.GET.get('guests', '2')
+    if start is None or end is None or end < start or not guests.isdigit() or int(guests) < 1:
+        return JsonResponse({'error': 'Give a start date, an optional end date and a number of guests'}, status=400)
+    max_days = getattr(settings, 'RESERVATION_AVAILABILITY_MAX_DAYS', 14)
+    if (end - start).days >= max_days:
+        return JsonResponse({'error': f'At most {max_days} days at a time'}, status=400)
+    return JsonResponse({
+        'guests': int(guests),
+        'dates': slot_availability(start, end, int(guests)),
+    })
 
-def save_cart(request, cart):
-    request.session['cart'] = cart
-    request.session.modified = True
+# Menu search, used by static/js/menu_search.js: /api/menu/search/?q=paneer+tik&limit=10.
+# Served from the in-process index of the menu snapshot (restaurant/search.py)
+@require_GET
+def menu_search(request):
+    query = request.GET.get('q', '').strip()
+    limit = request.GET.get('limit', '20')
+    max_results = getattr(settings, 'MENU_SEARCH_MAX_RESULTS', 50)
+    if not limit.isdigit() or not 1 <= int(limit) <= max_results:
+        return JsonResponse({'error': f'limit must be between 1 and {max_results}'}, status=400)
+    items = get_menu_snapshot().search_index.search(query, int(limit))
+    return JsonResponse({
+        'query': query,
+        'results': [{
+            'id': item['id'],
+            'name': item['name'],
+            'description': item['description'],
+            'price': f"{item['price']:.2f}",
+            'image_url': item['image_url'],
+            'category_id': item['category_id'],
+        } for item in items],
+    })
 
+# Cart and Order Functions
 def order_food(request):
-    categories = Category.objects.prefetch_related('items').all()
-    cart = get_cart(request)
-    cart_count = sum(item['quantity'] for item in cart.values())
+    snapshot = get_menu_snapshot()
     return render(request, 'restaurant/order_food.html', {
-        'categories': categories,
-        'cart_count': cart_count
+        'categories': snapshot.categories,
+        'cart_count': get_cart_summary(request).count
     })
 
 def add_to_cart(request, item_id):
-    menu_item = get_object_or_404(MenuItem, id=item_id, is_available=True)
+    menu_item = get_menu_snapshot().get_item(item_id)
+    if menu_item is None:
+        raise Http404('Menu item not available')
     cart = get_cart(request)
     
-    item_id_str = str(item_id)
-    if item_id_str in cart:
-        cart[item_id_str]['quantity'] += 1
-    else:
-        cart[item_id_str] = {
-            'name': menu_item.name,
-            'price': float(menu_item.price),
-            'quantity': 1
-        }
+    cart[item_id] = cart.get(item_id, 0) + 1
     
     save_cart(request, cart)
-    messages.success(request, f'{menu_item.name} added to cart!')
+    messages.success(request, f'{menu_item["name"]} added to cart!')
     return redirect('order_food')
 
 def update_cart(request, item_id):
     if request.method == 'POST':
         cart = get_cart(request)
-        item_id_str = str(item_id)
         quantity = int(request.POST.get('quantity', 1))
         
         if quantity > 0:
-            cart[item_id_str]['quantity'] = quantity
+            cart[item_id] = quantity
         else:
-            del cart[item_id_str]
+            cart.pop(item_id, None)
         
         save_cart(request, cart)
     return redirect('view_cart')
 
 def remove_from_cart(request, item_id):
     cart = get_cart(request)
-    item_id_str = str(item_id)
     
-    if item_id_str in cart:
-        del cart[item_id_str]
+    if item_id in cart:
+        del cart[item_id]
         save_cart(request, cart)
         messages.success(request, 'Item removed from cart!')
     
     return redirect('view_cart')
 
-def view_cart(request):
+# JSON cart API used by static/js/cart.js: each call returns the updated cart
+# summary instead of redirecting to a full page render
+def cart_summary_json(request, status=200, **extra):
+    return JsonResponse({**get_cart_summary(request).as_json(), **extra}, status=status)
+
+@require_POST
+def api_add_to_cart(request, item_id):
+    menu_item = get_menu_snapshot().get_item(item_id)
+    if menu_item is None:
+        return JsonResponse({'error': 'Menu item not available'}, status=404)
     cart = get_cart(request)
-    cart_items = []
-    total = 0
-    
-    for item_id, item_data in cart.items():
-        subtotal = item_data['price'] * item_data['quantity']
-        cart_items.append({
-            'id': item_id,
-            'name': item_data['name'],
-            'price': item_data['price'],
-            'quantity': item_data['quantity'],
-            'subtotal': subtotal
-        })
-        total += subtotal
+    cart[item_id] = cart.get(item_id, 0) + 1
+    save_cart(request, cart)
+    return cart_summary_json(request, message=f'{menu_item["name"]} added to cart!')
+
+@require_POST
+def api_update_cart(request, item_id):
+    try:
+        quantity = int(request.POST.get('quantity', 1))
+    except ValueError:
+        return JsonResponse({'error': 'Invalid quantity'}, status=400)
+    if quantity > 99:
+        return JsonResponse({'error': 'Maximum quantity is 99'}, status=400)
+    cart = get_cart(request)
+    if quantity > 0:
+        cart[item_id] = quantity
+    else:
+        cart.pop(item_id, None)
+    save_cart(request, cart)
+    return cart_summary_json(request)
+
+@require_POST
+def api_remove_from_cart(request, item_id):
+    cart = get_cart(request)
+    if cart.pop(item_id, None) is not None:
+        save_cart(request, cart)
+    return cart_summary_json(request)
+
+def view_cart(request):
+    summary = get_cart_summary(request)
     
     return render(request, 'restaurant/cart.html', {
-        'cart_items': cart_items,
-        'total': total
+        'cart_items': summary.lines,
+        'total': summary.total
     })
 
 def checkout(request):
-    cart = get_cart(request)
-    if not cart:
+    summary = get_cart_summary(request)
+    if not summary.lines:
         messages.warning(request, 'Your cart is empty!')
         return redirect('order_food')
     
-    cart_items = []
-    total = 0
-    
-    for item_id, item_data in cart.items():
-        subtotal = item_data['price'] * item_data['quantity']
-        cart_items.append({
-            'id': item_id,
-            'name': item_data['name'],
-            'price': item_data['price'],
-            'quantity': item_data['quantity'],
-            'subtotal': subtotal
-        })
-        total += subtotal
-    
     return render(request, 'restaurant/checkout.html', {
-        'cart_items': cart_items,
-        'total': total
+        'cart_items': summary.lines,
+        'total': summary.total
     })
 
 def payment(request):
@@ -222,42 +292,36 @@ def payment(request):
         table_number = int(request.POST.get('table_number'))
         payment_method = request.POST.get('payment_method')
         
-        # Generate order ID
-        order_id = ''.join(random.choices(string.ascii_uppercase + string.digits, k=10))
+        # Create order and order items in one transaction; if the order ID
+        # is already taken (two workers on one node), retry with a fresh one
+        for attempt in range(ORDER_ID_ATTEMPTS):
+            order_id = new_order_id()
+            try:
+                order, order_items = place_order(
+                    cart,
+                    order_id=order_id,
+                    customer_name=customer_name,
+                    customer_email=customer_email,
+                    customer_phone=customer_phone,
+                    table_number=table_number,
+                    payment_method=payment_method
+                )
+                break
+            except IntegrityError:
+                if attempt == ORDER_ID_ATTEMPTS - 1:
+                    raise
+            except OrderError as e:
+                messages.warning(request, str(e))
+                return redirect('view_cart')
+        total = order.total_amount
         
-        # Calculate total
-        total = sum(item['price'] * item['quantity'] for item in cart.values())
+        # Queue confirmation email (delivered by the send_outbox worker)
+        items_text = '\n'.join([f"  {item.quantity}x {item.menu_item.name} - ₹{item.get_total():.2f}" 
+                               for item in order_items])
         
-        # Create order
-        order = Order.objects.create(
-            order_id=order_id,
-            customer_name=customer_name,
-            customer_email=customer_email,
-            customer_phone=customer_phone,
-            table_number=table_number,
-            total_amount=total,
-            payment_method=payment_method,
-            payment_status='completed'
-        )
-        
-        # Create order items
-        for item_id, item_data in cart.items():
-            menu_item = MenuItem.objects.get(id=int(item_id))
-            OrderItem.objects.create(
-                order=order,
-                menu_item=menu_item,
-                quantity=item_data['quantity'],
-                price=item_data['price']
-            )
-        
-        # Send confirmation email
-        try:
-            items_text = '\n'.join([f"  {item['quantity']}x {item['name']} - ₹{item['price'] * item['quantity']:.2f}" 
-                                   for item in cart.values()])
-            
-            send_mail(
-                subject=f'Order Confirmation - {order_id}',
-                message=f'''Dear {customer_name},
+        queue_email(
+            subject=f'Order Confirmation - {order_id}',
+            message=f'''Dear {customer_name},
 
 Thank you for your order at Delicious Bites!
 
@@ -277,27 +341,69 @@ Your order will be served shortly!
 Best regards,
 Delicious Bites Team
 Phone: 7004125809''',
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=[customer_email],
-                fail_silently=True,
-            )
-        except:
-            pass
+            recipient=customer_email
+        )
         
         # Clear cart
-        request.session['cart'] = {}
-        request.session.modified = True
+        save_cart(request, {})
         
         return redirect('receipt', order_id=order_id)
     
     return redirect('checkout')
 
-def receipt(request, order_id):
-    order = get_object_or_404(Order, order_id=order_id)
-    order_items = order.items.all()
+async def receipt(request, order_id):
+    data = await aget_receipt(order_id)
+    if data is None:
+        raise Http404('No such order.')
     
+    await aget_cart_summary(request)
     return render(request, 'restaurant/receipt.html', {
-        'order': order,
-        'order_items': order_items
+        'receipt': receipt_context(data)
+    })
+
+@staff_member_required
+def metrics(request):
+    return JsonResponse(route_metrics.as_dict())
+
+# Kitchen display
+@staff_member_required
+def kitchen(request):
+    # One query when a screen opens; everything after arrives as events. The
+    # stream replays from the event id taken before that query, so no order
+    # placed in between is missed.
+    last_event_id = broker.last_event_id
+    start = timezone.make_aware(datetime.combine(timezone.localdate(), datetime.min.time()))
+    orders = Order.objects.filter(created_at__gte=start).order_by('-created_at').prefetch_related('items__menu_item')[:50]
+    return render(request, 'restaurant/kitchen.html', {
+        'orders': orders,
+        'last_event_id': last_event_id
     })
 
+@staff_member_required
+async def kitchen_events(request):
+    # Under WSGI the never-ending stream would be read to the end to build a
+    # response, holding the worker for good
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse('The kitchen event stream needs an ASGI server.', status=501, content_type='text/plain')
+    last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    response = StreamingHttpResponse(
+        event_stream(int(last_event_id) if last_event_id and last_event_id.isdigit() else None),
+        content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+@staff_member_required
+@require_GET
+def sales_dashboard(request):
+    # Reads only the daily rollups, never Order/OrderItem
+    end = parse_date(request.GET.get('end', '')) or timezone.localdate()
+    start = parse_date(request.GET.get('start', '')) or end - timedelta(days=29)
+    if start > end:
+        start, end = end, start
+    return render(request, 'restaurant/sales_dashboard.html', {
+        'start': start,
+        'end': end,
+        **sales_report(start, end)
+    })
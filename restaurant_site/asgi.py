@@ -2,6 +2,8 @@
 ASGI config for restaurant_site project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Serve it with an ASGI server such as uvicorn to run the async views on the
+event loop; see "Running under ASGI" in the README.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -42,11 +43,14 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'restaurant.instrumentation.InstrumentationMiddleware',
+    'restaurant.routers.ReplicaPinningMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
+    'restaurant.cart.CartCookieMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
@@ -54,7 +58,8 @@ ROOT_URLCONF = 'restaurant_site.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates with per-request render timing for the instrumentation middleware
+        'BACKEND': 'restaurant.instrumentation.InstrumentedDjangoTemplates',
         'DIRS': [],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -62,6 +67,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'restaurant.context_processors.cart',
             ],
         },
     },
@@ -73,13 +79,57 @@ WSGI_APPLICATION = 'restaurant_site.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# SQLite tuned for several workers writing to one file, switched on with
+# SQLITE_PRODUCTION=1 in the environment; without it the development
+# database keeps its rollback journal and Django's defaults. Transactions
+# start with BEGIN IMMEDIATE: concurrent writers then wait for the write lock
+# (busy_timeout) when they begin, instead of failing with "database is
+# locked" when a transaction that has already read tries to start writing.
+# WAL lets readers run alongside the single writer; synchronous=NORMAL is
+# durable across application crashes in WAL mode and skips an fsync per
+# commit; busy_timeout (ms) is how long a writer waits for the lock.
+SQLITE_PRODUCTION = os.environ.get('SQLITE_PRODUCTION') == '1'
+SQLITE_PRODUCTION_OPTIONS = {'transaction_mode': 'IMMEDIATE'}
+SQLITE_PRODUCTION_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'busy_timeout': 20000,
+    'mmap_size': 256 * 1024 * 1024,
+}
+# Applied to every SQLite connection as it is opened (restaurant/signals.py)
+SQLITE_PRAGMAS = SQLITE_PRODUCTION_PRAGMAS if SQLITE_PRODUCTION else {}
+
+# Connections are kept for CONN_MAX_AGE seconds instead of being opened per
+# request: worth setting (e.g. CONN_MAX_AGE=60) for WSGI workers, but leave it
+# at 0 under ASGI, where connections cannot be reused across the thread pool.
+CONN_MAX_AGE = int(os.environ.get('CONN_MAX_AGE', 0))
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
-    }
+        'OPTIONS': dict(SQLITE_PRODUCTION_OPTIONS) if SQLITE_PRODUCTION else {},
+        'CONN_MAX_AGE': CONN_MAX_AGE,
+        'CONN_HEALTH_CHECKS': True,
+    },
+    # Stand-in read replica: a second SQLite file refreshed from the primary
+    # with `python manage.py sync_replica`
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db_replica.sqlite3',
+        'CONN_MAX_AGE': CONN_MAX_AGE,
+        'CONN_HEALTH_CHECKS': True,
+    },
 }
 
+# Catalog (menu, chefs, reviews, about) and reporting reads go to the
+# REPLICA_DATABASE alias, everything else to 'default' (restaurant/routers.py).
+# None reads everything from 'default'. A request that writes keeps reading
+# from 'default' for REPLICA_PIN_SECONDS, so replica lag never hides it.
+DATABASE_ROUTERS = ['restaurant.routers.PrimaryReplicaRouter']
+REPLICA_DATABASE = None
+REPLICA_PIN_SECONDS = 5
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -122,11 +172,83 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 MEDIA_URL = 'media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# With DEBUG off, collectstatic writes content-hashed copies of every asset
+# plus .gz (and .br, if the brotli package is installed) next to them.
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage' if DEBUG
+        else 'restaurant.staticfiles.CompressedManifestStaticFilesStorage',
+    },
+}
+
+# Serve STATIC_ROOT and MEDIA_ROOT from Django when DEBUG is off and there is
+# no front proxy. Hashed assets get a one-year immutable Cache-Control.
+SERVE_FILES = False
+STATIC_CACHE_MAX_AGE = 60
+MEDIA_CACHE_MAX_AGE = 60 * 60 * 24
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# LocMemCache is per process. With several workers, point 'default' (or a
+# dedicated alias) at a shared backend such as Redis or Memcached so that a
+# menu change made in the admin invalidates every worker.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'delicious-bites',
+    }
+}
+
+# Cache alias and timeout (seconds) used for the menu snapshot
+MENU_CACHE_ALIAS = 'default'
+MENU_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Most results one menu search (/api/menu/search/) may ask for
+MENU_SEARCH_MAX_RESULTS = 50
+
+# Lifetime (seconds) of the cached home page sections. Edits to menu items,
+# chefs and reviews invalidate them straight away via version keys.
+HOME_FRAGMENT_TIMEOUT = 60 * 60 * 24
+
+# Receipts of completed orders are frozen and cached by order ID
+RECEIPT_CACHE_ALIAS = 'default'
+RECEIPT_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Order IDs are time-sortable Snowflake-style IDs (restaurant/order_ids.py).
+# Each worker process needs its own node (0-1023): set the ORDER_ID_NODE
+# environment variable per worker, or let each claim a free one with a lock
+# file in ORDER_ID_NODE_DIR (None: a directory under the system temp dir).
+# ORDER_ID_GENERATOR may name another callable.
+ORDER_ID_NODE_DIR = None
+ORDER_ID_GENERATOR = None
+
+# Resized WebP/JPEG copies of uploaded images (restaurant/images.py), rendered
+# in a pool of IMAGE_DERIVATIVE_WORKERS processes; 0 renders them inline.
+# Requires a filesystem storage for media.
+IMAGE_DERIVATIVE_WIDTHS = (320, 640, 960)
+IMAGE_DERIVATIVE_QUALITY = 80
+IMAGE_DERIVATIVE_WORKERS = 2
+
+# Order, reservation, contact and review changelists in the admin page by
+# (created_at, id) cursors. Their counts are exact up to this many rows and
+# estimated beyond it.
+ADMIN_EXACT_COUNT_LIMIT = 10000
+
+# Kitchen display (/kitchen/): order events are fanned out in-process to the
+# screens connected over Server-Sent Events, so serve it from one ASGI worker.
+# A reconnecting screen is replayed up to KITCHEN_EVENT_HISTORY events; one
+# more than KITCHEN_MAX_PENDING_EVENTS behind is disconnected to catch up.
+KITCHEN_EVENT_HISTORY = 200
+KITCHEN_MAX_PENDING_EVENTS = 100
+KITCHEN_HEARTBEAT_SECONDS = 15
+
 # Email Configuration
 # IMPORTANT: To send real emails for table reservations, you need to configure these settings:
 # 1. Enable 2-Factor Authentication on your Gmail account (if not already enabled).
@@ -150,3 +272,40 @@ DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
 # Option 2: Console Email (for testing) - Comment out above and uncomment this:
 # EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 # DEFAULT_FROM_EMAIL = 'noreply@deliciousbites.com'
+
+# Email outbox
+# Confirmation emails are queued in the database and delivered by
+# `python manage.py send_outbox`. Failed sends are retried with exponential
+# backoff starting at EMAIL_OUTBOX_RETRY_DELAY seconds.
+EMAIL_OUTBOX_MAX_ATTEMPTS = 5
+EMAIL_OUTBOX_RETRY_DELAY = 60
+EMAIL_OUTBOX_CLAIM_TIMEOUT = 10 * 60
+
+# Table allocation
+# Every reservation holds its table for RESERVATION_DURATION_MINUTES, tracked
+# in RESERVATION_SLOT_MINUTES slots.
+RESERVATION_DURATION_MINUTES = 120
+RESERVATION_SLOT_MINUTES = 30
+RESERVATION_ALLOCATION_ATTEMPTS = 3
+# Earliest and latest start times offered by the availability API
+RESERVATION_FIRST_SEATING = '11:00'
+RESERVATION_LAST_SEATING = '22:00'
+RESERVATION_AVAILABILITY_MAX_DAYS = 14
+
+# Instrumentation
+# Fraction of requests whose query count, DB time, template time and latency
+# are recorded (per route, in memory) and sent in a Server-Timing header.
+# Staff can read the histograms at /metrics/.
+INSTRUMENTATION_SAMPLE_RATE = 0.05
+
+# Cart storage
+# The cart is stored as a compact "item_id:qty" string; names and prices are
+# looked up in the cached menu when it is displayed.
+# 'session': in the session, next to a precomputed cart summary. The
+#            cached_db engine serves session reads from the cache; use
+#            'django.contrib.sessions.backends.cache' to keep writes off the DB too
+# 'cookie':  in a signed cookie, so adding to the cart writes nothing server-side
+CART_STORAGE = 'session'
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+CART_COOKIE_NAME = 'cart'
+CART_COOKIE_AGE = 60 * 60 * 24 * 14
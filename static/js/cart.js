@@ -33,21 +33,103 @@ function addToCart(button, itemId) {
     }, 1500);
 }
 
-// Calculate cart total
-function calculateCartTotal() {
-    let total = 0;
-    const items = document.querySelectorAll('.cart-item');
+// ===== CART API =====
+// The /api/cart/ endpoints return the updated cart summary as JSON, so a
+// click costs one small request instead of a redirect and a full page render.
+
+function getCsrfToken() {
+    const input = document.querySelector('[name=csrfmiddlewaretoken]');
+    return input ? input.value : '';
+}
+
+function postCart(url, data) {
+    const body = new URLSearchParams(data || {});
+    return fetch(url, {
+        method: 'POST',
+        headers: {'X-CSRFToken': getCsrfToken(), 'X-Requested-With': 'XMLHttpRequest'},
+        body: body,
+        credentials: 'same-origin'
+    }).then(response => {
+        if (!response.ok) {
+            return response.json().then(data => { throw new Error(data.error || 'Cart update failed'); });
+        }
+        return response.json();
+    });
+}
+
+// Render a cart summary returned by the API
+function applyCartSummary(summary) {
+    document.querySelectorAll('.cart-count').forEach(el => {
+        el.textContent = summary.count;
+    });
     
-    items.forEach(item => {
-        const price = parseFloat(item.dataset.price);
-        const quantity = parseInt(item.querySelector('.quantity-input').value);
-        total += price * quantity;
+    const floatingCart = document.getElementById('floating-cart');
+    if (floatingCart) {
+        floatingCart.hidden = summary.count === 0;
+    }
+    
+    const subtotals = {};
+    summary.items.forEach(item => {
+        subtotals[item.id] = item.subtotal;
+    });
+    document.querySelectorAll('.cart-item').forEach(row => {
+        const subtotal = subtotals[row.dataset.itemId];
+        if (subtotal === undefined) {
+            row.remove();
+        } else {
+            row.querySelector('.item-subtotal').textContent = `₹${subtotal}`;
+        }
     });
     
     const totalElement = document.querySelector('.cart-total');
     if (totalElement) {
-        totalElement.textContent = `$${total.toFixed(2)}`;
+        totalElement.textContent = `₹${summary.total}`;
     }
+    
+    // Last item removed on the cart page: reload to show the empty cart
+    if (summary.count === 0 && totalElement) {
+        window.location.reload();
+    }
+}
+
+function initCartApi() {
+    document.querySelectorAll('.add-to-cart[data-api-url]').forEach(link => {
+        link.addEventListener('click', function(e) {
+            e.preventDefault();
+            postCart(link.dataset.apiUrl)
+                .then(summary => {
+                    applyCartSummary(summary);
+                    addToCart(link);
+                })
+                .catch(error => alert(error.message));
+        });
+    });
+    
+    document.querySelectorAll('.update-cart-form[data-api-url]').forEach(form => {
+        form.addEventListener('submit', function(e) {
+            e.preventDefault();
+            const quantity = parseInt(form.querySelector('.quantity-input').value);
+            if (!updateCartQuantity(form.closest('.cart-item').dataset.itemId, quantity)) {
+                return;
+            }
+            postCart(form.dataset.apiUrl, {quantity: quantity})
+                .then(applyCartSummary)
+                .catch(error => alert(error.message));
+        });
+    });
+    
+    document.querySelectorAll('.remove-from-cart[data-api-url]').forEach(link => {
+        link.addEventListener('click', function(e) {
+            // The inline confirm() cancels the click if the user says no
+            if (e.defaultPrevented) {
+                return;
+            }
+            e.preventDefault();
+            postCart(link.dataset.apiUrl)
+                .then(applyCartSummary)
+                .catch(error => alert(error.message));
+        });
+    });
 }
 
 // Confirm remove from cart
@@ -55,33 +137,7 @@ function confirmRemoveFromCart(itemName) {
     return confirm(`Remove "${itemName}" from your cart?`);
 }
 
-// Update cart count in navigation
-function updateCartCount() {
-    const cartItems = document.querySelectorAll('.cart-item');
-    const cartCount = document.querySelector('.cart-count');
-    
-    if (cartCount) {
-        let totalItems = 0;
-        cartItems.forEach(item => {
-            const quantity = parseInt(item.querySelector('.quantity-input').value);
-            totalItems += quantity;
-        });
-        cartCount.textContent = totalItems;
-    }
-}
-
 // Initialize cart page
 document.addEventListener('DOMContentLoaded', function() {
-    // Add event listeners to quantity inputs
-    const quantityInputs = document.querySelectorAll('.quantity-input');
-    quantityInputs.forEach(input => {
-        input.addEventListener('change', function() {
-            calculateCartTotal();
-            updateCartCount();
-        });
-    });
-    
-    // Calculate initial total
-    calculateCartTotal();
-    updateCartCount();
+    initCartApi();
 });
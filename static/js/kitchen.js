@@ -0,0 +1,70 @@
+// Kitchen Display
+
+// Orders arrive over Server-Sent Events from /kitchen/events/; the page
+// never polls. Created and updated orders replace their card, deleted ones
+// are removed. EventSource reconnects by itself and resumes from the last
+// event id it saw.
+
+function orderCard(order) {
+    const card = document.createElement('div');
+    card.className = 'kitchen-order';
+    card.dataset.orderId = order.order_id;
+    card.style.cssText = 'background: #fff; border-left: 6px solid #e74c3c; border-radius: 8px; padding: 1rem; box-shadow: 0 2px 10px rgba(0,0,0,0.1);';
+
+    const title = document.createElement('h3');
+    title.textContent = `Table #${order.table_number}`;
+    const meta = document.createElement('p');
+    meta.style.color = '#666';
+    const time = new Date(order.created_at).toLocaleTimeString([], { hour: '2-digit', minute: '2-digit' });
+    meta.textContent = `${order.order_id} · ${time} · ${order.customer_name}`;
+    const list = document.createElement('ul');
+    (order.items || []).forEach(item => {
+        const li = document.createElement('li');
+        li.textContent = `${item.quantity} x ${item.name}`;
+        list.appendChild(li);
+    });
+    card.append(title, meta, list);
+    return card;
+}
+
+function findCard(container, orderId) {
+    return Array.from(container.children).find(card => card.dataset.orderId === orderId);
+}
+
+function initKitchen() {
+    const container = document.getElementById('kitchen-orders');
+    if (!container) return;
+    const status = document.getElementById('kitchen-status');
+    const params = new URLSearchParams({ last_event_id: container.dataset.lastEventId });
+    const source = new EventSource(`${container.dataset.url}?${params}`);
+
+    function upsert(event) {
+        const order = JSON.parse(event.data);
+        const existing = findCard(container, order.order_id);
+        if (existing && !order.items) {
+            // An update without lines keeps the ones already shown
+            order.items = Array.from(existing.querySelectorAll('li')).map(li => {
+                const [quantity, ...name] = li.textContent.split(' x ');
+                return { quantity: quantity, name: name.join(' x ') };
+            });
+        }
+        const card = orderCard(order);
+        if (existing) {
+            existing.replaceWith(card);
+        } else {
+            container.prepend(card);
+            card.animate([{ background: '#fdebd0' }, { background: '#fff' }], 3000);
+        }
+    }
+
+    source.addEventListener('order.created', upsert);
+    source.addEventListener('order.updated', upsert);
+    source.addEventListener('order.deleted', function(event) {
+        const card = findCard(container, JSON.parse(event.data).order_id);
+        if (card) card.remove();
+    });
+    source.addEventListener('open', () => { status.textContent = 'live'; });
+    source.addEventListener('error', () => { status.textContent = 'reconnecting...'; });
+}
+
+document.addEventListener('DOMContentLoaded', initKitchen);
@@ -0,0 +1,61 @@
+// Menu Search
+
+// Search the menu as the guest types, through /api/menu/search/. Every word
+// matches by prefix, so results appear from the first few letters.
+
+function fetchResults(url, query) {
+    const params = new URLSearchParams({ q: query, limit: 12 });
+    return fetch(`${url}?${params}`, { headers: { 'Accept': 'application/json' } })
+        .then(response => response.ok ? response.json() : Promise.reject(response));
+}
+
+function renderResults(container, data) {
+    container.innerHTML = '';
+    if (!data.results.length) {
+        container.textContent = `No dishes match "${data.query}".`;
+        return;
+    }
+    data.results.forEach(item => {
+        const card = document.createElement('div');
+        card.className = 'menu-item';
+        const name = document.createElement('h3');
+        name.textContent = item.name;
+        const description = document.createElement('p');
+        description.textContent = item.description;
+        const price = document.createElement('p');
+        price.className = 'price';
+        price.textContent = `₹${item.price}`;
+        card.append(name, description, price);
+        container.appendChild(card);
+    });
+}
+
+function initMenuSearch() {
+    const input = document.getElementById('menu-search');
+    if (!input) return;
+    const container = document.getElementById('menu-search-results');
+    let timer = null;
+    let latest = '';
+
+    input.addEventListener('input', function() {
+        clearTimeout(timer);
+        const query = input.value.trim();
+        latest = query;
+        if (!query) {
+            container.hidden = true;
+            return;
+        }
+        timer = setTimeout(() => {
+            fetchResults(input.dataset.url, query)
+                .then(data => {
+                    // Ignore answers to queries the guest has since changed
+                    if (data.query !== latest) return;
+                    renderResults(container, data);
+                    container.hidden = false;
+                })
+                .catch(() => { container.hidden = true; });
+        }, 150);
+    });
+}
+
+document.addEventListener('DOMContentLoaded', initMenuSearch);
@@ -0,0 +1,55 @@
+// Reservation Availability
+
+// Ask /api/reservations/availability/ which start times still have a table
+// for the party, and offer them as buttons under the time field.
+
+function fetchAvailability(url, date, guests) {
+    const params = new URLSearchParams({ start: date, guests: guests || 1 });
+    return fetch(`${url}?${params}`, { headers: { 'Accept': 'application/json' } })
+        .then(response => response.ok ? response.json() : Promise.reject(response));
+}
+
+function renderAvailability(container, timeInput, day) {
+    container.innerHTML = '';
+    const open = day.slots.filter(slot => slot.available);
+    if (!open.length) {
+        container.textContent = 'Fully booked for this party size - please pick another date.';
+        return;
+    }
+    day.slots.forEach(slot => {
+        const button = document.createElement('button');
+        button.type = 'button';
+        button.className = 'slot-button';
+        button.textContent = slot.time;
+        button.disabled = !slot.available;
+        button.title = slot.available ? `${slot.free_tables} tables free` : 'Full';
+        button.addEventListener('click', function() {
+            timeInput.value = slot.time;
+            container.querySelectorAll('.slot-button').forEach(b => b.classList.remove('selected'));
+            button.classList.add('selected');
+        });
+        container.appendChild(button);
+    });
+}
+
+function initAvailability() {
+    const container = document.getElementById('slot-availability');
+    if (!container) return;
+    const form = container.closest('form');
+    const dateInput = form.querySelector('input[name="date"]');
+    const timeInput = form.querySelector('input[name="time"]');
+    const guestsInput = form.querySelector('select[name="guests"]');
+
+    function refresh() {
+        if (!dateInput.value) return;
+        container.textContent = 'Checking availability...';
+        fetchAvailability(container.dataset.url, dateInput.value, guestsInput.value)
+            .then(data => renderAvailability(container, timeInput, data.dates[0]))
+            .catch(() => { container.textContent = ''; });
+    }
+
+    dateInput.addEventListener('change', refresh);
+    guestsInput.addEventListener('change', refresh);
+}
+
+document.addEventListener('DOMContentLoaded', initAvailability);